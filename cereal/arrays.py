@@ -0,0 +1,84 @@
+"""NumPy arrays over the primitive lists of capnp structs.
+
+pycapnp returns list fields as sequences of boxed Python values, so np.array(md.position.x) costs a
+Python object per element. Instead, the struct is copied once into a fresh single-segment message in
+C++, and its lists are returned as read-only arrays over that segment, found by following the
+struct and list pointers of the capnp wire format.
+"""
+import struct as pystruct
+
+import capnp
+import numpy as np
+
+_DTYPES = {
+  'int8': np.dtype('<i1'), 'int16': np.dtype('<i2'), 'int32': np.dtype('<i4'), 'int64': np.dtype('<i8'),
+  'uint8': np.dtype('<u1'), 'uint16': np.dtype('<u2'), 'uint32': np.dtype('<u4'), 'uint64': np.dtype('<u8'),
+  'float32': np.dtype('<f4'), 'float64': np.dtype('<f8'),
+}
+# capnp list pointer element size codes
+_ELEMENT_SIZES = {2: 1, 3: 2, 4: 4, 5: 8}
+
+
+def _pointer_offset(pointer: int) -> int:
+  # signed 30-bit offset in words, from the end of the pointer
+  offset = (pointer >> 2) & 0x3FFFFFFF
+  return offset - (1 << 30) if offset & (1 << 29) else offset
+
+
+# list layouts by field names, then schema. schemas aren't hashable, but compare cheaply
+_LAYOUTS: dict[tuple[str, ...], list[tuple[capnp.lib.capnp._StructSchema, list]]] = {}
+
+
+def _get_layouts(schema, fields: tuple[str, ...]) -> list[tuple[int, np.dtype | None]]:
+  """Pointer index and element dtype of each list field, None for non-numeric elements"""
+  cached = _LAYOUTS.setdefault(fields, [])
+  for cached_schema, layouts in cached:
+    if cached_schema == schema:
+      return layouts
+
+  layouts = []
+  for field in fields:
+    slot = schema.fields[field].proto.slot
+    if slot.type.which() != 'list':
+      raise TypeError(f"{field} is not a list field")
+    layouts.append((slot.offset, _DTYPES.get(slot.type.list.elementType.which())))
+  cached.append((schema, layouts))
+  return layouts
+
+
+def as_arrays(struct, *fields: str, dtype=None) -> list[np.ndarray]:
+  """Returns list fields of a struct as read-only arrays over one copy of the struct, cast to dtype if given"""
+  if isinstance(struct, capnp.lib.capnp._DynamicStructBuilder):
+    struct = struct.as_reader()
+  layouts = _get_layouts(struct.schema, fields)
+  segments = struct.as_builder().to_segments()
+  if len(segments) != 1 or any(list_dtype is None for _, list_dtype in layouts):
+    # lists of bools, enums or pointers, or a struct too large for one segment
+    return [np.array(getattr(struct, field), dtype=dtype) for field in fields]
+
+  segment = segments[0]
+  root, = pystruct.unpack_from('<Q', segment)
+  data_words, pointer_count = (root >> 32) & 0xFFFF, root >> 48
+  pointers_start = 1 + _pointer_offset(root) + data_words
+
+  arrays = []
+  for pointer_idx, list_dtype in layouts:
+    # fields newer than the message are null
+    pointer = pystruct.unpack_from('<Q', segment, (pointers_start + pointer_idx) * 8)[0] if pointer_idx < pointer_count else 0
+    if pointer == 0:
+      arr = np.frombuffer(b'', dtype=list_dtype)
+    else:
+      assert pointer & 3 == 1 and _ELEMENT_SIZES.get((pointer >> 32) & 7) == list_dtype.itemsize, "unexpected list pointer"
+      start = pointers_start + pointer_idx + 1 + _pointer_offset(pointer)
+      arr = np.frombuffer(segment, dtype=list_dtype, count=pointer >> 35, offset=start * 8)
+    arrays.append(arr if dtype is None else arr.astype(dtype))
+  return arrays
+
+
+def as_array(struct, field: str, dtype=None) -> np.ndarray:
+  return as_arrays(struct, field, dtype=dtype)[0]
+
+
+def as_columns(struct, fields: tuple[str, ...] = ('x', 'y', 'z'), dtype=None) -> np.ndarray:
+  """Stacks list fields of equal length into an (N, len(fields)) array, e.g. the xyz points of a trajectory"""
+  return np.column_stack(as_arrays(struct, *fields, dtype=dtype))
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from cereal import log
+from cereal.arrays import as_array, as_arrays, as_columns
+
+
+def get_model_msg():
+  msg = log.Event.new_message()
+  md = msg.init('modelV2')
+  for field in ('x', 'y', 'z', 't', 'xStd'):
+    setattr(md.position, field, np.random.uniform(-100, 100, 33).tolist())
+  md.laneLineProbs = [0.1, 0.2, 0.3, 0.4]
+  md.meta.desireState = np.random.uniform(0, 1, 8).tolist()
+  md.laneLines = [log.XYZTData.new_message(x=[1., 2.]) for _ in range(4)]
+  md.frameId = 1234
+  return msg
+
+
+class TestArrays:
+  @pytest.mark.parametrize("reader", [True, False])
+  def test_matches_lists(self, reader):
+    msg = get_model_msg()
+    with log.Event.from_bytes(msg.to_bytes()) as ev:
+      md = ev.modelV2 if reader else msg.modelV2
+      fields = ('x', 'y', 'z', 't', 'xStd', 'yStd')
+      for field, arr in zip(fields, as_arrays(md.position, *fields), strict=True):
+        assert arr.dtype == np.float32
+        assert not arr.flags.writeable
+        np.testing.assert_array_equal(arr, np.array(getattr(md.position, field), dtype=np.float32))
+
+      np.testing.assert_array_equal(as_array(md, 'laneLineProbs'), np.array(md.laneLineProbs, dtype=np.float32))
+      np.testing.assert_array_equal(as_array(md.meta, 'desireState'), np.array(md.meta.desireState, dtype=np.float32))
+      assert as_array(md.meta, 'desirePrediction').shape == (0,)
+
+  def test_dtype(self):
+    with log.Event.from_bytes(get_model_msg().to_bytes()) as ev:
+      # same values as converting the boxed Python floats
+      position = ev.modelV2.position
+      xyz = as_columns(position, dtype=np.float64)
+      assert xyz.dtype == np.float64
+      np.testing.assert_array_equal(xyz, np.column_stack([position.x, position.y, position.z]))
+
+  def test_non_numeric_lists(self):
+    with log.Event.from_bytes(get_model_msg().to_bytes()) as ev:
+      assert len(as_array(ev.modelV2, 'laneLines')) == 4
+      with pytest.raises(TypeError):
+        as_array(ev.modelV2, 'frameId')
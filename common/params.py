@@ -1,5 +1,7 @@
 from openpilot.common.params_pyx import Params, ParamKeyType, UnknownKeyName
+from openpilot.common.params_watcher import ParamWatcher
 assert Params
+assert ParamWatcher
 assert ParamKeyType
 assert UnknownKeyName
 
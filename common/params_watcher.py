@@ -0,0 +1,135 @@
+import ctypes
+import os
+import select
+import struct
+import time
+from collections import defaultdict
+from collections.abc import Iterable
+
+from openpilot.common.params_pyx import Params
+
+LINUX = os.name == 'posix' and os.uname().sysname == 'Linux'
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+# Params.put writes to a temp file and renames it into place, remove unlinks
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE
+
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len
+FALLBACK_POLL_S = 0.1
+
+if LINUX:
+  libc = ctypes.CDLL('libc.so.6', use_errno=True)
+
+
+class ParamWatcher:
+  """Reports changes to params without re-reading them.
+
+  On Linux the params directory is watched with inotify, so `poll` and `version` are
+  a single non-blocking read and `wait` sleeps until a param is written. Elsewhere,
+  changes are detected by comparing modification times.
+
+    watcher = ParamWatcher(["IsMetric", "ExperimentalMode"])
+    while True:
+      for key, value in watcher.read_changes(timeout=1.).items():
+        ...
+  """
+  def __init__(self, keys: Iterable[str] | None = None, params: Params | None = None):
+    self.fd = -1
+    self.params = params if params is not None else Params()
+    self.keys = None if keys is None else {k.decode() if isinstance(k, bytes) else k for k in keys}
+    for k in self.keys or ():
+      self.params.check_key(k)
+
+    self.path = self.params.get_param_path()
+    self.versions: dict[str, int] = defaultdict(int)
+    self._pending: set[str] = set()
+
+    if LINUX:
+      self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+      if self.fd < 0 or libc.inotify_add_watch(self.fd, self.path.encode(), WATCH_MASK) < 0:
+        errno = ctypes.get_errno()
+        self.close()
+        raise OSError(errno, f"failed to watch {self.path}: {os.strerror(errno)}")
+    else:
+      self._mtimes = self._scan()
+
+  def __del__(self):
+    self.close()
+
+  def close(self) -> None:
+    if self.fd >= 0:
+      os.close(self.fd)
+      self.fd = -1
+
+  def fileno(self) -> int:
+    return self.fd
+
+  def _scan(self) -> dict[str, int]:
+    with os.scandir(self.path) as it:
+      return {e.name: e.stat().st_mtime_ns for e in it if self.keys is None or e.name in self.keys}
+
+  def _mark(self, key: str) -> None:
+    if self.keys is None or key in self.keys:
+      self.versions[key] += 1
+      self._pending.add(key)
+
+  def _drain(self) -> None:
+    if self.fd < 0:
+      mtimes = self._scan()
+      for key in mtimes.keys() | self._mtimes.keys():
+        if mtimes.get(key) != self._mtimes.get(key):
+          self._mark(key)
+      self._mtimes = mtimes
+      return
+
+    while True:
+      try:
+        buf = os.read(self.fd, 4096)
+      except BlockingIOError:
+        return
+
+      offset = 0
+      while offset < len(buf):
+        _, mask, _, name_len = INOTIFY_EVENT.unpack_from(buf, offset)
+        offset += INOTIFY_EVENT.size
+        name = buf[offset:offset + name_len].rstrip(b'\0').decode()
+        offset += name_len
+
+        if mask & IN_Q_OVERFLOW:
+          # events were dropped, assume everything changed
+          for key in (self.keys or self._scan().keys()):
+            self._mark(key)
+        elif name:
+          self._mark(name)
+
+  def poll(self) -> set[str]:
+    """Returns the keys that changed since the last call, without blocking."""
+    self._drain()
+    changed, self._pending = self._pending, set()
+    return changed
+
+  def wait(self, timeout: float | None = None) -> set[str]:
+    """Like poll, but blocks for up to timeout seconds until a watched key changes."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not (changed := self.poll()):
+      remaining = None if deadline is None else deadline - time.monotonic()
+      if remaining is not None and remaining <= 0:
+        break
+
+      if self.fd < 0:
+        time.sleep(FALLBACK_POLL_S if remaining is None else min(remaining, FALLBACK_POLL_S))
+      else:
+        select.select([self.fd], [], [], remaining)
+    return changed
+
+  def read_changes(self, timeout: float | None = 0.) -> dict[str, bytes | None]:
+    """Waits for changes like wait, and returns the new value of each changed key."""
+    return {key: self.params.get(key) for key in self.wait(timeout)}
+
+  def version(self, key: str) -> int:
+    """Number of times key was written or removed since the watcher was created."""
+    self._drain()
+    return self.versions[key]
@@ -1,3 +1,4 @@
+import math
 import numpy as np
 
 class RunningStat:
@@ -70,4 +71,89 @@ class RunningStatFilter:
       pass
       # self.filtered_stat.push_data(self.filtered_stat.mean())
 
+class QuantileSketch:
+  # log-bucketed quantile sketch (DDSketch): quantiles are within relative_accuracy of the true
+  # value and memory is bounded by max_bins per sign, regardless of how many samples are added
+  MIN_INDEXABLE = 1e-9
+
+  def __init__(self, relative_accuracy=0.01, max_bins=1024):
+    self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+    self.log_gamma = math.log(self.gamma)
+    self.max_bins = max_bins
+    self.reset()
+
+  def reset(self):
+    self.positive: dict[int, int] = {}
+    self.negative: dict[int, int] = {}
+    self.zero_count = 0
+    self.count = 0
+    self.sum = 0.
+    self.min = math.inf
+    self.max = -math.inf
+
+  def _add_keys(self, store, magnitudes):
+    keys, counts = np.unique(np.ceil(np.log(magnitudes) / self.log_gamma).astype(np.int64), return_counts=True)
+    for k, c in zip(keys.tolist(), counts.tolist(), strict=True):
+      store[k] = store.get(k, 0) + c
+
+    if len(store) > self.max_bins:
+      # fold the smallest magnitudes into one bucket, keeping the tail accurate
+      keys = sorted(store)
+      n_collapse = len(keys) - self.max_bins + 1
+      store[keys[n_collapse]] = store[keys[n_collapse]] + sum(store.pop(k) for k in keys[:n_collapse])
+
+  def add(self, values):
+    values = np.atleast_1d(np.asarray(values, dtype=np.float64))
+    values = values[np.isfinite(values)]
+    if not len(values):
+      return
+
+    self.count += len(values)
+    self.sum += float(values.sum())
+    self.min = min(self.min, float(values.min()))
+    self.max = max(self.max, float(values.max()))
+
+    pos = values[values > self.MIN_INDEXABLE]
+    neg = values[values < -self.MIN_INDEXABLE]
+    self.zero_count += len(values) - len(pos) - len(neg)
+    if len(pos):
+      self._add_keys(self.positive, pos)
+    if len(neg):
+      self._add_keys(self.negative, -neg)
+
+  def _value(self, key):
+    return 2 * self.gamma ** key / (self.gamma + 1)
+
+  def quantile(self, q):
+    if self.count == 0:
+      return math.nan
+
+    rank = int(round(q * (self.count - 1)))
+    if rank <= 0:
+      return self.min
+    if rank >= self.count - 1:
+      return self.max
+
+    seen = 0
+    value = self.max
+    for key in sorted(self.negative, reverse=True):
+      seen += self.negative[key]
+      if seen > rank:
+        value = -self._value(key)
+        break
+    else:
+      seen += self.zero_count
+      if seen > rank:
+        value = 0.
+      else:
+        for key in sorted(self.positive):
+          seen += self.positive[key]
+          if seen > rank:
+            value = self._value(key)
+            break
+    return min(max(value, self.min), self.max)
+
+  def mean(self):
+    return self.sum / self.count if self.count else math.nan
+
 # class SequentialBayesian():
@@ -63,6 +63,18 @@ class SwaglogRotatingFileHandler(BaseRotatingHandler):
         if os.path.exists(to_delete): # just being safe, should always exist
           os.remove(to_delete)
 
+  def emit_batch(self, records):
+    """Writes records with a single write and flush, rolling over at most once per batch"""
+    if not records:
+      return
+    try:
+      if self.shouldRollover(None):
+        self.doRollover()
+      self.stream.write("".join(self.format(record) + self.terminator for record in records))
+      self.flush()
+    except Exception:
+      self.handleError(records[0])
+
 class UnixDomainSocketHandler(logging.Handler):
   def __init__(self, formatter):
     logging.Handler.__init__(self)
@@ -4,7 +4,7 @@ import threading
 import time
 import uuid
 
-from openpilot.common.params import Params, ParamKeyType, UnknownKeyName
+from openpilot.common.params import Params, ParamKeyType, ParamWatcher, UnknownKeyName
 
 class TestParams:
   def setup_method(self):
@@ -107,3 +107,36 @@ class TestParams:
     assert len(keys) > 20
     assert len(keys) == len(set(keys))
     assert b"CarParams" in keys
+
+  def test_watcher_poll(self):
+    watcher = ParamWatcher(["IsMetric", "CarParams"])
+    assert watcher.poll() == set()
+
+    self.params.put_bool("IsMetric", True)
+    self.params.put("DongleId", "cb38263377b873ee")
+    assert watcher.poll() == {"IsMetric"}
+    assert watcher.poll() == set()
+
+    self.params.remove("IsMetric")
+    self.params.put("CarParams", "test")
+    assert watcher.read_changes() == {"IsMetric": None, "CarParams": b"test"}
+
+  def test_watcher_wait(self):
+    watcher = ParamWatcher(["CarParams"])
+    def _delayed_writer():
+      time.sleep(0.1)
+      Params().put_nonblocking("CarParams", "test")
+    threading.Thread(target=_delayed_writer).start()
+    assert watcher.wait(0) == set()
+    assert watcher.wait(5) == {"CarParams"}
+
+  def test_watcher_version(self):
+    watcher = ParamWatcher(["IsMetric"])
+    assert watcher.version("IsMetric") == 0
+    for i in range(3):
+      self.params.put_bool("IsMetric", bool(i % 2))
+    assert watcher.version("IsMetric") == 3
+
+  def test_watcher_unknown_key_fails(self):
+    with pytest.raises(UnknownKeyName):
+      ParamWatcher(["swag"])
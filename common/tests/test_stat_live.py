@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from openpilot.common.stat_live import QuantileSketch
+
+
+class TestQuantileSketch:
+  @pytest.mark.parametrize("dist", ["normal", "lognormal", "uniform"])
+  def test_relative_accuracy(self, dist):
+    rng = np.random.default_rng(0)
+    values = {
+      "normal": rng.normal(0, 10, 100_000),
+      "lognormal": rng.lognormal(0, 2, 100_000),
+      "uniform": rng.uniform(-5, 50, 100_000),
+    }[dist]
+
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    for chunk in np.array_split(values, 100):
+      sketch.add(chunk)
+
+    values.sort()
+    assert sketch.count == len(values)
+    assert sketch.min == values[0]
+    assert sketch.max == values[-1]
+    assert sketch.mean() == pytest.approx(values.mean())
+    for q in (0.05, 0.5, 0.95):
+      expected = values[int(round(q * (len(values) - 1)))]
+      assert sketch.quantile(q) == pytest.approx(expected, rel=0.01, abs=1e-9)
+
+  def test_bounded_memory(self):
+    values = np.geomspace(1e-6, 1e6, 100_000)
+    sketch = QuantileSketch(max_bins=128)
+    sketch.add(values)
+    assert len(sketch.positive) <= 128
+    # the upper tail is unaffected by collapsing
+    assert sketch.quantile(0.95) == pytest.approx(values[int(round(0.95 * (len(values) - 1)))], rel=0.01)
+
+  def test_small(self):
+    sketch = QuantileSketch()
+    assert np.isnan(sketch.quantile(0.5))
+    sketch.add(0.)
+    sketch.add(3.)
+    assert sketch.quantile(0.) == 0.
+    assert sketch.quantile(1.) == 3.
@@ -1,3 +1,6 @@
+from collections import defaultdict
+from functools import cache
+
 from openpilot.selfdrive.car.interfaces import get_interface_attr
 from openpilot.selfdrive.car.body.values import CAR as BODY
 from openpilot.selfdrive.car.chrysler.values import CAR as CHRYSLER
@@ -25,6 +28,44 @@ def is_valid_for_fingerprint(msg, car_fingerprint: dict[int, int]):
   return (adr in car_fingerprint and car_fingerprint[adr] == len(msg.dat)) or adr >= 0x800
 
 
+class FingerprintIndex:
+  """Inverted index from (address, length) to the bitmask of cars that could have sent it.
+
+  A car is compatible with a message if any of its fingerprints contains it, so a set of
+  candidates is narrowed down with a single AND per message.
+  """
+  def __init__(self, fingerprints: dict[str, list[dict[int, int]]]):
+    self.cars = list(fingerprints.keys())
+    self.car_bits = {car: 1 << i for i, car in enumerate(self.cars)}
+    self.all_cars = (1 << len(self.cars)) - 1
+    self.compatible: dict[tuple[int, int], int] = defaultdict(int)
+    for car, car_fingerprints in fingerprints.items():
+      for fingerprint in car_fingerprints:
+        # add alien debug address
+        for adr, length in (fingerprint | _DEBUG_ADDRESS).items():
+          self.compatible[(adr, length)] |= self.car_bits[car]
+
+  def eliminate(self, msg, candidates: int) -> int:
+    # ignore addresses that are more than 11 bits
+    if msg.address >= 0x800:
+      return candidates
+    return candidates & self.compatible.get((msg.address, len(msg.dat)), 0)
+
+  def to_mask(self, cars: list[str]) -> int:
+    mask = 0
+    for car in cars:
+      mask |= self.car_bits[car]
+    return mask
+
+  def to_cars(self, candidates: int) -> list[str]:
+    return [car for car in self.cars if self.car_bits[car] & candidates]
+
+
+@cache
+def get_fingerprint_index() -> FingerprintIndex:
+  return FingerprintIndex(_FINGERPRINTS)
+
+
 def eliminate_incompatible_cars(msg, candidate_cars):
   """Removes cars that could not have sent msg.
 
@@ -35,18 +76,9 @@ def eliminate_incompatible_cars(msg, candidate_cars):
      Returns:
       A list containing the subset of candidate_cars that could have sent msg.
   """
-  compatible_cars = []
-
-  for car_name in candidate_cars:
-    car_fingerprints = _FINGERPRINTS[car_name]
-
-    for fingerprint in car_fingerprints:
-      # add alien debug address
-      if is_valid_for_fingerprint(msg, fingerprint | _DEBUG_ADDRESS):
-        compatible_cars.append(car_name)
-        break
-
-  return compatible_cars
+  index = get_fingerprint_index()
+  compatible = index.eliminate(msg, index.to_mask(candidate_cars))
+  return [car_name for car_name in candidate_cars if index.car_bits[car_name] & compatible]
 
 
 def all_known_cars():
@@ -3,6 +3,7 @@ import re
 from collections import namedtuple
 from dataclasses import dataclass, field, replace
 from enum import Enum, IntFlag
+from functools import cache
 
 import panda.python.uds as uds
 from cereal import car
@@ -170,12 +171,20 @@ FW_PATTERN = re.compile(b'^(?P<model_year_hint>[' + FW_ALPHABET + b'])' +
                         b'(?P<software_revision>[' + FW_ALPHABET + b']{2,})\x00*$')
 
 
+@cache
+def get_platform_code(fw: bytes) -> tuple[bytes, bytes] | None:
+  match = FW_PATTERN.match(fw)
+  if match is None:
+    return None
+  return match.group('platform_hint'), match.group('model_year_hint')
+
+
 def get_platform_codes(fw_versions: list[bytes] | set[bytes]) -> set[tuple[bytes, bytes]]:
   codes = set()
   for fw in fw_versions:
-    match = FW_PATTERN.match(fw)
-    if match is not None:
-      codes.add((match.group('platform_hint'), match.group('model_year_hint')))
+    code = get_platform_code(fw)
+    if code is not None:
+      codes.add(code)
 
   return codes
 
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 from collections import defaultdict
-from collections.abc import Iterator
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from functools import cache
 from typing import Any, Protocol, TypeVar
 
 from tqdm import tqdm
@@ -12,9 +14,9 @@ from openpilot.common.params import Params
 from openpilot.common.swaglog import cloudlog
 from openpilot.selfdrive.car.ecu_addrs import get_ecu_addrs
 from openpilot.selfdrive.car.fingerprints import FW_VERSIONS
-from openpilot.selfdrive.car.fw_query_definitions import AddrType, EcuAddrBusType, FwQueryConfig, LiveFwVersions, OfflineFwVersions
+from openpilot.selfdrive.car.fw_query_definitions import AddrType, EcuAddrBusType, FwQueryConfig, LiveFwVersions, OfflineFwVersions, Request
 from openpilot.selfdrive.car.interfaces import get_interface_attr
-from openpilot.selfdrive.car.isotp_parallel_query import IsoTpParallelQuery
+from openpilot.selfdrive.car.isotp_parallel_query import IsoTpParallelQuery, get_data_concurrent
 
 Ecu = car.CarParams.Ecu
 ESSENTIAL_ECUS = [Ecu.engine, Ecu.eps, Ecu.abs, Ecu.fwdRadar, Ecu.fwdCamera, Ecu.vsa]
@@ -53,29 +55,61 @@ class MatchFwToCar(Protocol):
     ...
 
 
+class FwMatchIndex:
+  """Lookup tables from FW versions to the candidates they match, so matching is a handful of
+  hash lookups per live FW version instead of a scan over every candidate and ECU."""
+  def __init__(self, offline_fw_versions: OfflineFwVersions):
+    self.candidates = set(offline_fw_versions)
+
+    # (addr, sub_addr, fw) -> candidates with that FW on an ECU not excluded from fuzzy matching,
+    # with repeats so that FW shared by two ECUs of a candidate is not considered unique
+    self.fuzzy: defaultdict[tuple[int, int | None, bytes], list[str]] = defaultdict(list)
+    # (addr, sub_addr, fw) -> (candidate, ecu type) entries expecting that FW
+    self.exact: defaultdict[tuple[int, int | None, bytes], set[tuple[str, int]]] = defaultdict(set)
+    # (addr, sub_addr) -> (candidate, ecu type) entries that must match if a FW version is found
+    self.ecus: defaultdict[AddrType, set[tuple[str, int]]] = defaultdict(set)
+    # (addr, sub_addr) -> candidates that are invalid if no FW version is found
+    self.essential: defaultdict[AddrType, set[str]] = defaultdict(set)
+
+    for candidate, fw_by_addr in offline_fw_versions.items():
+      config = FW_QUERY_CONFIGS[MODEL_TO_BRAND[candidate]]
+      for ecu, fws in fw_by_addr.items():
+        ecu_type, addr = ecu[0], ecu[1:]
+        for f in fws:
+          # These ECUs are known to be shared between models (EPS only between hybrid/ICE version)
+          # Getting this exactly right isn't crucial, but excluding camera and radar makes it almost
+          # impossible to get 3 matching versions, even if two models with shared parts are released at the same
+          # time and only one is in our database.
+          if ecu_type not in FUZZY_EXCLUDE_ECUS:
+            self.fuzzy[(*addr, f)].append(candidate)
+          self.exact[(*addr, f)].add((candidate, ecu_type))
+
+        # Virtual debug ecu doesn't need to match the database
+        if ecu_type == Ecu.debug:
+          continue
+
+        self.ecus[addr].add((candidate, ecu_type))
+        # Some models can sometimes miss an ecu, or show on two different addresses
+        # FIXME: this logic can be improved to be more specific, should require one of the two addresses
+        if ecu_type in ESSENTIAL_ECUS and candidate not in config.non_essential_ecus.get(ecu_type, []):
+          self.essential[addr].add(candidate)
+
+
+# FW_VERSIONS doesn't change at runtime, so the index is built once per brand filter. The brands' fuzzy
+# matchers (FwQueryConfig.match_fw_to_car_fuzzy) cache their get_platform_code per FW version for the same
+# reason, as they parse the same database and live versions again for every candidate.
+@cache
+def get_fw_match_index(match_brand: str = None) -> FwMatchIndex:
+  return FwMatchIndex({c: f for c, f in FW_VERSIONS.items() if is_brand(MODEL_TO_BRAND[c], match_brand)})
+
+
 def match_fw_to_car_fuzzy(live_fw_versions: LiveFwVersions, match_brand: str = None, log: bool = True, exclude: str = None) -> set[str]:
   """Do a fuzzy FW match. This function will return a match, and the number of firmware version
   that were matched uniquely to that specific car. If multiple ECUs uniquely match to different cars
   the match is rejected."""
 
-  # Build lookup table from (addr, sub_addr, fw) to list of candidate cars
-  all_fw_versions = defaultdict(list)
-  for candidate, fw_by_addr in FW_VERSIONS.items():
-    if not is_brand(MODEL_TO_BRAND[candidate], match_brand):
-      continue
-
-    if candidate == exclude:
-      continue
-
-    for addr, fws in fw_by_addr.items():
-      # These ECUs are known to be shared between models (EPS only between hybrid/ICE version)
-      # Getting this exactly right isn't crucial, but excluding camera and radar makes it almost
-      # impossible to get 3 matching versions, even if two models with shared parts are released at the same
-      # time and only one is in our database.
-      if addr[0] in FUZZY_EXCLUDE_ECUS:
-        continue
-      for f in fws:
-        all_fw_versions[(addr[1], addr[2], f)].append(candidate)
+  # Lookup table from (addr, sub_addr, fw) to list of candidate cars
+  all_fw_versions = get_fw_match_index(match_brand).fuzzy
 
   matched_ecus = set()
   match: str | None = None
@@ -83,7 +117,9 @@ def match_fw_to_car_fuzzy(live_fw_versions: LiveFwVersions, match_brand: str = N
     ecu_key = (addr[0], addr[1])
     for version in versions:
       # All cars that have this FW response on the specified address
-      candidates = all_fw_versions[(*ecu_key, version)]
+      candidates = all_fw_versions.get((*ecu_key, version), [])
+      if exclude is not None:
+        candidates = [c for c in candidates if c != exclude]
 
       if len(candidates) == 1:
         matched_ecus.add(ecu_key)
@@ -111,37 +147,27 @@ def match_fw_to_car_exact(live_fw_versions: LiveFwVersions, match_brand: str = N
   if extra_fw_versions is None:
     extra_fw_versions = {}
 
+  index = get_fw_match_index(match_brand)
   invalid = set()
-  candidates = {c: f for c, f in FW_VERSIONS.items() if
-                is_brand(MODEL_TO_BRAND[c], match_brand)}
-
-  for candidate, fws in candidates.items():
-    config = FW_QUERY_CONFIGS[MODEL_TO_BRAND[candidate]]
-    for ecu, expected_versions in fws.items():
-      expected_versions = expected_versions + extra_fw_versions.get(candidate, {}).get(ecu, [])
-      ecu_type = ecu[0]
-      addr = ecu[1:]
-
-      found_versions = live_fw_versions.get(addr, set())
-      if not len(found_versions):
-        # Some models can sometimes miss an ecu, or show on two different addresses
-        # FIXME: this logic can be improved to be more specific, should require one of the two addresses
-        if candidate in config.non_essential_ecus.get(ecu_type, []):
-          continue
 
-        # Ignore non essential ecus
-        if ecu_type not in ESSENTIAL_ECUS:
-          continue
+  for addr, ecu_candidates in index.essential.items():
+    if not len(live_fw_versions.get(addr, set())):
+      invalid |= ecu_candidates
+
+  for addr, found_versions in live_fw_versions.items():
+    if not len(found_versions) or addr not in index.ecus:
+      continue
 
-      # Virtual debug ecu doesn't need to match the database
-      if ecu_type == Ecu.debug:
-        continue
+    matched = set()
+    for found_version in found_versions:
+      matched |= index.exact.get((*addr, found_version), set())
 
+    for candidate, ecu_type in index.ecus[addr] - matched:
+      expected_versions = extra_fw_versions.get(candidate, {}).get((ecu_type, *addr), [])
       if not any(found_version in expected_versions for found_version in found_versions):
         invalid.add(candidate)
-        break
 
-  return set(candidates.keys()) - invalid
+  return index.candidates - invalid
 
 
 def match_fw_to_car(fw_versions: list[capnp.lib.capnp._DynamicStructBuilder], vin: str,
@@ -241,29 +267,58 @@ def get_fw_versions_ordered(logcan, sendcan, vin: str, ecu_rx_addrs: set[EcuAddr
                             debug: bool = False, progress: bool = False) -> list[capnp.lib.capnp._DynamicStructBuilder]:
   """Queries for FW versions ordering brands by likelihood, breaks when exact match is found"""
 
-  all_car_fw = []
   brand_matches = get_brand_ecu_matches(ecu_rx_addrs)
-
-  for brand in sorted(brand_matches, key=lambda b: len(brand_matches[b]), reverse=True):
-    # Skip this brand if there are no matching present ECUs
-    if not len(brand_matches[brand]):
-      continue
-
-    car_fw = get_fw_versions(logcan, sendcan, query_brand=brand, timeout=timeout, num_pandas=num_pandas, debug=debug, progress=progress)
-    all_car_fw.extend(car_fw)
-
-    # If there is a match using this brand's FW alone, finish querying early
-    _, matches = match_fw_to_car(car_fw, vin, log=False)
-    if len(matches) == 1:
-      break
-
-  return all_car_fw
-
-
-def get_fw_versions(logcan, sendcan, query_brand: str = None, extra: OfflineFwVersions = None, timeout: float = 0.1, num_pandas: int = 1,
-                    debug: bool = False, progress: bool = False) -> list[capnp.lib.capnp._DynamicStructBuilder]:
+  # Skip brands if there are no matching present ECUs
+  brands = [brand for brand in sorted(brand_matches, key=lambda b: len(brand_matches[b]), reverse=True) if len(brand_matches[brand])]
+
+  queries = [query for brand in brands for query in get_fw_queries(brand, num_pandas=num_pandas)]
+  brand_fw: dict[str, list[capnp.lib.capnp._DynamicStructBuilder]] = {brand: [] for brand in brands}
+  last_round = {query.brand: i for i, round_queries in enumerate(schedule_fw_queries(queries)) for query in round_queries}
+  brands_done = 0
+
+  def brand_matched(round_idx: int, car_fw: list[capnp.lib.capnp._DynamicStructBuilder]) -> bool:
+    # Brands are scheduled in order, so they finish in order
+    nonlocal brands_done
+    for fw in car_fw:
+      brand_fw[fw.brand].append(fw)
+
+    while brands_done < len(brands) and last_round.get(brands[brands_done], -1) <= round_idx:
+      brands_done += 1
+      # If there is a match using this brand's FW alone, finish querying early
+      _, matches = match_fw_to_car(brand_fw[brands[brands_done - 1]], vin, log=False)
+      if len(matches) == 1:
+        return True
+    return False
+
+  run_fw_queries(logcan, sendcan, queries, timeout=timeout, debug=debug, progress=progress, stop=brand_matched)
+
+  # FW of brands queried alongside the matched brand is dropped, as if they had not been queried yet
+  return [fw for brand in brands[:brands_done] for fw in brand_fw[brand]]
+
+
+@dataclass
+class FwQuery:
+  brand: str
+  config: FwQueryConfig
+  request: Request
+  addrs: list[AddrType]
+  ecu_types: dict[tuple[str, int, int | None], int]
+
+  def conflicts(self, other: 'FwQuery') -> bool:
+    """Whether two queries would talk to, or get responses from, the same ECU"""
+    if self.request.bus != other.request.bus:
+      return False
+
+    tx_addrs = {addr for addr, _ in self.addrs}
+    rx_addrs = {uds.get_rx_addr_for_tx_addr(addr, self.request.rx_offset) for addr in tx_addrs}
+    other_tx_addrs = {addr for addr, _ in other.addrs}
+    other_rx_addrs = {uds.get_rx_addr_for_tx_addr(addr, other.request.rx_offset) for addr in other_tx_addrs}
+    return bool(tx_addrs & other_tx_addrs or rx_addrs & other_rx_addrs)
+
+
+def get_fw_queries(query_brand: str = None, extra: OfflineFwVersions = None, num_pandas: int = 1) -> list[FwQuery]:
+  """Returns the queries to get FW versions, in the order they would be run one by one"""
   versions = VERSIONS.copy()
-  params = Params()
 
   if query_brand is not None:
     versions = {query_brand: versions[query_brand]}
@@ -293,49 +348,96 @@ def get_fw_versions(logcan, sendcan, query_brand: str = None, extra: OfflineFwVe
 
   addrs.insert(0, parallel_addrs)
 
-  # Get versions and build capnp list to put into CarParams
-  car_fw = []
+  queries = []
   requests = [(brand, config, r) for brand, config, r in REQUESTS if is_brand(brand, query_brand)]
-  for addr_group in tqdm(addrs, disable=not progress):  # split by subaddr, if any
+  for addr_group in addrs:  # split by subaddr, if any
     for addr_chunk in chunks(addr_group):
       for brand, config, r in requests:
         # Skip query if no panda available
         if r.bus > num_pandas * 4 - 1:
           continue
 
-        # Toggle OBD multiplexing for each request
-        if r.bus % 4 == 1:
-          set_obd_multiplexing(params, r.obd_multiplexing)
+        query_addrs = [(a, s) for (b, a, s) in addr_chunk if b in (brand, 'any') and
+                       (len(r.whitelist_ecus) == 0 or ecu_types[(b, a, s)] in r.whitelist_ecus)]
+        if query_addrs:
+          queries.append(FwQuery(brand, config, r, query_addrs, ecu_types))
+
+  return queries
+
 
-        try:
-          query_addrs = [(a, s) for (b, a, s) in addr_chunk if b in (brand, 'any') and
-                         (len(r.whitelist_ecus) == 0 or ecu_types[(b, a, s)] in r.whitelist_ecus)]
+def schedule_fw_queries(queries: list[FwQuery]) -> list[list[FwQuery]]:
+  """Groups consecutive queries that can run at the same time into rounds, keeping their order.
+  Queries in a round are on different buses or ECUs, and agree on OBD multiplexing if they need it."""
+  rounds: list[list[FwQuery]] = []
+  obd_multiplexing: bool | None = None
+  for query in queries:
+    needs_obd_multiplexing = query.request.bus % 4 == 1
+    if not len(rounds) or any(query.conflicts(other) for other in rounds[-1]) or \
+       (needs_obd_multiplexing and obd_multiplexing not in (None, query.request.obd_multiplexing)):
+      rounds.append([])
+      obd_multiplexing = None
 
-          if query_addrs:
-            query = IsoTpParallelQuery(sendcan, logcan, r.bus, query_addrs, r.request, r.response, r.rx_offset, debug=debug)
-            for (tx_addr, sub_addr), version in query.get_data(timeout).items():
-              f = car.CarParams.CarFw.new_message()
+    rounds[-1].append(query)
+    if needs_obd_multiplexing:
+      obd_multiplexing = query.request.obd_multiplexing
 
-              f.ecu = ecu_types.get((brand, tx_addr, sub_addr), Ecu.unknown)
-              f.fwVersion = version
-              f.address = tx_addr
-              f.responseAddress = uds.get_rx_addr_for_tx_addr(tx_addr, r.rx_offset)
-              f.request = r.request
-              f.brand = brand
-              f.bus = r.bus
-              f.logging = r.logging or (f.ecu, tx_addr, sub_addr) in config.extra_ecus
-              f.obdMultiplexing = r.obd_multiplexing
+  return rounds
 
-              if sub_addr is not None:
-                f.subAddress = sub_addr
 
-              car_fw.append(f)
-        except Exception:
-          cloudlog.exception("FW query exception")
+def run_fw_queries(logcan, sendcan, queries: list[FwQuery], timeout: float = 0.1, debug: bool = False, progress: bool = False,
+                   stop: Callable[[int, list[capnp.lib.capnp._DynamicStructBuilder]], bool] = None) -> list[capnp.lib.capnp._DynamicStructBuilder]:
+  """Runs the queries, concurrently where possible. stop is called with the FW of each round,
+  the remaining rounds are cancelled if it returns True"""
+  params = Params()
+
+  # Get versions and build capnp list to put into CarParams
+  car_fw = []
+  for round_idx, round_queries in enumerate(tqdm(schedule_fw_queries(queries), disable=not progress)):
+    # Toggle OBD multiplexing for each round
+    for query in round_queries:
+      if query.request.bus % 4 == 1:
+        set_obd_multiplexing(params, query.request.obd_multiplexing)
+        break
+
+    round_fw = []
+    try:
+      isotp_queries = [IsoTpParallelQuery(sendcan, logcan, q.request.bus, q.addrs, q.request.request, q.request.response,
+                                          q.request.rx_offset, debug=debug) for q in round_queries]
+      for query, results in zip(round_queries, get_data_concurrent(isotp_queries, timeout), strict=True):
+        brand, config, r = query.brand, query.config, query.request
+        for (tx_addr, sub_addr), version in results.items():
+          f = car.CarParams.CarFw.new_message()
+
+          f.ecu = query.ecu_types.get((brand, tx_addr, sub_addr), Ecu.unknown)
+          f.fwVersion = version
+          f.address = tx_addr
+          f.responseAddress = uds.get_rx_addr_for_tx_addr(tx_addr, r.rx_offset)
+          f.request = r.request
+          f.brand = brand
+          f.bus = r.bus
+          f.logging = r.logging or (f.ecu, tx_addr, sub_addr) in config.extra_ecus
+          f.obdMultiplexing = r.obd_multiplexing
+
+          if sub_addr is not None:
+            f.subAddress = sub_addr
+
+          round_fw.append(f)
+    except Exception:
+      cloudlog.exception("FW query exception")
+
+    car_fw.extend(round_fw)
+    if stop is not None and stop(round_idx, round_fw):
+      break
 
   return car_fw
 
 
+def get_fw_versions(logcan, sendcan, query_brand: str = None, extra: OfflineFwVersions = None, timeout: float = 0.1, num_pandas: int = 1,
+                    debug: bool = False, progress: bool = False) -> list[capnp.lib.capnp._DynamicStructBuilder]:
+  queries = get_fw_queries(query_brand, extra=extra, num_pandas=num_pandas)
+  return run_fw_queries(logcan, sendcan, queries, timeout=timeout, debug=debug, progress=progress)
+
+
 if __name__ == "__main__":
   import time
   import argparse
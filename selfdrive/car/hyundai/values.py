@@ -1,6 +1,7 @@
 import re
 from dataclasses import dataclass, field
 from enum import Enum, IntFlag
+from functools import cache
 
 from cereal import car
 from panda.python import uds
@@ -612,22 +613,32 @@ class Buttons:
   CANCEL = 4  # on newer models, this is a pause/resume button
 
 
+@cache
+def get_platform_code(fw: bytes) -> tuple[bytes, bytes | None] | None:
+  # Returns the platform-specific identification code of a single FW version
+  code_match = PLATFORM_CODE_FW_PATTERN.search(fw)
+  if code_match is None:
+    return None
+
+  part_match = PART_NUMBER_FW_PATTERN.search(fw)
+  date_match = DATE_FW_PATTERN.search(fw)
+  code: bytes = code_match.group()
+  part = part_match.group() if part_match else None
+  date = date_match.group() if date_match else None
+  if part is not None:
+    # part number starts with generic ECU part type, add what is specific to platform
+    code += b"-" + part[-5:]
+
+  return code, date
+
+
 def get_platform_codes(fw_versions: list[bytes]) -> set[tuple[bytes, bytes | None]]:
   # Returns unique, platform-specific identification codes for a set of versions
   codes = set()  # (code-Optional[part], date)
   for fw in fw_versions:
-    code_match = PLATFORM_CODE_FW_PATTERN.search(fw)
-    part_match = PART_NUMBER_FW_PATTERN.search(fw)
-    date_match = DATE_FW_PATTERN.search(fw)
-    if code_match is not None:
-      code: bytes = code_match.group()
-      part = part_match.group() if part_match else None
-      date = date_match.group() if date_match else None
-      if part is not None:
-        # part number starts with generic ECU part type, add what is specific to platform
-        code += b"-" + part[-5:]
-
-      codes.add((code, date))
+    code = get_platform_code(fw)
+    if code is not None:
+      codes.add(code)
   return codes
 
 
@@ -46,9 +46,6 @@ FORWARD_GEARS = [GearShifter.drive, GearShifter.low, GearShifter.eco,
                  GearShifter.sport, GearShifter.manumatic, GearShifter.brake]
 
 
-def similarity(s1: str, s2: str) -> float:
-  return SequenceMatcher(None, s1, s2).ratio()
-
 GEAR_SHIFTER_MAP: dict[str, car.CarState.GearShifter] = {
   'P': GearShifter.park, 'PARK': GearShifter.park,
   'R': GearShifter.reverse, 'REVERSE': GearShifter.reverse,
@@ -172,28 +169,45 @@ class FluxModel:
     self.friction_override = (y < 0.1)
 
 
-def get_nn_model_path(_car, eps_firmware) -> tuple[str | None, float]:
-  def check_nn_path(_check_model):
-    _model_path = None
-    _max_similarity = -1.0
-    for f in os.listdir(TORQUE_NN_MODEL_PATH):
-      if f.endswith(".json"):
-        model = f.replace(".json", "").replace(f"{TORQUE_NN_MODEL_PATH}/", "")
-        similarity_score = similarity(model, _check_model)
-        if similarity_score > _max_similarity:
-          _max_similarity = similarity_score
-          _model_path = os.path.join(TORQUE_NN_MODEL_PATH, f)
-    return _model_path, _max_similarity
+@cache
+def get_nn_model_index() -> dict[str, str]:
+  """Model name to path of the lateral NN feedforward models, sorted by name"""
+  return {f.removesuffix(".json"): os.path.join(TORQUE_NN_MODEL_PATH, f) for f in sorted(os.listdir(TORQUE_NN_MODEL_PATH))
+          if f.endswith(".json")}
 
+
+@cache
+def match_nn_model(check_model: str) -> tuple[str | None, float]:
+  """Returns the path of the NN model with the most similar name, and its similarity"""
+  nn_models = get_nn_model_index()
+  # an exact name match is the most similar model
+  if check_model in nn_models:
+    return nn_models[check_model], 1.0
+
+  model_path = None
+  max_similarity = -1.0
+  for model, path in nn_models.items():
+    # skip ratio unless its cheaper upper bounds could beat the best model so far
+    matcher = SequenceMatcher(None, model, check_model)
+    if matcher.real_quick_ratio() <= max_similarity or matcher.quick_ratio() <= max_similarity:
+      continue
+    similarity_score = matcher.ratio()
+    if similarity_score > max_similarity:
+      max_similarity = similarity_score
+      model_path = path
+  return model_path, max_similarity
+
+
+def get_nn_model_path(_car, eps_firmware) -> tuple[str | None, float]:
   if len(eps_firmware) > 3:
     eps_firmware = eps_firmware.replace("\\", "")
     check_model = f"{_car} {eps_firmware}"
   else:
     check_model = _car
-  model_path, max_similarity = check_nn_path(check_model)
+  model_path, max_similarity = match_nn_model(check_model)
   if _car not in model_path or 0.0 <= max_similarity < 0.9:
     check_model = _car
-    model_path, max_similarity = check_nn_path(check_model)
+    model_path, max_similarity = match_nn_model(check_model)
     if _car not in model_path or 0.0 <= max_similarity < 0.9:
       model_path = None
   return model_path, max_similarity
@@ -27,17 +27,12 @@ class IsoTpParallelQuery:
       assert tx_addr not in FUNCTIONAL_ADDRS, f"Functional address should be defined in functional_addrs: {hex(tx_addr)}"
 
     self.msg_addrs = {tx_addr: get_rx_addr_for_tx_addr(tx_addr[0], rx_offset=response_offset) for tx_addr in real_addrs}
+    # ECUs with subaddresses share a response address
+    self.rx_addrs: dict[int, list[AddrType]] = defaultdict(list)
+    for tx_addr, rx_addr in self.msg_addrs.items():
+      self.rx_addrs[rx_addr].append(tx_addr)
     self.msg_buffer: dict[int, list[tuple[int, int, bytes, int]]] = defaultdict(list)
 
-  def rx(self):
-    """Drain can socket and sort messages into buffers based on address"""
-    can_packets = messaging.drain_sock(self.logcan, wait_for_one=True)
-
-    for packet in can_packets:
-      for msg in packet.can:
-        if msg.src == self.bus and msg.address in self.msg_addrs.values():
-          self.msg_buffer[msg.address].append((msg.address, msg.busTime, msg.dat, msg.src))
-
   def _can_tx(self, tx_addr, dat, bus):
     """Helper function to send single message"""
     msg = [tx_addr, 0, dat, bus]
@@ -62,10 +57,6 @@ class IsoTpParallelQuery:
     self.msg_buffer[addr] = keep_msgs
     return msgs
 
-  def _drain_rx(self):
-    messaging.drain_sock_raw(self.logcan)
-    self.msg_buffer = defaultdict(list)
-
   def _create_isotp_msg(self, tx_addr: int, sub_addr: int | None, rx_addr: int):
     can_client = CanClient(self._can_tx, partial(self._can_rx, rx_addr, sub_addr=sub_addr), tx_addr, rx_addr,
                            self.bus, sub_addr=sub_addr, debug=self.debug)
@@ -76,98 +67,153 @@ class IsoTpParallelQuery:
     # as well as reduces chances we process messages from previous queries
     return IsoTpMessage(can_client, timeout=0, separation_time=0.01, debug=self.debug, max_len=max_len)
 
-  def get_data(self, timeout: float, total_timeout: float = 60.) -> dict[AddrType, bytes]:
-    self._drain_rx()
+  def _start(self, timeout: float) -> None:
+    """Send the first request to all addresses, responses are processed by _process"""
+    self.timeout = timeout
 
     # Create message objects
-    msgs = {}
-    request_counter = {}
-    request_done = {}
+    self.msgs = {}
+    self.request_counter = {}
+    self.request_done = {}
     for tx_addr, rx_addr in self.msg_addrs.items():
-      msgs[tx_addr] = self._create_isotp_msg(*tx_addr, rx_addr)
-      request_counter[tx_addr] = 0
-      request_done[tx_addr] = False
+      self.msgs[tx_addr] = self._create_isotp_msg(*tx_addr, rx_addr)
+      self.request_counter[tx_addr] = 0
+      self.request_done[tx_addr] = False
 
     # Send first request to functional addrs, subsequent responses are handled on physical addrs
     if len(self.functional_addrs):
       for addr in self.functional_addrs:
         self._create_isotp_msg(addr, None, -1).send(self.request[0])
 
-    # Send first frame (single or first) to all addresses and receive asynchronously in the loop below.
+    # Send first frame (single or first) to all addresses, responses are received asynchronously by get_data_concurrent.
     # If querying functional addrs, only set up physical IsoTpMessages to send consecutive frames
-    for msg in msgs.values():
+    for msg in self.msgs.values():
       msg.send(self.request[0], setup_only=len(self.functional_addrs) > 0)
 
-    results = {}
-    start_time = time.monotonic()
-    addrs_responded = set()  # track addresses that have ever sent a valid iso-tp frame for timeout logging
-    response_timeouts = {tx_addr: start_time + timeout for tx_addr in self.msg_addrs}
-    while True:
-      self.rx()
-
-      for tx_addr, msg in msgs.items():
-        try:
-          dat, rx_in_progress = msg.recv()
-        except Exception:
-          cloudlog.exception(f"Error processing UDS response: {tx_addr}")
-          request_done[tx_addr] = True
-          continue
-
-        # Extend timeout for each consecutive ISO-TP frame to avoid timing out on long responses
-        if rx_in_progress:
-          addrs_responded.add(tx_addr)
-          response_timeouts[tx_addr] = time.monotonic() + timeout
-
-        if dat is None:
-          continue
-
-        # Log unexpected empty responses
-        if len(dat) == 0:
-          cloudlog.error(f"iso-tp query empty response: {tx_addr}")
-          request_done[tx_addr] = True
-          continue
-
-        counter = request_counter[tx_addr]
-        expected_response = self.response[counter]
-        response_valid = dat.startswith(expected_response)
-
-        if response_valid:
-          if counter + 1 < len(self.request):
-            response_timeouts[tx_addr] = time.monotonic() + timeout
-            msg.send(self.request[counter + 1])
-            request_counter[tx_addr] += 1
-          else:
-            results[tx_addr] = dat[len(expected_response):]
-            request_done[tx_addr] = True
+    self.results = {}
+    self.start_time = time.monotonic()
+    self.addrs_responded = set()  # track addresses that have ever sent a valid iso-tp frame for timeout logging
+    self.response_timeouts = {tx_addr: self.start_time + timeout for tx_addr in self.msg_addrs}
+
+  def _process(self, updated_addrs: set[int]) -> None:
+    """Step the ISO-TP state machine of the addresses that received frames"""
+    timeout = self.timeout
+    for tx_addr, msg in self.msgs.items():
+      # nothing to process without new frames, skip the ISO-TP state machine
+      if self.msg_addrs[tx_addr] not in updated_addrs:
+        continue
+
+      try:
+        dat, rx_in_progress = msg.recv()
+      except Exception:
+        cloudlog.exception(f"Error processing UDS response: {tx_addr}")
+        self.request_done[tx_addr] = True
+        continue
+
+      # Extend timeout for each consecutive ISO-TP frame to avoid timing out on long responses
+      if rx_in_progress:
+        self.addrs_responded.add(tx_addr)
+        self.response_timeouts[tx_addr] = time.monotonic() + timeout
+
+      if dat is None:
+        continue
+
+      # Log unexpected empty responses
+      if len(dat) == 0:
+        cloudlog.error(f"iso-tp query empty response: {tx_addr}")
+        self.request_done[tx_addr] = True
+        continue
+
+      counter = self.request_counter[tx_addr]
+      expected_response = self.response[counter]
+      response_valid = dat.startswith(expected_response)
+
+      if response_valid:
+        if counter + 1 < len(self.request):
+          self.response_timeouts[tx_addr] = time.monotonic() + timeout
+          msg.send(self.request[counter + 1])
+          self.request_counter[tx_addr] += 1
+        else:
+          self.results[tx_addr] = dat[len(expected_response):]
+          self.request_done[tx_addr] = True
+      else:
+        error_code = dat[2] if len(dat) > 2 else -1
+        if error_code == 0x78:
+          self.response_timeouts[tx_addr] = time.monotonic() + self.response_pending_timeout
+          cloudlog.error(f"iso-tp query response pending: {tx_addr}")
         else:
-          error_code = dat[2] if len(dat) > 2 else -1
-          if error_code == 0x78:
-            response_timeouts[tx_addr] = time.monotonic() + self.response_pending_timeout
-            cloudlog.error(f"iso-tp query response pending: {tx_addr}")
-          else:
-            request_done[tx_addr] = True
-            cloudlog.error(f"iso-tp query bad response: {tx_addr} - 0x{dat.hex()}")
-
-      # Mark request done if address timed out
-      cur_time = time.monotonic()
-      for tx_addr in response_timeouts:
-        if cur_time - response_timeouts[tx_addr] > 0:
-          if not request_done[tx_addr]:
-            if request_counter[tx_addr] > 0:
-              cloudlog.error(f"iso-tp query timeout after receiving partial response: {tx_addr}")
-            elif tx_addr in addrs_responded:
-              cloudlog.error(f"iso-tp query timeout while receiving response: {tx_addr}")
-            # TODO: handle functional addresses
-            # else:
-            #   cloudlog.error(f"iso-tp query timeout with no response: {tx_addr}")
-          request_done[tx_addr] = True
-
-      # Break if all requests are done (finished or timed out)
-      if all(request_done.values()):
-        break
-
-      if cur_time - start_time > total_timeout:
-        cloudlog.error("iso-tp query timeout while receiving data")
-        break
-
-    return results
+          self.request_done[tx_addr] = True
+          cloudlog.error(f"iso-tp query bad response: {tx_addr} - 0x{dat.hex()}")
+
+  def _done(self, cur_time: float) -> bool:
+    """Mark requests done if their address timed out, returns True once all requests are done"""
+    for tx_addr in self.response_timeouts:
+      if cur_time - self.response_timeouts[tx_addr] > 0:
+        if not self.request_done[tx_addr]:
+          if self.request_counter[tx_addr] > 0:
+            cloudlog.error(f"iso-tp query timeout after receiving partial response: {tx_addr}")
+          elif tx_addr in self.addrs_responded:
+            cloudlog.error(f"iso-tp query timeout while receiving response: {tx_addr}")
+          # TODO: handle functional addresses
+          # else:
+          #   cloudlog.error(f"iso-tp query timeout with no response: {tx_addr}")
+        self.request_done[tx_addr] = True
+
+    return all(self.request_done.values())
+
+  def get_data(self, timeout: float, total_timeout: float = 60.) -> dict[AddrType, bytes]:
+    return get_data_concurrent([self], timeout, total_timeout)[0]
+
+
+def get_data_concurrent(queries: list[IsoTpParallelQuery], timeout: float, total_timeout: float = 60.) -> list[dict[AddrType, bytes]]:
+  """Runs queries sharing a CAN socket at the same time, returns the results of each query.
+
+  Queries must not use the same transmit or response addresses on a bus, so every response can be
+  attributed to one query. Queries to functional addresses should run on their own.
+  """
+  if not len(queries):
+    return []
+
+  # (bus, response address) -> query
+  routes: dict[tuple[int, int], IsoTpParallelQuery] = {}
+  tx_addrs: set[tuple[int, int]] = set()
+  for q in queries:
+    q_tx_addrs = {(q.bus, tx_addr) for tx_addr, _ in q.msg_addrs}
+    q_rx_addrs = {(q.bus, rx_addr) for rx_addr in q.rx_addrs}
+    assert not (tx_addrs & q_tx_addrs or routes.keys() & q_rx_addrs), "concurrent queries must not share addresses"
+    tx_addrs |= q_tx_addrs
+    routes.update(dict.fromkeys(q_rx_addrs, q))
+
+  logcan = queries[0].logcan
+  messaging.drain_sock_raw(logcan)
+  for q in queries:
+    q.msg_buffer = defaultdict(list)
+    q._start(timeout)
+
+  start_time = time.monotonic()
+  pending = list(queries)
+  while True:
+    # drain can socket and sort messages into buffers based on address
+    updated_addrs: dict[IsoTpParallelQuery, set[int]] = {q: set() for q in pending}
+    for packet in messaging.drain_sock(logcan, wait_for_one=True):
+      for msg in packet.can:
+        address = msg.address
+        query = routes.get((msg.src, address))
+        if query is not None and query in updated_addrs:
+          query.msg_buffer[address].append((address, msg.busTime, msg.dat, msg.src))
+          updated_addrs[query].add(address)
+
+    for q in pending:
+      q._process(updated_addrs[q])
+
+    # Break if all requests are done (finished or timed out)
+    cur_time = time.monotonic()
+    pending = [q for q in pending if not q._done(cur_time)]
+    if not len(pending):
+      break
+
+    if cur_time - start_time > total_timeout:
+      cloudlog.error("iso-tp query timeout while receiving data")
+      break
+
+  return [q.results for q in queries]
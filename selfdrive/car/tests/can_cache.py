@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Compact cache of the CAN data of test segments.
+
+test_models only needs a segment's CAN packets, carParams and panda safety mode changes. Reading them
+from an rlog means decompressing and parsing every other service too, so they are extracted once and
+stored compressed under the hash of the segment and log source: the serialized can Events, which are
+replayed as is, and the few carParams and pandaStates fields test_models reads.
+
+Run this to fill the cache for all test routes ahead of time, test_models also fills it as it goes:
+
+  ./can_cache.py --jobs 8
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from functools import partial
+from zipfile import BadZipFile
+
+import capnp
+import numpy as np
+from tqdm import tqdm
+
+from cereal import car, messaging
+from openpilot.common.realtime import DT_CTRL
+from openpilot.selfdrive.car import gen_empty_fingerprint
+from openpilot.system.hardware.hw import DEFAULT_DOWNLOAD_CACHE_ROOT
+
+SafetyModel = car.CarParams.SafetyModel
+
+CACHE_VERSION = 3
+MIN_CAN_PACKETS = int(50 / DT_CTRL)  # test_models needs more than 50s of CAN
+CAN_CACHE_DIR = os.environ.get("CAN_CACHE_DIR", os.path.join(DEFAULT_DOWNLOAD_CACHE_ROOT, "can_cache"))
+
+
+@dataclass
+class CanSegment:
+  # carParams
+  car_fw: list[capnp.lib.capnp._DynamicStructBuilder]
+  experimental_long: bool
+  car_fingerprint: str
+
+  # CAN packet the panda left ELM327 and entered a car safety mode, for CAN validity checks
+  elm_frame: int | None
+  car_safety_mode_frame: int | None
+
+  # CAN packets in log order: the serialized Events and their range in events
+  event_offsets: np.ndarray
+  events: np.ndarray
+
+  @property
+  def num_packets(self) -> int:
+    return len(self.event_offsets) - 1
+
+  @classmethod
+  def from_logreader(cls, lr) -> 'CanSegment':
+    car_fw = []
+    experimental_long = False
+    car_fingerprint = ""
+    elm_frame = None
+    car_safety_mode_frame = None
+    event_offsets, events = [0], []
+
+    for msg in lr:
+      if msg.which() == "can":
+        events.append(msg.as_builder().to_bytes())
+        event_offsets.append(event_offsets[-1] + len(events[-1]))
+
+      elif msg.which() == "carParams":
+        car_fw = [fw.as_builder() for fw in msg.carParams.carFw]
+        if msg.carParams.openpilotLongitudinalControl:
+          experimental_long = True
+        if not car_fingerprint:
+          car_fingerprint = msg.carParams.carFingerprint
+
+      elif msg.which() == 'pandaStates':
+        for ps in msg.pandaStates:
+          if elm_frame is None and ps.safetyModel != SafetyModel.elm327:
+            elm_frame = len(events)
+          if car_safety_mode_frame is None and ps.safetyModel not in (SafetyModel.elm327, SafetyModel.noOutput):
+            car_safety_mode_frame = len(events)
+
+      elif msg.which() == 'pandaStateDEPRECATED':
+        if elm_frame is None and msg.pandaStateDEPRECATED.safetyModel != SafetyModel.elm327:
+          elm_frame = len(events)
+        if car_safety_mode_frame is None and msg.pandaStateDEPRECATED.safetyModel not in (SafetyModel.elm327, SafetyModel.noOutput):
+          car_safety_mode_frame = len(events)
+
+    return cls(car_fw, experimental_long, car_fingerprint, elm_frame, car_safety_mode_frame,
+               np.array(event_offsets, dtype=np.int64), np.frombuffer(b"".join(events), dtype=np.uint8))
+
+  def get_fingerprint(self, num_packets: int) -> dict[int, dict[int, int]]:
+    fingerprint = gen_empty_fingerprint()
+    for msg in self.get_can_msgs(num_packets):
+      for m in msg.can:
+        if m.src < 64:
+          fingerprint[m.src][m.address] = len(m.dat)
+    return fingerprint
+
+  def get_can_bytes(self, num_packets: int | None = None) -> list[bytes]:
+    end = self.num_packets if num_packets is None else min(num_packets, self.num_packets)
+    event_offsets = self.event_offsets[:end + 1].tolist()
+    events = self.events[:event_offsets[-1]].tobytes()
+    return [events[start:end] for start, end in zip(event_offsets[:-1], event_offsets[1:], strict=True)]
+
+  def get_can_msgs(self, num_packets: int | None = None) -> list[capnp.lib.capnp._DynamicStructReader]:
+    return [messaging.log_from_bytes(dat) for dat in self.get_can_bytes(num_packets)]
+
+  def save(self, path: str) -> None:
+    CP = car.CarParams.new_message(carFw=self.car_fw, carFingerprint=self.car_fingerprint)
+
+    # write atomically, test workers may read or fill the cache at the same time
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".npz", delete=False) as f:
+      np.savez_compressed(f, version=CACHE_VERSION, car_params=np.frombuffer(CP.to_bytes(), dtype=np.uint8),
+                          experimental_long=self.experimental_long, elm_frame=-1 if self.elm_frame is None else self.elm_frame,
+                          car_safety_mode_frame=-1 if self.car_safety_mode_frame is None else self.car_safety_mode_frame,
+                          event_offsets=self.event_offsets, events=self.events)
+    os.replace(f.name, path)
+
+  @classmethod
+  def load(cls, path: str) -> 'CanSegment':
+    with np.load(path) as data:
+      assert int(data['version']) == CACHE_VERSION, f"unsupported CAN cache version: {int(data['version'])}"
+      with car.CarParams.from_bytes(data['car_params'].tobytes()) as CP:
+        car_fw = [fw.as_builder() for fw in CP.carFw]
+        car_fingerprint = CP.carFingerprint
+
+      elm_frame, car_safety_mode_frame = int(data['elm_frame']), int(data['car_safety_mode_frame'])
+      return cls(car_fw, bool(data['experimental_long']), car_fingerprint,
+                 None if elm_frame == -1 else elm_frame, None if car_safety_mode_frame == -1 else car_safety_mode_frame,
+                 data['event_offsets'], data['events'])
+
+
+def get_cache_path(segment: str, source: str) -> str:
+  key = hashlib.sha256(f"{segment}|{source}".encode()).hexdigest()
+  return os.path.join(CAN_CACHE_DIR, f"{key}.npz")
+
+
+def load_cached_segment(segment: str, source: str) -> CanSegment | None:
+  path = get_cache_path(segment, source)
+  try:
+    return CanSegment.load(path)
+  except (FileNotFoundError, AssertionError, BadZipFile, ValueError, KeyError, EOFError):
+    # missing, outdated or corrupt (e.g. truncated by an interrupted write), cache_segment rebuilds it
+    return None
+
+
+def get_log_source(source: str):
+  from openpilot.tools.lib.logreader import auto_source, internal_source, openpilotci_source
+  return {'internal': internal_source, 'openpilotci': openpilotci_source, 'auto': auto_source}[source]
+
+
+def cache_segment(segment: str, source: str, lr=None) -> CanSegment:
+  if lr is None:
+    from openpilot.tools.lib.logreader import LogReader
+    lr = LogReader(segment, default_source=get_log_source(source))
+  can_segment = CanSegment.from_logreader(lr)
+  can_segment.save(get_cache_path(segment, source))
+  return can_segment
+
+
+def get_segment(segment: str, source: str) -> CanSegment:
+  """CAN data of a segment, from the cache or extracted from its logs the first time"""
+  can_segment = load_cached_segment(segment, source)
+  if can_segment is None:
+    can_segment = cache_segment(segment, source)
+  return can_segment
+
+
+def get_test_segments(test_route, internal: bool = False) -> list[tuple[str, str, bool]]:
+  """Segments and log sources test_models tries for a test route in order, and whether they're on the CI bucket"""
+  test_segs = (2, 1, 0) if test_route.segment is None else (test_route.segment,)
+  segments = [f"{test_route.route}/{seg}" for seg in test_segs]
+  if internal:
+    return [(segment, 'internal', True) for segment in segments]
+
+  # Route is not in CI bucket, assume either user has access (private), or it is public
+  return [(segment, 'openpilotci', True) for segment in segments] + [(segment, 'auto', False) for segment in segments]
+
+
+def cache_test_route(test_route, internal: bool = False) -> str | None:
+  """Caches the segment of a test route test_models would use, returns an error if none was found"""
+  error = None
+  for segment, source, _ in get_test_segments(test_route, internal):
+    try:
+      if get_segment(segment, source).num_packets > MIN_CAN_PACKETS:
+        return None
+      error = f"not enough CAN data in {segment}"
+    except Exception as e:
+      error = repr(e)
+  return error
+
+
+if __name__ == "__main__":
+  from multiprocessing import Pool
+  from openpilot.common.basedir import BASEDIR
+  from openpilot.selfdrive.car.tests.routes import CarTestRoute, routes
+  from openpilot.selfdrive.test.helpers import read_segment_list
+  from openpilot.tools.lib.route import SegmentName
+
+  parser = argparse.ArgumentParser(description="Cache the CAN data of test routes for test_models",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--jobs", type=int, default=1)
+  parser.add_argument("--internal-seg-list", default=os.environ.get("INTERNAL_SEG_LIST", ""),
+                      help="cache the segments of this list from the internal source, like test_models with INTERNAL_SEG_LIST")
+  args = parser.parse_args()
+
+  internal = len(args.internal_seg_list) > 0
+  if internal:
+    routes = [CarTestRoute(SegmentName(segment).route_name.canonical_name, platform, segment=SegmentName(segment).segment_num)
+              for platform, segment in read_segment_list(os.path.join(BASEDIR, args.internal_seg_list))]
+
+  with Pool(args.jobs) as pool:
+    errors = list(tqdm(pool.imap(partial(cache_test_route, internal=internal), routes), total=len(routes)))
+
+  for test_route, error in zip(routes, errors, strict=True):
+    if error is not None:
+      print(f"failed to cache {test_route.route}: {error}")
+  print(f"cached {errors.count(None)}/{len(routes)} test routes in {CAN_CACHE_DIR}")
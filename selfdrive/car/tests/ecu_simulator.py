@@ -0,0 +1,197 @@
+"""Pure Python stand-in for pandad and a set of ECUs answering ISO-TP queries.
+
+Plugs into anything taking a sendcan and logcan socket, such as IsoTpParallelQuery, so
+queries can be tested and benchmarked without a car:
+
+  sim = EcuSimulator([SimulatedEcu(0x7e0, responses={b'\\x22\\xf1\\x88': b'\\x62\\xf1\\x88' + fw})])
+  IsoTpParallelQuery(sim.sendcan, sim.logcan, 0, [0x7e0], [b'\\x22\\xf1\\x88'], [b'\\x62\\xf1\\x88']).get_data(0.1)
+"""
+import heapq
+import itertools
+import random
+import time
+from dataclasses import dataclass, field
+
+import cereal.messaging as messaging
+from openpilot.selfdrive.car.fw_query_definitions import FwQueryConfig
+from panda.python.uds import FUNCTIONAL_ADDRS, get_rx_addr_for_tx_addr
+
+CAN_PERIOD = 0.01  # pandad publishes received CAN at 100Hz
+
+# UDS read data by identifier of the application software identification, as queried for FW versions
+REQUEST = b'\x22\xf1\x88'
+RESPONSE = b'\x62\xf1\x88'
+
+
+@dataclass
+class SimulatedEcu:
+  addr: int
+  sub_addr: int | None = None
+  bus: int = 0
+  # full response payload for each supported request payload, other requests are ignored
+  responses: dict[bytes, bytes] = field(default_factory=dict)
+  rx_offset: int = 0x8
+  # delay between a request and the first frame of its response
+  response_time: float = 0.005
+  # minimum delay between consecutive frames of a multi-frame response
+  separation_time: float = 0.
+
+  @property
+  def rx_addr(self) -> int:
+    return get_rx_addr_for_tx_addr(self.addr, self.rx_offset)
+
+  @property
+  def max_len(self) -> int:
+    return 8 if self.sub_addr is None else 7
+
+
+def get_car_ecus(config: FwQueryConfig, fw_versions: dict[tuple[int, int, int | None], list[bytes]]) -> list[SimulatedEcu]:
+  """ECUs of a car answering the requests of its brand's FW query config with their first FW version"""
+  ecus: dict[tuple[int, int, int | None], SimulatedEcu] = {}
+  for (ecu_type, addr, sub_addr), versions in fw_versions.items():
+    for r in config.requests:
+      if len(r.whitelist_ecus) and ecu_type not in r.whitelist_ecus:
+        continue
+
+      ecu = ecus.setdefault((r.bus, addr, sub_addr), SimulatedEcu(addr, sub_addr, r.bus, rx_offset=r.rx_offset))
+      for request, response in zip(r.request[:-1], r.response[:-1], strict=True):
+        ecu.responses.setdefault(request, response)
+      ecu.responses.setdefault(r.request[-1], r.response[-1] + versions[0])
+
+  return list(ecus.values())
+
+
+def make_ecus(bus: int, count: int, sub_addrs: bool = False, response_lens: tuple[int, ...] = (2, 16, 40),
+              max_response_time: float = SimulatedEcu.response_time) -> list[SimulatedEcu]:
+  """ECUs at 0x700 onwards, or subaddresses of 0x750, answering REQUEST with random FW versions of response_lens"""
+  ecus = []
+  for i in range(count):
+    addr, sub_addr = (0x750, i) if sub_addrs else (0x700 + i, None)
+    # mix single frame and multi-frame responses
+    fw = bytes(random.choices(b'0123456789ABCDEF', k=random.choice(response_lens)))
+    ecus.append(SimulatedEcu(addr, sub_addr, bus, responses={REQUEST: RESPONSE + fw}, response_time=max_response_time * random.random()))
+  return ecus
+
+
+class SimulatedSubSocket:
+  def __init__(self, sim: 'EcuSimulator'):
+    self.sim = sim
+
+  def receive(self, non_blocking: bool = False) -> bytes | None:
+    return self.sim.receive(non_blocking)
+
+
+class SimulatedPubSocket:
+  def __init__(self, sim: 'EcuSimulator'):
+    self.sim = sim
+
+  def send(self, dat: bytes) -> None:
+    self.sim.send(dat)
+
+
+class EcuSimulator:
+  def __init__(self, ecus: list[SimulatedEcu], can_period: float = CAN_PERIOD):
+    self.ecus = {(ecu.bus, ecu.addr, ecu.sub_addr): ecu for ecu in ecus}
+    self.can_period = can_period
+    self.sendcan = SimulatedPubSocket(self)
+    self.logcan = SimulatedSubSocket(self)
+
+    # frames to publish: (publish time, sequence, address, data, bus)
+    self._pending: list[tuple[float, int, int, bytes, int]] = []
+    self._seq = itertools.count()
+    # remaining consecutive frames of multi-frame responses, sent once flow control is received
+    self._awaiting_flow_control: dict[tuple[int, int, int | None], list[bytes]] = {}
+    self._next_publish = time.monotonic()
+
+    self.requests_received = 0
+    self.frames_sent = 0
+
+  def _queue(self, t: float, ecu: SimulatedEcu, payload: bytes) -> None:
+    if ecu.sub_addr is not None:
+      payload = bytes([ecu.sub_addr]) + payload
+    heapq.heappush(self._pending, (t, next(self._seq), ecu.rx_addr, payload.ljust(8, b'\x00'), ecu.bus))
+    self.frames_sent += 1
+
+  def _respond(self, ecu: SimulatedEcu, request: bytes) -> None:
+    self.requests_received += 1
+    response = ecu.responses.get(request)
+    if response is None:
+      return
+
+    t = time.monotonic() + ecu.response_time
+    max_len = ecu.max_len
+    if len(response) < max_len:
+      self._queue(t, ecu, bytes([len(response)]) + response)
+      return
+
+    first_len = max_len - 2
+    self._queue(t, ecu, bytes([0x10 | (len(response) >> 8), len(response) & 0xFF]) + response[:first_len])
+    chunk = max_len - 1
+    self._awaiting_flow_control[(ecu.bus, ecu.addr, ecu.sub_addr)] = [
+      bytes([0x20 | (i + 1) & 0xF]) + response[start:start + chunk]
+      for i, start in enumerate(range(first_len, len(response), chunk))
+    ]
+
+  def _flow_control(self, ecu: SimulatedEcu, data: bytes) -> None:
+    # only continue to send is supported, wait keeps the response pending
+    if data[0] != 0x30:
+      return
+    frames = self._awaiting_flow_control.pop((ecu.bus, ecu.addr, ecu.sub_addr), None)
+    if frames is None:
+      return
+
+    # separation time in ms, or 100-900 us
+    st_min = data[2] / 1000. if data[2] <= 0x7F else (data[2] - 0xF0) / 10000.
+    separation_time = max(ecu.separation_time, st_min)
+    t = time.monotonic()
+    for frame in frames:
+      t += separation_time
+      self._queue(t, ecu, frame)
+
+  def _handle_frame(self, addr: int, dat: bytes, bus: int) -> None:
+    if addr in FUNCTIONAL_ADDRS:
+      # functional requests are answered by every ECU without a subaddress using the same addressing
+      extended = addr > 0x7FF
+      targets = [(ecu, dat) for (ecu_bus, ecu_addr, sub_addr), ecu in self.ecus.items()
+                 if ecu_bus == bus and sub_addr is None and (ecu_addr > 0x7FF) == extended]
+    else:
+      targets = []
+      if (ecu := self.ecus.get((bus, addr, None))) is not None:
+        targets.append((ecu, dat))
+      if len(dat) and (ecu := self.ecus.get((bus, addr, dat[0]))) is not None:
+        targets.append((ecu, dat[1:]))
+
+    for ecu, data in targets:
+      if not len(data):
+        continue
+      frame_type = data[0] >> 4
+      if frame_type == 0x0:
+        self._respond(ecu, data[1:1 + (data[0] & 0xF)])
+      elif frame_type == 0x3:
+        self._flow_control(ecu, data)
+      # multi-frame requests are not used to query FW versions
+
+  def send(self, dat: bytes) -> None:
+    for frame in messaging.log_from_bytes(dat).sendcan:
+      self._handle_frame(frame.address, bytes(frame.dat), frame.src)
+
+  def receive(self, non_blocking: bool = False) -> bytes | None:
+    now = time.monotonic()
+    if now < self._next_publish:
+      if non_blocking:
+        return None
+      time.sleep(self._next_publish - now)
+      now = time.monotonic()
+    self._next_publish = max(self._next_publish + self.can_period, now)
+
+    frames = []
+    while len(self._pending) and self._pending[0][0] <= now:
+      _, _, addr, dat, bus = heapq.heappop(self._pending)
+      frames.append((addr, dat, bus))
+
+    msg = messaging.new_message('can', len(frames))
+    for i, (addr, dat, bus) in enumerate(frames):
+      msg.can[i].address = addr
+      msg.can[i].dat = dat
+      msg.can[i].src = bus
+    return msg.to_bytes()
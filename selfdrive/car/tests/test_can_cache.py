@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from cereal import car, log, messaging
+from openpilot.selfdrive.car.tests import can_cache
+from openpilot.selfdrive.car.tests.can_cache import CanSegment
+from openpilot.selfdrive.debug.benchmark_car_state import benchmark_platform, get_car_interface, get_platforms, synthetic_can_stream
+
+SafetyModel = car.CarParams.SafetyModel
+
+
+def make_log(num_packets: int) -> list:
+  random.seed(0)
+  msgs = []
+  for i in range(num_packets):
+    if i == 10:
+      msg = messaging.new_message('pandaStates', 1)
+      msg.pandaStates[0].safetyModel = SafetyModel.noOutput
+      msgs.append(msg.as_reader())
+    elif i == 20:
+      msg = messaging.new_message('carParams')
+      msg.carParams.carFingerprint = 'HONDA_CIVIC'
+      msg.carParams.carFw = [car.CarParams.CarFw(ecu='eps', address=0x18da30f1, fwVersion=b'39990-TBA-A030\x00\x00')]
+      msgs.append(msg.as_reader())
+    elif i == 30:
+      msg = messaging.new_message('pandaStates', 1)
+      msg.pandaStates[0].safetyModel = SafetyModel.hondaNidec
+      msgs.append(msg.as_reader())
+
+    frames = [log.CanData(address=random.randint(0, 0x7ff), src=random.choice((0, 1, 2, 128)),
+                          dat=bytes(random.choices(range(256), k=random.choice((0, 5, 8, 64)))))
+              for _ in range(random.randint(0, 10))]
+    msg = messaging.new_message('can', len(frames), logMonoTime=i * 10_000_000)
+    msg.can = frames
+    msgs.append(msg.as_reader())
+  return msgs
+
+
+class TestCanCache:
+  def test_round_trip(self, tmp_path):
+    lr = make_log(100)
+    path = str(tmp_path / "segment.npz")
+    CanSegment.from_logreader(lr).save(path)
+    segment = CanSegment.load(path)
+
+    can_msgs = [msg for msg in lr if msg.which() == 'can']
+    assert segment.num_packets == len(can_msgs)
+    assert segment.get_can_bytes() == [msg.as_builder().to_bytes() for msg in can_msgs]
+    for cached, msg in zip(segment.get_can_msgs(), can_msgs, strict=True):
+      assert cached.logMonoTime == msg.logMonoTime
+      assert [(m.address, m.src, m.dat) for m in cached.can] == [(m.address, m.src, m.dat) for m in msg.can]
+
+    assert segment.car_fingerprint == 'HONDA_CIVIC'
+    assert [fw.fwVersion for fw in segment.car_fw] == [b'39990-TBA-A030\x00\x00']
+    assert not segment.experimental_long
+    assert (segment.elm_frame, segment.car_safety_mode_frame) == (10, 30)
+
+  def test_fingerprint(self):
+    lr = make_log(50)
+    fingerprint = {0: {}, 1: {}, 2: {}}
+    for msg in [msg for msg in lr if msg.which() == 'can'][:20]:
+      for m in msg.can:
+        if m.src < 64:
+          fingerprint[m.src][m.address] = len(m.dat)
+
+    segment_fingerprint = CanSegment.from_logreader(lr).get_fingerprint(20)
+    assert {src: addrs for src, addrs in segment_fingerprint.items() if len(addrs)} == {src: addrs for src, addrs in fingerprint.items() if len(addrs)}
+
+  @pytest.mark.parametrize("contents", [b"", b"not a zip", "truncated"])
+  def test_corrupt_cache(self, tmp_path, monkeypatch, contents):
+    monkeypatch.setattr(can_cache, "CAN_CACHE_DIR", str(tmp_path))
+    lr = make_log(50)
+    path = can_cache.get_cache_path("segment", "source")
+    CanSegment.from_logreader(lr).save(path)
+    if contents == "truncated":
+      with open(path, "rb") as f:
+        contents = f.read()[:-100]
+    with open(path, "wb") as f:
+      f.write(contents)
+
+    assert can_cache.load_cached_segment("segment", "source") is None
+    can_cache.cache_segment("segment", "source", lr)
+    assert can_cache.load_cached_segment("segment", "source").num_packets == 50
+
+  def test_benchmark_car_state_logs(self, mocker):
+    # benchmark_car_state replays the testing data of test_models, check it still reads it
+    platform = get_platforms(['ford'])[0]
+    CP = messaging.new_message('carParams')
+    CP.carParams.carFingerprint = platform
+    stream = synthetic_can_stream(get_car_interface(platform), 2.)
+    segment = CanSegment.from_logreader([CP.as_reader()] + [messaging.log_from_bytes(dat) for dat in stream])
+
+    mocker.patch("openpilot.selfdrive.car.tests.test_models.MIN_CAN_PACKETS", 100)
+    mocker.patch("openpilot.selfdrive.car.tests.test_models.get_segment", return_value=segment)
+    assert benchmark_platform(platform, 'logs', 0.)['packets'] == len(stream)
@@ -1,8 +1,11 @@
+import random
+
 from parameterized import parameterized
 
 from cereal import log, messaging
 from openpilot.selfdrive.car.car_helpers import FRAME_FINGERPRINT, can_fingerprint
-from openpilot.selfdrive.car.fingerprints import _FINGERPRINTS as FINGERPRINTS
+from openpilot.selfdrive.car.fingerprints import _DEBUG_ADDRESS, _FINGERPRINTS as FINGERPRINTS, all_legacy_fingerprint_cars, \
+                                                 eliminate_incompatible_cars, is_valid_for_fingerprint
 
 
 class TestCanFingerprint:
@@ -24,6 +27,16 @@ class TestCanFingerprint:
       assert finger[1] == fingerprint
       assert finger[2] == {}
 
+  def test_eliminate_incompatible_cars(self):
+    """Compares the fingerprint index against checking every fingerprint of every car"""
+    random.seed(0)
+    addresses = list({adr for fingerprints in FINGERPRINTS.values() for fp in fingerprints for adr in fp} | {0x800, 0x18daf110})
+    for _ in range(1000):
+      msg = log.CanData(address=random.choice(addresses), dat=b'\x00' * random.randint(0, 8))
+      candidates = random.sample(all_legacy_fingerprint_cars(), 20)
+      expected = [car for car in candidates if any(is_valid_for_fingerprint(msg, fp | _DEBUG_ADDRESS) for fp in FINGERPRINTS[car])]
+      assert eliminate_incompatible_cars(msg, candidates) == expected
+
   def test_timing(self, subtests):
     # just pick any CAN fingerprinting car
     car_model = "CHEVROLET_BOLT_EUV"
@@ -3,6 +3,7 @@ import math
 import hypothesis.strategies as st
 from hypothesis import Phase, given, settings
 import importlib
+from difflib import SequenceMatcher
 from parameterized import parameterized
 
 from cereal import car, messaging
@@ -11,7 +12,7 @@ from openpilot.selfdrive.car import gen_empty_fingerprint
 from openpilot.selfdrive.car.car_helpers import interfaces
 from openpilot.selfdrive.car.fingerprints import all_known_cars
 from openpilot.selfdrive.car.fw_versions import FW_VERSIONS, FW_QUERY_CONFIGS
-from openpilot.selfdrive.car.interfaces import get_interface_attr
+from openpilot.selfdrive.car.interfaces import get_interface_attr, get_nn_model_index, match_nn_model
 from openpilot.selfdrive.controls.lib.latcontrol_angle import LatControlAngle
 from openpilot.selfdrive.controls.lib.latcontrol_pid import LatControlPID
 from openpilot.selfdrive.controls.lib.latcontrol_torque import LatControlTorque
@@ -161,3 +162,16 @@ class TestCarInterfaces:
     ret = get_interface_attr('FINGERPRINTS', ignore_none=True)
     none_brands_in_ret = none_brands.intersection(ret)
     assert len(none_brands_in_ret) == 0, f'Brands with None values in ignore_none=True result: {none_brands_in_ret}'
+
+  def test_nn_model_match(self):
+    """Asserts the NN model lookup finds the model with the most similar name"""
+    nn_models = get_nn_model_index()
+    assert len(nn_models) > 0
+
+    for model, path in nn_models.items():
+      assert match_nn_model(model) == (path, 1.0)
+
+    for check_model in ('HONDA_CIVIC b\'39990-TBA-A030x00x00\'', 'TOYOTA_RAV4_TSS2_2023', 'MAZDA_CX9', 'NOT_A_CAR'):
+      scores = [(SequenceMatcher(None, model, check_model).ratio(), path) for model, path in nn_models.items()]
+      best_score = max(score for score, _ in scores)
+      assert match_nn_model(check_model) == (next(path for score, path in scores if score == best_score), best_score)
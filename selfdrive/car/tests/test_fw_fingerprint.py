@@ -7,8 +7,10 @@ from parameterized import parameterized
 from cereal import car
 from openpilot.selfdrive.car.car_helpers import interfaces
 from openpilot.selfdrive.car.fingerprints import FW_VERSIONS
-from openpilot.selfdrive.car.fw_versions import ESSENTIAL_ECUS, FW_QUERY_CONFIGS, FUZZY_EXCLUDE_ECUS, VERSIONS, build_fw_dict, \
-                                                match_fw_to_car, get_brand_ecu_matches, get_fw_versions, get_present_ecus
+from openpilot.selfdrive.car.fw_versions import ESSENTIAL_ECUS, FW_QUERY_CONFIGS, FUZZY_EXCLUDE_ECUS, MODEL_TO_BRAND, VERSIONS, build_fw_dict, \
+                                                match_fw_to_car, get_brand_ecu_matches, get_fw_match_index, get_fw_versions, \
+                                                get_fw_versions_ordered, get_present_ecus, schedule_fw_queries, get_fw_queries
+from openpilot.selfdrive.car.tests.ecu_simulator import EcuSimulator, get_car_ecus
 from openpilot.selfdrive.car.vin import get_vin
 
 CarFw = car.CarParams.CarFw
@@ -111,6 +113,15 @@ class TestFwFingerprint:
             assert not len(duplicates), f'{car_model}: Duplicate FW versions: Ecu.{ECU_NAME[ecu[0]]}, {duplicates}'
             assert len(ecu_fw) > 0, f'{car_model}: No FW versions: Ecu.{ECU_NAME[ecu[0]]}'
 
+  def test_fw_match_index(self):
+    index = get_fw_match_index()
+    assert get_fw_match_index() is index, "match index should only be built once"
+    for car_model, ecus in FW_VERSIONS.items():
+      for (ecu, addr, sub_addr), ecu_fw in ecus.items():
+        for fw in ecu_fw:
+          assert (car_model, ecu) in index.exact[(addr, sub_addr, fw)]
+          assert (car_model in index.fuzzy[(addr, sub_addr, fw)]) == (ecu not in FUZZY_EXCLUDE_ECUS)
+
   def test_all_addrs_map_to_one_ecu(self):
     for brand, cars in VERSIONS.items():
       addr_to_ecu = defaultdict(set)
@@ -202,6 +213,28 @@ class TestFwFingerprint:
     expected_response = empty_response | {'toyota': {(0x750, 0xf)}}
     assert get_brand_ecu_matches({(0x758, 0xf, 99)}) == expected_response
 
+  def test_fw_query_schedule(self):
+    for num_pandas in (1, 2):
+      queries = get_fw_queries(num_pandas=num_pandas)
+      rounds = schedule_fw_queries(queries)
+      # every query is run once, in order
+      assert [q for r in rounds for q in r] == queries
+      for round_queries in rounds:
+        for i, query in enumerate(round_queries):
+          assert not any(query.conflicts(other) for other in round_queries[:i])
+        assert len({q.request.obd_multiplexing for q in round_queries if q.request.bus % 4 == 1}) <= 1
+
+  @pytest.mark.parametrize('car_model', ['TOYOTA_RAV4_TSS2', 'HYUNDAI_SONATA', 'HONDA_CIVIC_BOSCH'])
+  def test_simulated_ecus(self, car_model, mocker):
+    mocker.patch("openpilot.selfdrive.car.fw_versions.set_obd_multiplexing")
+    config = FW_QUERY_CONFIGS[MODEL_TO_BRAND[car_model]]
+    sim = EcuSimulator(get_car_ecus(config, FW_VERSIONS[car_model]))
+    ecu_rx_addrs = {(ecu.rx_addr, ecu.sub_addr, ecu.bus) for ecu in sim.ecus.values()}
+
+    car_fw = get_fw_versions_ordered(sim.logcan, sim.sendcan, '', ecu_rx_addrs, num_pandas=2)
+    _, matches = match_fw_to_car(car_fw, '', allow_fuzzy=False)
+    assert matches == {car_model}
+
 
 class TestFwFingerprintTiming:
   N: int = 5
@@ -221,11 +254,16 @@ class TestFwFingerprintTiming:
     self.total_time += timeout
     return {}
 
+  def fake_get_data_concurrent(self, queries, timeout):
+    """Queries in a round run at the same time"""
+    self.total_time += timeout
+    return [{} for _ in queries]
+
   def _benchmark_brand(self, brand, num_pandas, mocker):
     fake_socket = FakeSocket()
     self.total_time = 0
     mocker.patch("openpilot.selfdrive.car.fw_versions.set_obd_multiplexing", self.fake_set_obd_multiplexing)
-    mocker.patch("openpilot.selfdrive.car.isotp_parallel_query.IsoTpParallelQuery.get_data", self.fake_get_data)
+    mocker.patch("openpilot.selfdrive.car.fw_versions.get_data_concurrent", self.fake_get_data_concurrent)
     for _ in range(self.N):
       # Treat each brand as the most likely (aka, the first) brand with OBD multiplexing initially on
       self.current_obd_multiplexing = True
@@ -269,26 +307,26 @@ class TestFwFingerprintTiming:
         print(f'get_vin {name} case, query time={self.total_time / self.N} seconds')
 
   def test_fw_query_timing(self, subtests, mocker):
-    total_ref_time = {1: 7.2, 2: 7.8}
+    total_ref_time = {1: 5.8, 2: 6.0}
     brand_ref_times = {
       1: {
         'gm': 1.0,
         'body': 0.1,
         'chrysler': 0.3,
-        'ford': 1.5,
-        'honda': 0.45,
-        'hyundai': 0.65,
+        'ford': 1.4,
+        'honda': 0.35,
+        'hyundai': 0.35,
         'mazda': 0.1,
-        'nissan': 0.8,
-        'subaru': 0.65,
-        'tesla': 0.3,
-        'toyota': 0.7,
-        'volkswagen': 0.65,
+        'nissan': 0.7,
+        'subaru': 0.45,
+        'tesla': 0.2,
+        'toyota': 0.6,
+        'volkswagen': 0.25,
       },
       2: {
-        'ford': 1.6,
-        'hyundai': 1.15,
-        'tesla': 0.3,
+        'ford': 1.4,
+        'hyundai': 0.55,
+        'tesla': 0.2,
       }
     }
 
@@ -0,0 +1,38 @@
+import random
+
+from openpilot.selfdrive.car.isotp_parallel_query import IsoTpParallelQuery
+from openpilot.selfdrive.car.tests.ecu_simulator import REQUEST, RESPONSE, EcuSimulator, make_ecus
+from panda.python.uds import FUNCTIONAL_ADDRS
+
+
+class TestIsoTpParallelQuery:
+  def setup_method(self):
+    random.seed(0)
+
+  def test_physical_query(self):
+    ecus = make_ecus(0, 16)
+    sim = EcuSimulator(ecus)
+    query = IsoTpParallelQuery(sim.sendcan, sim.logcan, 0, [ecu.addr for ecu in ecus] + [0x7ff], [REQUEST], [RESPONSE])
+    results = query.get_data(0.1)
+
+    assert results == {(ecu.addr, None): ecu.responses[REQUEST][len(RESPONSE):] for ecu in ecus}
+
+  def test_sub_addr_query(self):
+    # subaddressed ECUs share a response address, so responses have to be routed to the right query
+    ecus = make_ecus(1, 4, sub_addrs=True)
+    sim = EcuSimulator(ecus)
+    addrs = [(ecu.addr, ecu.sub_addr) for ecu in ecus]
+    for addr in addrs:
+      results = IsoTpParallelQuery(sim.sendcan, sim.logcan, 1, [addr], [REQUEST], [RESPONSE]).get_data(0.1)
+      assert results == {addr: sim.ecus[(1, *addr)].responses[REQUEST][len(RESPONSE):]}
+
+  def test_functional_query(self):
+    ecus = make_ecus(0, 8)
+    # ECUs on other buses should not respond
+    sim = EcuSimulator(ecus + make_ecus(1, 8))
+    query = IsoTpParallelQuery(sim.sendcan, sim.logcan, 0, [ecu.addr for ecu in ecus], [REQUEST], [RESPONSE],
+                               functional_addrs=FUNCTIONAL_ADDRS)
+    results = query.get_data(0.1)
+
+    assert results == {(ecu.addr, None): ecu.responses[REQUEST][len(RESPONSE):] for ecu in ecus}
+    assert sim.requests_received == len(ecus)
@@ -13,16 +13,15 @@ from cereal import messaging, log, car
 from openpilot.common.basedir import BASEDIR
 from openpilot.common.params import Params
 from openpilot.common.realtime import DT_CTRL
-from openpilot.selfdrive.car import gen_empty_fingerprint
 from openpilot.selfdrive.car.card import Car
 from openpilot.selfdrive.car.fingerprints import all_known_cars, MIGRATION
 from openpilot.selfdrive.car.car_helpers import FRAME_FINGERPRINT, interfaces
 from openpilot.selfdrive.car.honda.values import CAR as HONDA, HondaFlags
+from openpilot.selfdrive.car.tests.can_cache import MIN_CAN_PACKETS, CanSegment, get_segment, get_test_segments
 from openpilot.selfdrive.car.tests.routes import non_tested_cars, routes, CarTestRoute
 from openpilot.selfdrive.car.values import Platform
 from openpilot.selfdrive.test.helpers import read_segment_list
 from openpilot.system.hardware.hw import DEFAULT_DOWNLOAD_CACHE_ROOT
-from openpilot.tools.lib.logreader import LogReader, internal_source, openpilotci_source
 from openpilot.tools.lib.route import SegmentName
 
 from panda.tests.libpanda import libpanda_py
@@ -69,85 +68,40 @@ class TestCarModelBase(unittest.TestCase):
   test_route_on_bucket: bool = True  # whether the route is on the preserved CI bucket
 
   can_msgs: list[capnp.lib.capnp._DynamicStructReader]
+  can_bytes: list[bytes]  # serialized can_msgs, for the interfaces
   fingerprint: dict[int, dict[int, int]]
   elm_frame: int | None
   car_safety_mode_frame: int | None
 
   @classmethod
-  def get_testing_data_from_logreader(cls, lr):
-    car_fw = []
-    can_msgs = []
-    cls.elm_frame = None
-    cls.car_safety_mode_frame = None
-    cls.fingerprint = gen_empty_fingerprint()
-    experimental_long = False
-    for msg in lr:
-      if msg.which() == "can":
-        can_msgs.append(msg)
-        if len(can_msgs) <= FRAME_FINGERPRINT:
-          for m in msg.can:
-            if m.src < 64:
-              cls.fingerprint[m.src][m.address] = len(m.dat)
-
-      elif msg.which() == "carParams":
-        car_fw = msg.carParams.carFw
-        if msg.carParams.openpilotLongitudinalControl:
-          experimental_long = True
-        if cls.platform is None and not cls.test_route_on_bucket:
-          live_fingerprint = msg.carParams.carFingerprint
-          cls.platform = MIGRATION.get(live_fingerprint, live_fingerprint)
-
-      # Log which can frame the panda safety mode left ELM327, for CAN validity checks
-      elif msg.which() == 'pandaStates':
-        for ps in msg.pandaStates:
-          if cls.elm_frame is None and ps.safetyModel != SafetyModel.elm327:
-            cls.elm_frame = len(can_msgs)
-          if cls.car_safety_mode_frame is None and ps.safetyModel not in \
-            (SafetyModel.elm327, SafetyModel.noOutput):
-            cls.car_safety_mode_frame = len(can_msgs)
-
-      elif msg.which() == 'pandaStateDEPRECATED':
-        if cls.elm_frame is None and msg.pandaStateDEPRECATED.safetyModel != SafetyModel.elm327:
-          cls.elm_frame = len(can_msgs)
-        if cls.car_safety_mode_frame is None and msg.pandaStateDEPRECATED.safetyModel not in \
-          (SafetyModel.elm327, SafetyModel.noOutput):
-          cls.car_safety_mode_frame = len(can_msgs)
-
-    if len(can_msgs) > int(50 / DT_CTRL):
-      return car_fw, can_msgs, experimental_long
+  def get_testing_data_from_segment(cls, segment: CanSegment):
+    cls.elm_frame = segment.elm_frame
+    cls.car_safety_mode_frame = segment.car_safety_mode_frame
+    cls.fingerprint = segment.get_fingerprint(FRAME_FINGERPRINT)
+    if cls.platform is None and not cls.test_route_on_bucket and segment.car_fingerprint:
+      cls.platform = MIGRATION.get(segment.car_fingerprint, segment.car_fingerprint)
+
+    if segment.num_packets > MIN_CAN_PACKETS:
+      return segment.car_fw, segment.get_can_bytes(), segment.experimental_long
 
     raise Exception("no can data found")
 
   @classmethod
-  def get_testing_data(cls):
-    test_segs = (2, 1, 0)
-    if cls.test_route.segment is not None:
-      test_segs = (cls.test_route.segment,)
-
-    is_internal = len(INTERNAL_SEG_LIST)
-
-    for seg in test_segs:
-      segment_range = f"{cls.test_route.route}/{seg}"
+  def get_testing_data_from_logreader(cls, lr):
+    return cls.get_testing_data_from_segment(CanSegment.from_logreader(lr))
 
+  @classmethod
+  def get_testing_data(cls):
+    # CAN data is replayed from the cache, and extracted from the logs the first time
+    for segment, source, on_bucket in get_test_segments(cls.test_route, internal=len(INTERNAL_SEG_LIST) > 0):
+      # routes only found off the CI bucket fail test_route_on_ci_bucket when running in CI
+      cls.test_route_on_bucket = on_bucket
       try:
-        lr = LogReader(segment_range, default_source=internal_source if is_internal else openpilotci_source)
-        return cls.get_testing_data_from_logreader(lr)
+        return cls.get_testing_data_from_segment(get_segment(segment, source))
       except Exception:
         pass
 
-    # Route is not in CI bucket, assume either user has access (private), or it is public
-    # test_route_on_ci_bucket will fail when running in CI
-    if not is_internal:
-      cls.test_route_on_bucket = False
-
-      for seg in test_segs:
-        segment_range = f"{cls.test_route.route}/{seg}"
-        try:
-          lr = LogReader(segment_range)
-          return cls.get_testing_data_from_logreader(lr)
-        except Exception:
-          pass
-
+    test_segs = (2, 1, 0) if cls.test_route.segment is None else (cls.test_route.segment,)
     raise Exception(f"Route: {repr(cls.test_route.route)} with segments: {test_segs} not found or no CAN msgs found. Is it uploaded and public?")
 
 
@@ -162,12 +116,14 @@ class TestCarModelBase(unittest.TestCase):
         raise unittest.SkipTest
       raise Exception(f"missing test route for {cls.platform}")
 
-    car_fw, can_msgs, experimental_long = cls.get_testing_data()
+    car_fw, can_bytes, experimental_long = cls.get_testing_data()
 
     # if relay is expected to be open in the route
     cls.openpilot_enabled = cls.car_safety_mode_frame is not None
 
-    cls.can_msgs = sorted(can_msgs, key=lambda msg: msg.logMonoTime)
+    can_msgs = sorted(((messaging.log_from_bytes(dat), dat) for dat in can_bytes), key=lambda m: m[0].logMonoTime)
+    cls.can_msgs = [msg for msg, _ in can_msgs]
+    cls.can_bytes = [dat for _, dat in can_msgs]
 
     cls.CarInterface, cls.CarController, cls.CarState = interfaces[cls.platform]
     cls.CP = cls.CarInterface.get_params(cls.platform,  cls.fingerprint, car_fw, experimental_long, docs=False)
@@ -179,6 +135,7 @@ class TestCarModelBase(unittest.TestCase):
   @classmethod
   def tearDownClass(cls):
     del cls.can_msgs
+    del cls.can_bytes
 
   def setUp(self):
     self.CI = self.CarInterface(self.CP.copy(), self.CarController, self.CarState)
@@ -216,8 +173,8 @@ class TestCarModelBase(unittest.TestCase):
     can_valid = False
     CC = car.CarControl.new_message().as_reader()
 
-    for i, msg in enumerate(self.can_msgs):
-      CS = self.CI.update(CC, (msg.as_builder().to_bytes(),))
+    for i, (msg, dat) in enumerate(zip(self.can_msgs, self.can_bytes, strict=True)):
+      CS = self.CI.update(CC, (dat,))
       self.CI.apply(CC, msg.logMonoTime)
 
       if CS.canValid:
@@ -237,8 +194,8 @@ class TestCarModelBase(unittest.TestCase):
     # Since OBD port is multiplexed to bus 1 (commonly radar bus) while fingerprinting,
     # start parsing CAN messages after we've left ELM mode and can expect CAN traffic
     error_cnt = 0
-    for i, msg in enumerate(self.can_msgs[self.elm_frame:]):
-      rr = RI.update((msg.as_builder().to_bytes(),))
+    for i, dat in enumerate(self.can_bytes[self.elm_frame:]):
+      rr = RI.update((dat,))
       if rr is not None and i > 50:
         error_cnt += car.RadarData.Error.canError in rr.errors
     self.assertEqual(error_cnt, 0)
@@ -396,8 +353,8 @@ class TestCarModelBase(unittest.TestCase):
     CC = car.CarControl.new_message()
 
     # warm up pass, as initial states may be different
-    for can in self.can_msgs[:300]:
-      self.CI.update(CC, (can.as_builder().to_bytes(), ))
+    for can, dat in zip(self.can_msgs[:300], self.can_bytes[:300], strict=True):
+      self.CI.update(CC, (dat, ))
       for msg in filter(lambda m: m.src in range(64), can.can):
         to_send = libpanda_py.make_CANPacket(msg.address, msg.src % 4, msg.dat)
         self.safety.safety_rx_hook(to_send)
@@ -406,8 +363,8 @@ class TestCarModelBase(unittest.TestCase):
     CS_prev = car.CarState.new_message()
     checks = defaultdict(int)
     card = Car(CI=self.CI)
-    for idx, can in enumerate(self.can_msgs):
-      CS = self.CI.update(CC, (can.as_builder().to_bytes(), ))
+    for idx, (can, dat) in enumerate(zip(self.can_msgs, self.can_bytes, strict=True)):
+      CS = self.CI.update(CC, (dat, ))
       for msg in filter(lambda m: m.src in range(64), can.can):
         to_send = libpanda_py.make_CANPacket(msg.address, msg.src % 4, msg.dat)
         ret = self.safety.safety_rx_hook(to_send)
@@ -2,6 +2,7 @@ import re
 from collections import defaultdict
 from dataclasses import dataclass, field
 from enum import Enum, IntFlag
+from functools import cache
 
 from cereal import car
 from openpilot.common.conversions import Conversions as CV
@@ -377,46 +378,57 @@ STATIC_DSU_MSGS = [
 ]
 
 
+@cache
+def get_platform_code(fw: bytes) -> tuple[bytes, bytes] | None:
+  # Returns the Optional[part]-platform-major_version and sub version of a single FW version
+
+  # FW versions returned from UDS queries can return multiple fields/chunks of data (different ECU calibrations, different data?)
+  #  and are prefixed with a byte that describes how many chunks of data there are.
+  # But FW returned from KWP requires querying of each sub-data id and does not have a length prefix.
+
+  length_code = 1
+  length_code_match = FW_LEN_CODE.search(fw)
+  if length_code_match is not None:
+    length_code = length_code_match.group()[0]
+    fw = fw[1:]
+
+  # fw length should be multiple of 16 bytes (per chunk, even if no length code), skip parsing if unexpected length
+  if length_code * FW_CHUNK_LEN != len(fw):
+    return None
+
+  chunks = [fw[FW_CHUNK_LEN * i:FW_CHUNK_LEN * i + FW_CHUNK_LEN].strip(b'\x00 ') for i in range(length_code)]
+
+  # only first is considered for now since second is commonly shared (TODO: understand that)
+  first_chunk = chunks[0]
+  if len(first_chunk) == 8:
+    # TODO: no part number, but some short chunks have it in subsequent chunks
+    fw_match = SHORT_FW_PATTERN.search(first_chunk)
+    if fw_match is not None:
+      platform, major_version, sub_version = fw_match.groups()
+      return b'-'.join((platform, major_version)), sub_version
+
+  elif len(first_chunk) == 10:
+    fw_match = MEDIUM_FW_PATTERN.search(first_chunk)
+    if fw_match is not None:
+      part, platform, major_version, sub_version = fw_match.groups()
+      return b'-'.join((part, platform, major_version)), sub_version
+
+  elif len(first_chunk) == 12:
+    fw_match = LONG_FW_PATTERN.search(first_chunk)
+    if fw_match is not None:
+      part, platform, major_version, sub_version = fw_match.groups()
+      return b'-'.join((part, platform, major_version)), sub_version
+
+  return None
+
+
 def get_platform_codes(fw_versions: list[bytes]) -> dict[bytes, set[bytes]]:
   # Returns sub versions in a dict so comparisons can be made within part-platform-major_version combos
   codes = defaultdict(set)  # Optional[part]-platform-major_version: set of sub_version
   for fw in fw_versions:
-    # FW versions returned from UDS queries can return multiple fields/chunks of data (different ECU calibrations, different data?)
-    #  and are prefixed with a byte that describes how many chunks of data there are.
-    # But FW returned from KWP requires querying of each sub-data id and does not have a length prefix.
-
-    length_code = 1
-    length_code_match = FW_LEN_CODE.search(fw)
-    if length_code_match is not None:
-      length_code = length_code_match.group()[0]
-      fw = fw[1:]
-
-    # fw length should be multiple of 16 bytes (per chunk, even if no length code), skip parsing if unexpected length
-    if length_code * FW_CHUNK_LEN != len(fw):
-      continue
-
-    chunks = [fw[FW_CHUNK_LEN * i:FW_CHUNK_LEN * i + FW_CHUNK_LEN].strip(b'\x00 ') for i in range(length_code)]
-
-    # only first is considered for now since second is commonly shared (TODO: understand that)
-    first_chunk = chunks[0]
-    if len(first_chunk) == 8:
-      # TODO: no part number, but some short chunks have it in subsequent chunks
-      fw_match = SHORT_FW_PATTERN.search(first_chunk)
-      if fw_match is not None:
-        platform, major_version, sub_version = fw_match.groups()
-        codes[b'-'.join((platform, major_version))].add(sub_version)
-
-    elif len(first_chunk) == 10:
-      fw_match = MEDIUM_FW_PATTERN.search(first_chunk)
-      if fw_match is not None:
-        part, platform, major_version, sub_version = fw_match.groups()
-        codes[b'-'.join((part, platform, major_version))].add(sub_version)
-
-    elif len(first_chunk) == 12:
-      fw_match = LONG_FW_PATTERN.search(first_chunk)
-      if fw_match is not None:
-        part, platform, major_version, sub_version = fw_match.groups()
-        codes[b'-'.join((part, platform, major_version))].add(sub_version)
+    code = get_platform_code(fw)
+    if code is not None:
+      codes[code[0]].add(code[1])
 
   return dict(codes)
 
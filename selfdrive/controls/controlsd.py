@@ -14,7 +14,7 @@ from msgq.visionipc import VisionIpcClient, VisionStreamType
 from openpilot.common.conversions import Conversions as CV
 from openpilot.common.git import get_short_branch
 from openpilot.common.numpy_fast import clip
-from openpilot.common.params import Params
+from openpilot.common.params import Params, ParamWatcher
 from openpilot.common.realtime import config_realtime_process, Priority, Ratekeeper, DT_CTRL
 from openpilot.common.swaglog import cloudlog
 
@@ -62,6 +62,9 @@ ENABLED_STATES = (State.preEnabled, *ACTIVE_STATES)
 
 PERSONALITY_MAPPING = {0: 0, 1: 1, 2: 2, 3: 2}
 
+CONTROLSD_PARAMS = ["IsMetric", "ExperimentalMode", "LongitudinalPersonality", "DynamicPersonality", "AccelPersonality",
+                    "JoystickDebugMode", "ReverseAccChange", "DynamicExperimentalControl", "LiveTorque"]
+
 
 class Controls:
   def __init__(self, CI=None):
@@ -916,22 +919,26 @@ class Controls:
     except (ValueError, TypeError):
       return custom.AccelerationPersonality.stock
 
+  def read_params(self):
+    self.is_metric = self.params.get_bool("IsMetric")
+    self.experimental_mode = self.params.get_bool("ExperimentalMode") and self.CP.openpilotLongitudinalControl
+    self.personality = self.read_personality_param()
+    self.dynamic_personality = self.params.get_bool("DynamicPersonality")
+    self.accel_personality = self.read_accel_personality_param()
+    if self.CP.notCar:
+      self.joystick_mode = self.params.get_bool("JoystickDebugMode")
+
+    self.reverse_acc_change = self.params.get_bool("ReverseAccChange")
+    self.dynamic_experimental_control = self.params.get_bool("DynamicExperimentalControl")
+    self.live_torque = self.params.get_bool("LiveTorque")
+
   def params_thread(self, evt):
+    # only re-read params when one of them is written
+    watcher = ParamWatcher(CONTROLSD_PARAMS, self.params)
+    self.read_params()
     while not evt.is_set():
-      self.is_metric = self.params.get_bool("IsMetric")
-      self.experimental_mode = self.params.get_bool("ExperimentalMode") and self.CP.openpilotLongitudinalControl
-      self.personality = self.read_personality_param()
-      self.dynamic_personality = self.params.get_bool("DynamicPersonality")
-      self.accel_personality = self.read_accel_personality_param()
-      if self.CP.notCar:
-        self.joystick_mode = self.params.get_bool("JoystickDebugMode")
-
-      self.reverse_acc_change = self.params.get_bool("ReverseAccChange")
-      self.dynamic_experimental_control = self.params.get_bool("DynamicExperimentalControl")
-
-      if self.sm.frame % int(2.5 / DT_CTRL) == 0:
-        self.live_torque = self.params.get_bool("LiveTorque")
-      time.sleep(0.1)
+      if watcher.wait(0.1):
+        self.read_params()
 
   def controlsd_thread(self):
     e = threading.Event()
@@ -46,16 +46,21 @@ class AlertManager:
 
   def process_alerts(self, frame: int, clear_event_types: set) -> Alert | None:
     current_alert = AlertEntry()
-    for v in self.alerts.values():
+    for alert_type, v in list(self.alerts.items()):
       if not v.alert:
         continue
 
       if v.alert.event_type in clear_event_types:
         v.end_frame = -1
 
+      # an expired entry is reset when its alert is added again, so only active ones need to be kept around
+      if not v.active(frame):
+        del self.alerts[alert_type]
+        continue
+
       # sort by priority first and then by start_frame
       greater = current_alert.alert is None or (v.alert.priority, v.start_frame) > (current_alert.alert.priority, current_alert.start_frame)
-      if v.active(frame) and greater:
+      if greater:
         current_alert = v
 
     return current_alert.alert
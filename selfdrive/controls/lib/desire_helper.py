@@ -1,6 +1,6 @@
 from cereal import log
 from openpilot.common.conversions import Conversions as CV
-from openpilot.common.params import Params
+from openpilot.common.params import Params, ParamWatcher
 from openpilot.common.realtime import DT_MDL
 from openpilot.selfdrive.controls.lib.drive_helpers import get_road_edge
 from openpilot.selfdrive.modeld.custom_model_metadata import CustomModelMetadata, ModelCapabilities
@@ -58,12 +58,11 @@ class DesireHelper:
     self.desire = log.Desire.none
 
     self.param_s = Params()
+    self.param_watcher = ParamWatcher(["RoadEdge", "AutoLaneChangeTimer", "AutoLaneChangeBsmDelay"], self.param_s)
     self.lane_change_wait_timer = 0
     self.prev_lane_change = False
     self.prev_brake_pressed = False
     self.road_edge = False
-    self.param_read_counter = 0
-    self.read_param()
     self.edge_toggle = self.param_s.get_bool("RoadEdge")
     self.lane_change_set_timer = int(self.param_s.get("AutoLaneChangeTimer", encoding="utf8"))
     self.lane_change_bsm_delay = self.param_s.get_bool("AutoLaneChangeBsmDelay")
@@ -78,9 +77,8 @@ class DesireHelper:
     self.lane_change_bsm_delay = self.param_s.get_bool("AutoLaneChangeBsmDelay")
 
   def update(self, carstate, lateral_active, lane_change_prob, model_data=None, lat_plan_sp=None):
-    if self.param_read_counter % 50 == 0:
+    if self.param_watcher.poll():
       self.read_param()
-    self.param_read_counter += 1
     lane_change_auto_timer = AUTO_LANE_CHANGE_TIMER.get(self.lane_change_set_timer, 2.0)
     v_ego = carstate.vEgo
     one_blinker = carstate.leftBlinker != carstate.rightBlinker
@@ -48,10 +48,18 @@ EVENT_NAME = {v: k for k, v in EventName.schema.enumerants.items()}
 
 
 class Events:
+  """Set of active events, kept both as a sorted list of names and as a bitmask indexed by EventName.
+
+  The bitmask makes `contains` a single AND against the precomputed EVENT_TYPE_MASKS,
+  the names list keeps duplicates and ordering for alerts and `to_msg`.
+  """
   def __init__(self):
     self.events: list[int] = []
     self.static_events: list[int] = []
-    self.event_counters = dict.fromkeys(EVENTS.keys(), 0)
+    self.mask = 0
+    self.static_mask = 0
+    # consecutive clear() cycles each active event has been present for
+    self.event_counters: dict[int, int] = {}
 
   @property
   def names(self) -> list[int]:
@@ -63,37 +71,51 @@ class Events:
   def add(self, event_name: int, static: bool=False) -> None:
     if static:
       bisect.insort(self.static_events, event_name)
+      self.static_mask |= 1 << event_name
     bisect.insort(self.events, event_name)
+    self.mask |= 1 << event_name
 
   def clear(self) -> None:
-    self.event_counters = {k: (v + 1 if k in self.events else 0) for k, v in self.event_counters.items()}
+    self.event_counters = {e: self.event_counters.get(e, 0) + 1 for e in set(self.events)}
     self.events = self.static_events.copy()
+    self.mask = self.static_mask
 
   def contains(self, event_type: str) -> bool:
-    return any(event_type in EVENTS.get(e, {}) for e in self.events)
+    return bool(self.mask & EVENT_TYPE_MASKS.get(event_type, 0))
 
   def create_alerts(self, event_types: list[str], callback_args=None):
     if callback_args is None:
       callback_args = []
 
+    requested_mask = 0
+    for et in event_types:
+      requested_mask |= EVENT_TYPE_MASKS.get(et, 0)
+    if not self.mask & requested_mask:
+      return []
+
     ret = []
     for e in self.events:
-      types = EVENTS[e].keys()
+      if not (1 << e) & requested_mask:
+        continue
+
+      alerts = EVENTS[e]
       for et in event_types:
-        if et in types:
-          alert = EVENTS[e][et]
-          if not isinstance(alert, Alert):
-            alert = alert(*callback_args)
-
-          if DT_CTRL * (self.event_counters[e] + 1) >= alert.creation_delay:
-            alert.alert_type = f"{EVENT_NAME[e]}/{et}"
-            alert.event_type = et
-            ret.append(alert)
+        alert = alerts.get(et)
+        if alert is None:
+          continue
+        if not isinstance(alert, Alert):
+          alert = alert(*callback_args)
+
+        if DT_CTRL * (self.event_counters.get(e, 0) + 1) >= alert.creation_delay:
+          alert.alert_type = ALERT_TYPES[e][et]
+          alert.event_type = et
+          ret.append(alert)
     return ret
 
   def add_from_msg(self, events):
     for e in events:
       bisect.insort(self.events, e.name.raw)
+      self.mask |= 1 << e.name.raw
 
   def to_msg(self):
     ret = []
@@ -1144,6 +1166,24 @@ EVENTS: dict[int, dict[str, Alert | AlertCallbackType]] = {
 }
 
 
+# Precomputed lookups for Events, derived from EVENTS
+EVENT_TYPE_MASKS: dict[str, int] = {}
+ALERT_TYPES: dict[int, dict[str, str]] = {}
+
+
+def compile_event_tables() -> None:
+  """Rebuilds the lookup tables used by Events. Must be called again if EVENTS is modified."""
+  EVENT_TYPE_MASKS.clear()
+  ALERT_TYPES.clear()
+  for e, alerts in EVENTS.items():
+    ALERT_TYPES[e] = {et: f"{EVENT_NAME[e]}/{et}" for et in alerts}
+    for et in alerts:
+      EVENT_TYPE_MASKS[et] = EVENT_TYPE_MASKS.get(et, 0) | (1 << e)
+
+
+compile_event_tables()
+
+
 if __name__ == '__main__':
   # print all alerts by type and priority
   from cereal.services import SERVICE_LIST
@@ -1,5 +1,6 @@
 import numpy as np
 from cereal import log
+from cereal.arrays import as_arrays
 from openpilot.common.filter_simple import FirstOrderFilter
 from openpilot.common.numpy_fast import interp
 from openpilot.common.params import Params
@@ -59,11 +60,13 @@ class LanePlanner:
     self.update_custom_offsets()
     lane_lines = md.laneLines
     if len(lane_lines) == 4 and len(lane_lines[0].t) == TRAJECTORY_SIZE:
-      self.ll_t = (np.array(lane_lines[1].t) + np.array(lane_lines[2].t))/2
+      left_t, left_y = as_arrays(lane_lines[1], 't', 'y', dtype=np.float64)
+      right_t, right_y = as_arrays(lane_lines[2], 't', 'y', dtype=np.float64)
+      self.ll_t = (left_t + right_t)/2
       # left and right ll x is the same
       self.ll_x = lane_lines[1].x
-      self.lll_y = np.array(lane_lines[1].y) + self.camera_offset
-      self.rll_y = np.array(lane_lines[2].y) + self.camera_offset
+      self.lll_y = left_y + self.camera_offset
+      self.rll_y = right_y + self.camera_offset
       self.lll_prob = md.laneLineProbs[1]
       self.rll_prob = md.laneLineProbs[2]
       self.lll_std = md.laneLineStds[1]
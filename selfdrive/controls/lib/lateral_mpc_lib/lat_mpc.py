@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
 import os
-import time
 import numpy as np
 
 from casadi import SX, vertcat, sin, cos
@@ -154,6 +153,9 @@ class LateralMpc:
     self.solver.solve()
     self.solution_status = 0
     self.solve_time = 0.0
+    self.time_qp_solution = 0.0
+    self.time_linearization = 0.0
+    self.time_integrator = 0.0
     self.cost = 0
 
   def set_weights(self, path_weight, heading_weight,
@@ -182,9 +184,11 @@ class LateralMpc:
     self.solver.set(N, "p", p_cp[N])
     self.solver.cost_set(N, "yref", self.yref[N][:COST_E_DIM])
 
-    t = time.monotonic()
     self.solution_status = self.solver.solve()
-    self.solve_time = time.monotonic() - t
+    self.solve_time = float(self.solver.get_stats('time_tot')[0])
+    self.time_qp_solution = float(self.solver.get_stats('time_qp')[0])
+    self.time_linearization = float(self.solver.get_stats('time_lin')[0])
+    self.time_integrator = float(self.solver.get_stats('time_sim')[0])
 
     for i in range(N+1):
       self.x_sol[i] = self.solver.get(i, 'x')
@@ -3,7 +3,7 @@ import numpy as np
 from openpilot.common.conversions import Conversions as CV
 from openpilot.common.realtime import DT_MDL
 from openpilot.common.numpy_fast import interp
-from openpilot.common.params import Params
+from openpilot.common.params import Params, ParamWatcher
 from openpilot.common.swaglog import cloudlog
 from openpilot.selfdrive.controls.lib.lateral_mpc_lib.lat_mpc import LateralMpc
 from openpilot.selfdrive.controls.lib.lateral_mpc_lib.lat_mpc import N as LAT_MPC_N
@@ -13,6 +13,7 @@ from openpilot.selfdrive.controls.lib.desire_helper import DesireHelper
 
 import cereal.messaging as messaging
 from cereal import log
+from cereal.arrays import as_array, as_columns
 
 LaneChangeState = log.LaneChangeState
 
@@ -58,6 +59,7 @@ class LateralPlanner:
     self.reset_mpc(np.zeros(4))
 
     self.param_s = Params()
+    self.param_watcher = ParamWatcher(["DynamicLaneProfile", "VisionCurveLaneless", "RoadEdge"], self.param_s)
     self.dynamic_lane_profile = int(self.param_s.get("DynamicLaneProfile", encoding="utf8"))
     self.dynamic_lane_profile_status = True
     self.dynamic_lane_profile_status_buffer = False
@@ -70,17 +72,16 @@ class LateralPlanner:
     self.road_edge = False
     self.edge_toggle = self.param_s.get_bool("RoadEdge")
 
-    self.param_read_counter = 0
-    self.read_param()
-
     self.model_use_lateral_planner = model_use_lateral_planner
 
   def read_param(self):
-    self.dynamic_lane_profile = int(self.param_s.get("DynamicLaneProfile", encoding='utf8'))
-    if self.param_read_counter % 50 == 0:
+    changed = self.param_watcher.poll()
+    if "DynamicLaneProfile" in changed:
+      self.dynamic_lane_profile = int(self.param_s.get("DynamicLaneProfile", encoding='utf8'))
+    if "VisionCurveLaneless" in changed:
       self.vision_curve_laneless = self.param_s.get_bool("VisionCurveLaneless")
+    if "RoadEdge" in changed:
       self.edge_toggle = self.param_s.get_bool("RoadEdge")
-    self.param_read_counter += 1
 
   def reset_mpc(self, x0=None):
     if x0 is None:
@@ -103,13 +104,13 @@ class LateralPlanner:
       if len(md.position.x) == TRAJECTORY_SIZE and (len(md.orientation.x) == TRAJECTORY_SIZE or
                                                     (len(md.velocity.x) == TRAJECTORY_SIZE and len(md.lateralPlannerSolutionDEPRECATED.x) == TRAJECTORY_SIZE)):
         if len(md.orientation.x) == TRAJECTORY_SIZE:
-          self.t_idxs = np.array(md.position.t)
-          self.plan_yaw = np.array(md.orientation.z)
-          self.plan_yaw_rate = np.array(md.orientationRate.z)
+          self.t_idxs = as_array(md.position, 't', dtype=np.float64)
+          self.plan_yaw = as_array(md.orientation, 'z', dtype=np.float64)
+          self.plan_yaw_rate = as_array(md.orientationRate, 'z', dtype=np.float64)
         if len(md.velocity.x) == TRAJECTORY_SIZE and len(md.lateralPlannerSolutionDEPRECATED.x) == TRAJECTORY_SIZE:
-          self.x_sol = np.column_stack([md.lateralPlannerSolutionDEPRECATED.x, md.lateralPlannerSolutionDEPRECATED.y, md.lateralPlannerSolutionDEPRECATED.yaw, md.lateralPlannerSolutionDEPRECATED.yawRate])
-        self.path_xyz = np.column_stack([md.position.x, md.position.y, md.position.z])
-        self.velocity_xyz = np.column_stack([md.velocity.x, md.velocity.y, md.velocity.z])
+          self.x_sol = as_columns(md.lateralPlannerSolutionDEPRECATED, ('x', 'y', 'yaw', 'yawRate'), dtype=np.float64)
+        self.path_xyz = as_columns(md.position, dtype=np.float64)
+        self.velocity_xyz = as_columns(md.velocity, dtype=np.float64)
         car_speed = np.linalg.norm(self.velocity_xyz, axis=1) - get_speed_error(md, v_ego_car)
         self.v_plan = np.clip(car_speed, MIN_SPEED, np.inf)
         self.v_ego = self.v_plan[0]
@@ -0,0 +1,75 @@
+import random
+
+from cereal import car
+from openpilot.common.realtime import DT_CTRL
+from openpilot.selfdrive.controls.lib.events import Alert, Events, ET, EVENTS, EVENT_NAME
+
+EventName = car.CarEvent.EventName
+EVENT_TYPES = [v for k, v in vars(ET).items() if not k.startswith('_')]
+STATIC_ALERT_EVENTS = [e for e, alerts in EVENTS.items() if alerts and all(isinstance(a, Alert) for a in alerts.values())]
+
+
+def reference_contains(names: list[int], event_type: str) -> bool:
+  return any(event_type in EVENTS.get(e, {}) for e in names)
+
+
+class TestEvents:
+  def test_contains(self):
+    random.seed(0)
+    events = Events()
+    for _ in range(200):
+      events.clear()
+      names = random.sample(list(EVENTS.keys()), random.randint(0, 5))
+      for e in names:
+        events.add(e)
+
+      assert events.names == sorted(names)
+      for et in EVENT_TYPES:
+        assert events.contains(et) == reference_contains(names, et), (et, names)
+
+  def test_static_events(self):
+    events = Events()
+    events.add(EventName.startup, static=True)
+    events.add(EventName.pedalPressed)
+    assert events.contains(ET.NO_ENTRY)
+
+    events.clear()
+    assert events.names == [EventName.startup]
+    assert events.contains(ET.PERMANENT)
+    assert not events.contains(ET.NO_ENTRY)
+
+  def test_duplicates(self):
+    events = Events()
+    events.add(EventName.pedalPressed)
+    events.add(EventName.pedalPressed)
+    assert len(events) == 2
+    assert len(events.to_msg()) == 2
+
+  def test_create_alerts(self):
+    random.seed(0)
+    for _ in range(200):
+      events = Events()
+      names = sorted(random.sample(STATIC_ALERT_EVENTS, random.randint(0, 5)))
+      for e in names:
+        events.add(e)
+
+      event_types = random.sample(EVENT_TYPES, random.randint(1, 3))
+      expected = [f"{EVENT_NAME[e]}/{et}" for e in names for et in event_types
+                  if et in EVENTS[e] and EVENTS[e][et].creation_delay <= DT_CTRL]
+      assert [a.alert_type for a in events.create_alerts(event_types)] == expected
+
+  def test_creation_delay_counter(self):
+    events = Events()
+    delay = EVENTS[EventName.preEnableStandstill][ET.PRE_ENABLE].creation_delay
+    frames = 0
+    while not events.create_alerts([ET.PRE_ENABLE]):
+      events.clear()
+      events.add(EventName.preEnableStandstill)
+      frames += 1
+    assert frames == round(delay / DT_CTRL)
+
+    # counter restarts once the event goes away
+    events.clear()
+    events.clear()
+    events.add(EventName.preEnableStandstill)
+    assert not events.create_alerts([ET.PRE_ENABLE])
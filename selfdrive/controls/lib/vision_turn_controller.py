@@ -9,6 +9,7 @@
 import numpy as np
 import time
 from cereal import custom
+from cereal.arrays import as_array
 from openpilot.common.conversions import Conversions as CV
 from openpilot.common.params import Params
 from openpilot.selfdrive.controls.lib.sunnypilot.helpers import debug
@@ -88,8 +89,8 @@ class VisionTurnController:
       self._last_params_update = t
 
   def _update_calculations(self, sm):
-    rate_plan = np.array(np.abs(sm['modelV2'].orientationRate.z))
-    vel_plan = np.array(sm['modelV2'].velocity.x)
+    rate_plan = np.abs(as_array(sm['modelV2'].orientationRate, 'z', dtype=np.float64))
+    vel_plan = as_array(sm['modelV2'].velocity, 'x', dtype=np.float64)
 
     current_curvature = abs(
       sm['carState'].steeringAngleDeg * CV.DEG_TO_RAD / (self._CP.steerRatio * self._CP.wheelbase))
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""Benchmarks CAN parsing and CarState.update for every platform with a test route.
+
+Each platform is fed 100Hz CAN packets, and the time spent in its CAN parsers and in the rest of
+CarInterface.update is measured per packet. Packets come from:
+  - synthetic: every message its CAN parsers subscribe to, packed from the DBC in each packet.
+      No downloads, but values are zeros so branches taken in CarState differ from a real drive
+  - logs: a segment of the platform's test route in routes.py, downloaded once and then read
+      from the local download cache
+
+Runs headless on CPU. Save a baseline with --save-baseline, and later runs compare against it:
+
+  ./benchmark_car_state.py --save-baseline /tmp/car_state.json
+  ./benchmark_car_state.py --baseline /tmp/car_state.json --brand toyota
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+import numpy as np
+from tqdm import tqdm
+
+from cereal import car, messaging
+from opendbc.can.packer import CANPacker
+from openpilot.common.realtime import DT_CTRL
+from openpilot.selfdrive.car import gen_empty_fingerprint
+from openpilot.selfdrive.car.car_helpers import interfaces
+from openpilot.selfdrive.car.fingerprints import MIGRATION
+from openpilot.selfdrive.car.tests.routes import non_tested_cars, routes
+from openpilot.selfdrive.car.values import PLATFORMS
+
+PERCENTILES = (50, 90, 99)
+
+
+class TimedCANParser:
+  """Wraps a CANParser to time its updates, CarInterface only calls update_strings and reads validity"""
+  def __init__(self, cp):
+    self.cp = cp
+    self.elapsed_ns = 0
+
+  def update_strings(self, *args, **kwargs):
+    start_t = time.perf_counter_ns()
+    ret = self.cp.update_strings(*args, **kwargs)
+    self.elapsed_ns += time.perf_counter_ns() - start_t
+    return ret
+
+  def __getattr__(self, name):
+    return getattr(self.cp, name)
+
+
+def get_brand(platform: str) -> str:
+  # selfdrive.car.<brand>.values
+  return type(PLATFORMS[platform]).__module__.split('.')[-2]
+
+
+def get_platforms(brands: list[str] | None) -> list[str]:
+  platforms = {r.car_model for r in routes if r.car_model is not None and r.car_model not in non_tested_cars}
+  if brands is not None:
+    platforms = {p for p in platforms if get_brand(p) in brands}
+  return sorted(platforms)
+
+
+def get_car_interface(platform: str, fingerprint: dict[int, dict[int, int]] = None, car_fw: list = None):
+  CarInterface, CarController, CarState = interfaces[platform]
+  CP = CarInterface.get_params(platform, fingerprint or gen_empty_fingerprint(), car_fw or [], False, docs=False)
+  return CarInterface(CP, CarController, CarState)
+
+
+def synthetic_can_stream(CI, seconds: float) -> list[bytes]:
+  # one of each message the parsers subscribe to every packet, ignoring their frequencies
+  frames = []
+  for cp in CI.can_parsers:
+    if cp is not None:
+      packer = CANPacker(cp.dbc_name)
+      frames += [packer.make_can_msg(name, cp.bus, {}) for name in cp.vl if isinstance(name, str)]
+
+  stream = []
+  for i in range(int(seconds / DT_CTRL)):
+    msg = messaging.new_message('can', len(frames))
+    msg.logMonoTime = int(i * DT_CTRL * 1e9)
+    for j, (address, _, dat, src) in enumerate(frames):
+      msg.can[j].address = address
+      msg.can[j].dat = dat
+      msg.can[j].src = src
+    stream.append(msg.to_bytes())
+  return stream
+
+
+def log_can_stream(platform: str) -> tuple[list[bytes], dict[int, dict[int, int]], list]:
+  from openpilot.selfdrive.car.tests.test_models import TestCarModelBase
+
+  # downloaded logs are kept in the download cache for the next run
+  os.environ.setdefault("FILEREADER_CACHE", "1")
+
+  class CarModelBenchmark(TestCarModelBase):
+    test_route = next(r for r in routes if r.car_model == platform)
+
+  # serialized can Events, replayed in logMonoTime order like test_models
+  car_fw, can_bytes, _ = CarModelBenchmark.get_testing_data()
+  can_bytes = sorted(can_bytes, key=lambda dat: messaging.log_from_bytes(dat).logMonoTime)
+  return can_bytes, CarModelBenchmark.fingerprint, car_fw
+
+
+def benchmark_platform(platform: str, source: str, seconds: float) -> dict[str, float]:
+  if source == 'logs':
+    stream, fingerprint, car_fw = log_can_stream(platform)
+    CI = get_car_interface(platform, fingerprint, car_fw)
+  else:
+    CI = get_car_interface(platform)
+    stream = synthetic_can_stream(CI, seconds)
+
+  parsers = [TimedCANParser(cp) if cp is not None else None for cp in CI.can_parsers]
+  CI.can_parsers = parsers
+
+  CC = car.CarControl.new_message().as_reader()
+  parse_times, update_times = [], []
+  for dat in stream:
+    for cp in parsers:
+      if cp is not None:
+        cp.elapsed_ns = 0
+
+    start_t = time.perf_counter_ns()
+    CI.update(CC, [dat])
+    total_ns = time.perf_counter_ns() - start_t
+
+    parse_ns = sum(cp.elapsed_ns for cp in parsers if cp is not None)
+    parse_times.append(parse_ns / 1e3)
+    update_times.append((total_ns - parse_ns) / 1e3)
+
+  stats = {'packets': len(stream)}
+  for name, times in (('parse', parse_times), ('update', update_times)):
+    for p, value in zip(PERCENTILES, np.percentile(times, PERCENTILES), strict=True):
+      stats[f'{name}_p{p}_us'] = round(float(value), 2)
+  return stats
+
+
+def find_regressions(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+  regressions = []
+  for platform, stats in results.items():
+    for key, ref in baseline.get(platform, {}).items():
+      if key.endswith('_us') and key in stats and stats[key] > ref * (1 + tolerance):
+        regressions.append(f'{platform}: {key} {ref:.2f} -> {stats[key]:.2f} us (+{(stats[key] / ref - 1) * 100:.0f}%)')
+  return regressions
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Benchmark CAN parsing and CarState.update per platform",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--brand", action="append", help="only benchmark platforms of this brand, can be repeated")
+  parser.add_argument("--platform", action="append", help="only benchmark this platform, can be repeated")
+  parser.add_argument("--source", choices=("synthetic", "logs"), default="synthetic")
+  parser.add_argument("--seconds", type=float, default=10., help="length of synthetic CAN streams")
+  parser.add_argument("--baseline", help="JSON results of a previous run to check for regressions")
+  parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown relative to the baseline")
+  parser.add_argument("--save-baseline", help="write the results to this JSON file")
+  args = parser.parse_args()
+
+  platforms = get_platforms(args.brand)
+  if args.platform is not None:
+    platforms = [MIGRATION.get(p, p) for p in args.platform]
+    assert all(p in PLATFORMS for p in platforms), f"unknown platforms: {set(platforms) - set(PLATFORMS)}"
+
+  results, failures = {}, {}
+  for platform in tqdm(platforms):
+    try:
+      results[platform] = benchmark_platform(platform, args.source, args.seconds)
+    except Exception as e:
+      failures[platform] = repr(e)
+
+  brand_stats = defaultdict(list)
+  print(f"{'platform':<40} {'packets':>8} " + " ".join(f"{f'{n} p{p}':>11}" for n in ('parse', 'update') for p in PERCENTILES) + "  (us)")
+  for platform, stats in results.items():
+    brand_stats[get_brand(platform)].append(stats['parse_p50_us'] + stats['update_p50_us'])
+    print(f"{platform:<40} {stats['packets']:>8} " + " ".join(f"{stats[f'{n}_p{p}_us']:>11.2f}" for n in ('parse', 'update') for p in PERCENTILES))
+
+  print("\nmedian packet time per brand:")
+  for brand, times in sorted(brand_stats.items()):
+    print(f"  {brand:<12} {np.median(times):8.2f} us ({len(times)} platforms)")
+
+  for platform, error in failures.items():
+    print(f"failed to benchmark {platform}: {error}")
+
+  if args.save_baseline:
+    with open(args.save_baseline, "w") as f:
+      json.dump(results, f, indent=2, sort_keys=True)
+
+  if args.baseline:
+    with open(args.baseline) as f:
+      regressions = find_regressions(results, json.load(f), args.tolerance)
+    print(f"\n{len(regressions)} regressions over {args.tolerance:.0%} against {args.baseline}")
+    for regression in regressions:
+      print(f"  {regression}")
+    if len(regressions):
+      sys.exit(1)
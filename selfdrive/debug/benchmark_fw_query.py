@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import time
+
+import numpy as np
+from tqdm import tqdm
+
+import openpilot.selfdrive.car.fw_versions as fw_versions
+from openpilot.selfdrive.car.fingerprints import FW_VERSIONS
+from openpilot.selfdrive.car.fw_versions import FW_QUERY_CONFIGS, MODEL_TO_BRAND, get_fw_versions, get_fw_versions_ordered, match_fw_to_car
+from openpilot.selfdrive.car.tests.ecu_simulator import EcuSimulator, get_car_ecus
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Benchmark FW fingerprinting against simulated ECUs of each car",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--car", action="append", help="car to simulate, can be repeated. defaults to a sample of all cars")
+  parser.add_argument("--samples", type=int, default=20, help="cars to sample if none are specified")
+  parser.add_argument("--num-pandas", type=int, default=2)
+  parser.add_argument("--response-time", type=float, default=0.02, help="maximum ECU response time")
+  parser.add_argument("--timeout", type=float, default=0.1)
+  parser.add_argument("--all-brands", action="store_true", help="query every brand, the worst case when no brand matches")
+  args = parser.parse_args()
+
+  random.seed(0)
+  cars = args.car or random.sample(sorted(FW_VERSIONS), min(args.samples, len(FW_VERSIONS)))
+
+  # OBD multiplexing is toggled by pandad, which isn't running
+  fw_versions.set_obd_multiplexing = lambda *_: None
+  query_times, mismatches = {}, []
+  for car_model in tqdm(cars):
+    ecus = get_car_ecus(FW_QUERY_CONFIGS[MODEL_TO_BRAND[car_model]], FW_VERSIONS[car_model])
+    for ecu in ecus:
+      ecu.response_time = args.response_time * random.random()
+    sim = EcuSimulator(ecus)
+    ecu_rx_addrs = {(ecu.rx_addr, ecu.sub_addr, ecu.bus) for ecu in ecus}
+
+    start_t = time.monotonic()
+    if args.all_brands:
+      car_fw = get_fw_versions(sim.logcan, sim.sendcan, timeout=args.timeout, num_pandas=args.num_pandas)
+    else:
+      car_fw = get_fw_versions_ordered(sim.logcan, sim.sendcan, '', ecu_rx_addrs, timeout=args.timeout, num_pandas=args.num_pandas)
+    query_times[car_model] = time.monotonic() - start_t
+
+    _, matches = match_fw_to_car(car_fw, '', allow_fuzzy=False, log=False)
+    if matches != {car_model}:
+      mismatches.append((car_model, matches))
+
+  print(f"{len(cars)} cars, {args.num_pandas} pandas, {'all brands' if args.all_brands else 'ordered by present ECUs'}")
+  for car_model, matches in mismatches:
+    print(f"  {car_model}: matched {matches}")
+
+  values = list(query_times.values())
+  p50, p90 = np.percentile(values, [50, 90])
+  slowest = max(query_times, key=query_times.get)
+  print(f"query time: {p50:.2f} s p50, {p90:.2f} s p90, {query_times[slowest]:.2f} s max ({slowest})")
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import time
+
+import numpy as np
+from tqdm import tqdm
+
+from openpilot.selfdrive.car.isotp_parallel_query import IsoTpParallelQuery
+from openpilot.selfdrive.car.tests.ecu_simulator import REQUEST, RESPONSE, EcuSimulator, make_ecus
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Benchmark IsoTpParallelQuery against simulated ECUs",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--runs", type=int, default=20)
+  parser.add_argument("--buses", type=int, default=3)
+  parser.add_argument("--ecus", type=int, default=32, help="responding ECUs per bus")
+  parser.add_argument("--missing", type=int, default=8, help="queried addresses per bus without an ECU")
+  parser.add_argument("--response-len", type=int, default=24, help="FW version length, longer versions are multi-frame")
+  parser.add_argument("--response-time", type=float, default=0.05, help="maximum ECU response time")
+  parser.add_argument("--timeout", type=float, default=0.1)
+  args = parser.parse_args()
+
+  random.seed(0)
+  latencies, cpu_times = [], []
+  for _ in tqdm(range(args.runs)):
+    ecus = [ecu for bus in range(args.buses)
+            for ecu in make_ecus(bus, args.ecus, response_lens=(args.response_len,), max_response_time=args.response_time)]
+    sim = EcuSimulator(ecus)
+    addrs = [0x700 + i for i in range(args.ecus + args.missing)]
+
+    start_t, start_cpu = time.monotonic(), time.process_time()
+    for bus in range(args.buses):
+      results = IsoTpParallelQuery(sim.sendcan, sim.logcan, bus, addrs, [REQUEST], [RESPONSE]).get_data(args.timeout)
+      assert len(results) == args.ecus, f"expected {args.ecus} responses on bus {bus}, got {len(results)}"
+    latencies.append(time.monotonic() - start_t)
+    cpu_times.append(time.process_time() - start_cpu)
+
+  print(f"{args.buses} buses, {args.ecus} ECUs + {args.missing} missing per bus, {args.runs} runs")
+  for name, values in (("query time", latencies), ("CPU time", cpu_times)):
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]) * 1000
+    print(f"{name}: {p50:.2f} ms p50, {p90:.2f} ms p90, {p99:.2f} ms p99, {max(values) * 1000:.2f} ms max")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""Benchmarks the longitudinal and lateral acados MPCs on CPU.
+
+Every solve is recorded with its wall time, the acados timings (total, QP, linearization, integrator),
+the SQP and QP iteration counts and the QP and solver status. The MPCs are driven through:
+  - long: the maneuvers of selfdrive/test/longitudinal_maneuvers, in closed loop with the plant
+  - lat: synthetic paths (straight, curves, lane changes) in closed loop, or the plans recorded
+      in the modelV2 of a route with --route
+
+Solver options that can be changed at runtime are passed with --option, e.g. warm starting:
+
+  ./benchmark_mpc.py --option qp_warm_start=0 --save /tmp/mpc_cold.json
+  ./benchmark_mpc.py --option qp_warm_start=1 --compare /tmp/mpc_cold.json
+
+The horizon, condensing and QP iteration limit are compiled into the solvers. To compare those,
+save a run, change them in gen_long_ocp/gen_lat_ocp, rebuild with scons and --compare against it.
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+from tqdm import tqdm
+
+import openpilot.selfdrive.controls.lib.lateral_mpc_lib.lat_mpc as lat_mpc
+import openpilot.selfdrive.controls.lib.longitudinal_mpc_lib.long_mpc as long_mpc
+from openpilot.common.realtime import DT_MDL
+from openpilot.selfdrive.controls.lib.drive_helpers import MIN_SPEED
+from openpilot.selfdrive.controls.lib.lateral_planner import LATERAL_ACCEL_COST, LATERAL_JERK_COST, LATERAL_MOTION_COST, PATH_COST, \
+                                                            STEERING_RATE_COST
+from openpilot.selfdrive.modeld.constants import ModelConstants
+
+PERCENTILES = (50, 90, 99)
+TIMINGS = ('wall', 'time_tot', 'time_qp', 'time_lin', 'time_sim')
+LANE_WIDTH = 3.7
+
+LAT_T_IDXS = np.array(ModelConstants.T_IDXS[:lat_mpc.N + 1])
+
+
+class SolverRecorder:
+  """Wraps an AcadosOcpSolverCython to apply runtime options and record the stats of every solve"""
+  def __init__(self, solver, options: dict[str, int | float]):
+    self.solver = solver
+    for field, value in options.items():
+      self.solver.options_set(field, value)
+    self.solves: list[dict[str, float]] = []
+
+  def solve(self):
+    start_t = time.perf_counter()
+    status = self.solver.solve()
+    wall = time.perf_counter() - start_t
+
+    # SQP_RTI statistics: rows of iteration, QP status and QP iterations
+    statistics = self.solver.get_stats('statistics')
+    solve = {'wall': wall, 'status': status, 'sqp_iter': int(self.solver.get_stats('sqp_iter')),
+             'qp_status': int(statistics[1][-1]), 'qp_iter': int(statistics[2][-1])}
+    for field in TIMINGS[1:]:
+      solve[field] = float(self.solver.get_stats(field)[0])
+    self.solves.append(solve)
+    return status
+
+  def __getattr__(self, name):
+    return getattr(self.solver, name)
+
+
+def record_solvers(module, options: dict[str, int | float]) -> list[SolverRecorder]:
+  """Records the solves of every MPC of the module created from now on"""
+  recorders = []
+  solver_cls = module.AcadosOcpSolverCython
+
+  def make_solver(*args):
+    recorders.append(SolverRecorder(solver_cls(*args), options))
+    return recorders[-1]
+
+  module.AcadosOcpSolverCython = make_solver
+  return recorders
+
+
+def get_vehicle_params():
+  from openpilot.selfdrive.car.honda.interface import CarInterface
+  from openpilot.selfdrive.car.honda.values import CAR
+  return CarInterface.get_non_essential_params(CAR.HONDA_CIVIC)
+
+
+def run_long_maneuvers(long_recorders: list[SolverRecorder]) -> dict[str, list[SolverRecorder]]:
+  from openpilot.selfdrive.test.longitudinal_maneuvers.test_longitudinal import create_maneuvers
+
+  recorders = {}
+  for e2e in (False, True):
+    for maneuver in tqdm(create_maneuvers({'e2e': e2e, 'force_decel': False}), desc=f"long {'e2e' if e2e else 'acc'}"):
+      start = len(long_recorders)
+      maneuver.evaluate()
+      recorders[f"{maneuver.title}{' (e2e)' if e2e else ''}"] = long_recorders[start:]
+  return recorders
+
+
+def synthetic_lat_paths(seconds: float) -> dict[str, list[tuple[float, np.ndarray, np.ndarray, np.ndarray]]]:
+  """Plans of v_ego, and path y, heading and yaw rate over the MPC horizon at each model frame"""
+  frames = np.arange(int(seconds / DT_MDL)) * DT_MDL
+
+  def curve(v_ego, curvature):
+    s = v_ego * LAT_T_IDXS
+    return [(v_ego, 0.5 * curvature * s**2, curvature * s, curvature * v_ego * np.ones_like(s)) for _ in frames]
+
+  def lane_change(v_ego, duration=5.):
+    plans = []
+    for t in frames:
+      # smoothstep from the current lane to the next over duration, starting a second in
+      phase = np.clip((t + LAT_T_IDXS - 1.) / duration, 0., 1.)
+      y = LANE_WIDTH * phase**2 * (3 - 2 * phase)
+      heading = np.gradient(y, LAT_T_IDXS) / v_ego
+      plans.append((v_ego, y, heading, np.gradient(heading, LAT_T_IDXS)))
+    return plans
+
+  return {
+    'straight 30 m/s': curve(30., 0.),
+    'curve 250 m 25 m/s': curve(25., 1 / 250),
+    'curve 50 m 10 m/s': curve(10., -1 / 50),
+    'lane change 30 m/s': lane_change(30.),
+    'lane change 15 m/s': lane_change(15.),
+  }
+
+
+def recorded_lat_plans(route: str) -> dict[str, list[tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]]:
+  from openpilot.tools.lib.logreader import LogReader
+
+  plans = []
+  for msg in LogReader(route).filter('modelV2'):
+    if len(msg.position.y) < lat_mpc.N + 1 or len(msg.orientation.z) < lat_mpc.N + 1:
+      continue
+    velocity = np.column_stack([msg.velocity.x, msg.velocity.y, msg.velocity.z])[:lat_mpc.N + 1]
+    v_plan = np.clip(np.linalg.norm(velocity, axis=1), MIN_SPEED, np.inf)
+    plans.append((v_plan, np.array(msg.position.y[:lat_mpc.N + 1]), np.array(msg.orientation.z[:lat_mpc.N + 1]),
+                  np.array(msg.orientationRate.z[:lat_mpc.N + 1])))
+  return {route: plans}
+
+
+def run_lat_plans(lat_recorders: list[SolverRecorder], plans: dict[str, list]) -> dict[str, list[SolverRecorder]]:
+  """Runs the plans in closed loop like the lateral planner, feeding back the planned curvature"""
+  CP = get_vehicle_params()
+  factor1 = CP.wheelbase - CP.centerToFront
+  factor2 = (CP.centerToFront * CP.mass) / (CP.wheelbase * CP.tireStiffnessRear)
+
+  recorders = {}
+  for name, path in tqdm(plans.items(), desc="lat"):
+    start = len(lat_recorders)
+    mpc = lat_mpc.LateralMpc()
+    mpc.set_weights(PATH_COST, LATERAL_MOTION_COST, LATERAL_ACCEL_COST, LATERAL_JERK_COST, STEERING_RATE_COST)
+    x0 = np.zeros(lat_mpc.X_DIM)
+    for v_plan, y_pts, heading_pts, yaw_rate_pts in path:
+      v_plan = np.broadcast_to(v_plan, LAT_T_IDXS.shape)
+      p = np.column_stack([v_plan, np.clip(factor1 - factor2 * v_plan**2, 0., np.inf)])
+      mpc.run(x0, p, y_pts, heading_pts, yaw_rate_pts)
+      x0[3] = np.interp(DT_MDL, LAT_T_IDXS, mpc.x_sol[:, 3])
+      if np.isnan(mpc.x_sol[:, 3]).any() or mpc.solution_status != 0:
+        x0 = np.zeros(lat_mpc.X_DIM)
+        mpc.reset(x0)
+    recorders[name] = lat_recorders[start:]
+  return recorders
+
+
+def summarize(recorders: list[SolverRecorder]) -> dict[str, float]:
+  # the first solve of each MPC is the cold start in reset(), which the planners don't time
+  solves = [s for r in recorders for s in r.solves[1:]]
+  stats = {'solves': len(solves)}
+  for field in TIMINGS:
+    values = np.array([s[field] for s in solves]) * 1e6
+    for p, value in zip(PERCENTILES, np.percentile(values, PERCENTILES), strict=True):
+      stats[f'{field}_p{p}_us'] = round(float(value), 2)
+    stats[f'{field}_max_us'] = round(float(values.max()), 2)
+  stats['qp_iter_mean'] = round(float(np.mean([s['qp_iter'] for s in solves])), 2)
+  stats['qp_iter_max'] = max(s['qp_iter'] for s in solves)
+  stats['qp_failures'] = sum(s['qp_status'] != 0 for s in solves)
+  stats['solver_failures'] = sum(s['status'] != 0 for s in solves)
+  return stats
+
+
+def print_histogram(name: str, recorders: list[SolverRecorder], bins: int = 10) -> None:
+  values = np.array([s['time_tot'] for r in recorders for s in r.solves[1:]]) * 1e6
+  counts, edges = np.histogram(values, bins=bins)
+  print(f"\n{name} time_tot histogram (us):")
+  for count, low, high in zip(counts, edges[:-1], edges[1:], strict=True):
+    print(f"  {low:8.1f} - {high:8.1f} {count:7d} {'#' * int(50 * count / counts.max())}")
+
+
+def print_results(results: dict[str, dict], baseline: dict[str, dict] = None) -> None:
+  columns = ('time_tot_p50_us', 'time_tot_p99_us', 'time_qp_p50_us', 'time_lin_p50_us', 'wall_p99_us', 'qp_iter_mean', 'qp_iter_max')
+  print(f"\n{'scenario':<48} {'solves':>7} " + " ".join(f"{c.removesuffix('_us'):>15}" for c in columns) + f" {'failures':>9}")
+  for name, stats in results.items():
+    print(f"{name:<48} {stats['solves']:>7} " + " ".join(f"{stats[c]:>15.2f}" for c in columns) +
+          f" {stats['qp_failures'] + stats['solver_failures']:>9}")
+    if baseline is not None and name in baseline:
+      print(f"{'':<48} {'':>7} " + " ".join(f"{(stats[c] / baseline[name][c] - 1) * 100 if baseline[name][c] else 0.:>+14.0f}%" for c in columns))
+
+
+def find_regressions(results: dict[str, dict], baseline: dict[str, dict], tolerance: float) -> list[str]:
+  regressions = []
+  for name, stats in results.items():
+    for key in ('time_tot_p50_us', 'time_tot_p99_us'):
+      ref = baseline.get(name, {}).get(key)
+      if ref is not None and stats[key] > ref * (1 + tolerance):
+        regressions.append(f'{name}: {key} {ref:.2f} -> {stats[key]:.2f} us (+{(stats[key] / ref - 1) * 100:.0f}%)')
+  return regressions
+
+
+def parse_option(option: str) -> tuple[str, int | float]:
+  field, value = option.split('=')
+  return field, float(value) if '.' in value or 'e' in value else int(value)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Benchmark the longitudinal and lateral MPC solvers",
+                                   formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+  parser.add_argument("--mpc", choices=("long", "lat", "both"), default="both")
+  parser.add_argument("--route", help="run the lateral MPC on the modelV2 plans of this route instead of synthetic paths")
+  parser.add_argument("--seconds", type=float, default=20., help="length of synthetic lateral paths")
+  parser.add_argument("--option", action="append", default=[], type=parse_option,
+                      help="runtime solver option as field=value, e.g. qp_warm_start=1, can be repeated")
+  parser.add_argument("--histogram", action="store_true", help="print time_tot histograms of each MPC")
+  parser.add_argument("--compare", help="JSON results of a previous run to compare and check for regressions")
+  parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown relative to --compare")
+  parser.add_argument("--save", help="write the results to this JSON file")
+  args = parser.parse_args()
+
+  options = dict(args.option)
+  long_recorders = record_solvers(long_mpc, options)
+  lat_recorders = record_solvers(lat_mpc, options)
+
+  scenarios = {}
+  if args.mpc in ("long", "both"):
+    scenarios['long'] = run_long_maneuvers(long_recorders)
+  if args.mpc in ("lat", "both"):
+    plans = recorded_lat_plans(args.route) if args.route else synthetic_lat_paths(args.seconds)
+    scenarios['lat'] = run_lat_plans(lat_recorders, plans)
+
+  results = {}
+  for mpc_name, recorders in scenarios.items():
+    for name, scenario_recorders in recorders.items():
+      results[f"{mpc_name}: {name}"] = summarize(scenario_recorders)
+    results[f"{mpc_name}: all"] = summarize([r for rs in recorders.values() for r in rs])
+    if args.histogram:
+      print_histogram(mpc_name, [r for rs in recorders.values() for r in rs])
+
+  baseline = None
+  if args.compare:
+    with open(args.compare) as f:
+      baseline = json.load(f)
+
+  print(f"\nsolver options: {options or 'defaults'}")
+  print_results(results, baseline)
+
+  if args.save:
+    with open(args.save, "w") as f:
+      json.dump(results, f, indent=2)
+
+  if baseline is not None:
+    regressions = find_regressions(results, baseline, args.tolerance)
+    print(f"\n{len(regressions)} regressions over {args.tolerance:.0%} against {args.compare}")
+    for regression in regressions:
+      print(f"  {regression}")
+    if len(regressions):
+      sys.exit(1)
@@ -1,56 +1,51 @@
 #!/usr/bin/env python3
 import sys
-import math
 import datetime
-from collections import Counter
 from pprint import pprint
 from typing import cast
 
 from cereal.services import SERVICE_LIST
-from openpilot.tools.lib.logreader import LogReader, ReadMode
+from openpilot.tools.lib.logreader import ReadMode
+from openpilot.tools.lib.route_summary import get_summary
 
 if __name__ == "__main__":
-  cnt_events: Counter = Counter()
+  summary = get_summary(sys.argv[1], ReadMode.QLOG)
+  start_time = summary.start_time
+  end_time = summary.end_time
+  event_counts = summary.event_counts
+  service_counts = summary.service_counts
 
-  cams = [s for s in SERVICE_LIST if s.endswith('CameraState')]
-  cnt_cameras = dict.fromkeys(cams, 0)
-
-  events: list[tuple[float, set[str]]] = []
-  alerts: list[tuple[float, str]] = []
-  start_time = math.inf
-  end_time = -math.inf
+  # only count the drive, up to the first time ignition is off
   ignition_off = None
-  for msg in LogReader(sys.argv[1], ReadMode.QLOG):
-    t = (msg.logMonoTime - start_time) / 1e9
-    end_time = max(end_time, msg.logMonoTime)
-    start_time = min(start_time, msg.logMonoTime)
+  off_idx = next((i for i, (_, ign) in enumerate(summary.ignition) if not ign), None)
+  if off_idx is not None:
+    ignition_off = end_time = summary.ignition[off_idx][0]
+    event_counts = summary.ignition_event_counts[off_idx]
+    service_counts = summary.ignition_service_counts[off_idx]
 
-    if msg.which() == 'onroadEvents':
-      for e in msg.onroadEvents:
-        cnt_events[e.name] += 1
+  events: list[tuple[float, set[str]]] = []
+  for t, names in summary.events:
+    if ignition_off is not None and t >= ignition_off:
+      break
+    ae = {name for name in names if name not in ('pedalPressed', 'steerOverride', 'gasPressedOverride')}
+    if len(events) == 0 or ae != events[-1][1]:
+      events.append(((t - start_time) / 1e9, ae))
 
-      ae = {str(e.name) for e in msg.onroadEvents if e.name not in ('pedalPressed', 'steerOverride', 'gasPressedOverride')}
-      if len(events) == 0 or ae != events[-1][1]:
-        events.append((t, ae))
+  alerts: list[tuple[float, str]] = []
+  for t, at in summary.alerts:
+    if ignition_off is not None and t >= ignition_off:
+      break
+    if "/override" not in at or "lanechange" in at.lower():
+      if len(alerts) == 0 or alerts[-1][1] != at:
+        alerts.append(((t - start_time) / 1e9, at))
 
-    elif msg.which() == 'controlsState':
-      at = msg.controlsState.alertType
-      if "/override" not in at or "lanechange" in at.lower():
-        if len(alerts) == 0 or alerts[-1][1] != at:
-          alerts.append((t, at))
-    elif msg.which() == 'pandaStates':
-      if ignition_off is None:
-        ign = any(ps.ignitionLine or ps.ignitionCan for ps in msg.pandaStates)
-        if not ign:
-          ignition_off = msg.logMonoTime
-          break
-    elif msg.which() in cams:
-      cnt_cameras[msg.which()] += 1
+  cams = [s for s in SERVICE_LIST if s.endswith('CameraState')]
+  cnt_cameras = {cam: service_counts.get(cam, 0) for cam in cams}
 
   duration = (end_time - start_time) / 1e9
 
   print("Events")
-  pprint(cnt_events)
+  pprint(event_counts)
 
   print("\n")
   print("Events")
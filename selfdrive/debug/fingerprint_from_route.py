@@ -1,23 +1,21 @@
 #!/usr/bin/env python3
 
 import sys
-from openpilot.tools.lib.logreader import LogReader, ReadMode
+from openpilot.tools.lib.logreader import ReadMode
+from openpilot.tools.lib.route_summary import get_summary
 
 
-def get_fingerprint(lr):
+def get_fingerprint(summary):
   # TODO: make this a nice tool for car ports. should also work with qlogs for FW
 
-  fw = None
+  CP = summary.CP
+  fw = CP.carFw if CP is not None else []
   msgs = {}
-  for msg in lr:
-    if msg.which() == 'carParams':
-      fw = msg.carParams.carFw
-    elif msg.which() == 'can':
-      for c in msg.can:
-        # read also msgs sent by EON on CAN bus 0x80 and filter out the
-        # addr with more than 11 bits
-        if c.src % 0x80 == 0 and c.address < 0x800 and c.address not in (0x7df, 0x7e0, 0x7e8):
-          msgs[c.address] = len(c.dat)
+  for src, addrs in sorted(summary.fingerprint.items()):
+    # read also msgs sent by EON on CAN bus 0x80 and filter out the
+    # addr with more than 11 bits
+    if src % 0x80 == 0:
+      msgs.update({addr: length for addr, length in addrs.items() if addr < 0x800 and addr not in (0x7df, 0x7e0, 0x7e8)})
 
   # show CAN fingerprint
   fingerprint = ', '.join("%d: %d" % v for v in sorted(msgs.items()))
@@ -39,5 +37,4 @@ if __name__ == "__main__":
     print("Usage: ./fingerprint_from_route.py <route>")
     sys.exit(1)
 
-  lr = LogReader(sys.argv[1], ReadMode.QLOG)
-  get_fingerprint(lr)
+  get_fingerprint(get_summary(sys.argv[1], ReadMode.QLOG))
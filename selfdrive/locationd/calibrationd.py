@@ -19,6 +19,7 @@ from openpilot.common.params import Params
 from openpilot.common.realtime import set_realtime_priority
 from openpilot.common.transformations.orientation import rot_from_euler, euler_from_rot
 from openpilot.common.swaglog import cloudlog
+from openpilot.selfdrive.locationd.helpers import sort_logs
 
 MIN_SPEED_FILTER = 15 * CV.MPH_TO_MS
 MAX_VEL_ANGLE_STD = np.radians(0.25)
@@ -199,7 +200,10 @@ class Calibrator:
     observed_rpy = np.array([0,
                              -np.arctan2(trans[2], trans[0]),
                              np.arctan2(trans[1], trans[0])])
-    new_rpy = euler_from_rot(rot_from_euler(self.get_smooth_rpy()).dot(rot_from_euler(observed_rpy)))
+    return self.add_observation(rot_from_euler(observed_rpy), wide_from_device_euler, road_transform_trans)
+
+  def add_observation(self, observed_rot: np.ndarray, wide_from_device_euler: list[float], road_transform_trans: list[float]) -> np.ndarray:
+    new_rpy = euler_from_rot(rot_from_euler(self.get_smooth_rpy()).dot(observed_rot))
     new_rpy = sanity_clip(new_rpy)
 
     if len(wide_from_device_euler) == 3:
@@ -255,6 +259,45 @@ class Calibrator:
     pm.send('liveCalibration', self.get_msg(valid))
 
 
+def process_logs(msgs) -> list[capnp.lib.capnp._DynamicStructBuilder]:
+  """Runs calibrationd in-process over logged carState, cameraOdometry and carParams, returning the liveCalibration it
+  would publish. The filters that don't depend on the calibration state are applied to all cameraOdometry messages at once."""
+  calibrator = Calibrator(param_put=False)
+
+  v_ego = 0.0
+  cam_odoms, v_egos = [], []
+  for msg in sort_logs(msgs, ['carState', 'cameraOdometry', 'carParams']):
+    if msg.which() == 'carState':
+      v_ego = msg.carState.vEgo
+    elif msg.which() == 'carParams':
+      calibrator.not_car = msg.carParams.notCar
+    else:
+      cam_odoms.append(msg.cameraOdometry)
+      v_egos.append(v_ego)
+  if not len(cam_odoms):
+    return []
+
+  trans = np.array([m.trans for m in cam_odoms])
+  trans_std = np.array([m.transStd for m in cam_odoms])
+  yaw_rate = np.array([m.rot[2] for m in cam_odoms])
+  height_std = np.array([m.roadTransformTransStd[2] if len(m.roadTransformTransStd) == 3 else 0. for m in cam_odoms])
+
+  straight_and_fast = (np.array(v_egos) > MIN_SPEED_FILTER) & (trans[:, 0] > MIN_SPEED_FILTER) & (np.abs(yaw_rate) < MAX_YAW_RATE_FILTER)
+  certain = (np.arctan2(trans_std[:, 1], trans[:, 0]) < MAX_VEL_ANGLE_STD) & (height_std < MAX_HEIGHT_STD)
+  observed_rpys = np.column_stack([np.zeros(len(trans)), -np.arctan2(trans[:, 2], trans[:, 0]), np.arctan2(trans[:, 1], trans[:, 0])])
+  observed_rots = rot_from_euler(observed_rpys)
+
+  # 4Hz driven by cameraOdometry
+  outputs = []
+  for i, m in enumerate(cam_odoms):
+    calibrator.old_rpy_weight = max(0.0, calibrator.old_rpy_weight - 1/SMOOTH_CYCLES)
+    if straight_and_fast[i] and (certain[i] or calibrator.valid_blocks < INPUTS_NEEDED):
+      calibrator.add_observation(observed_rots[i], m.wideFromDeviceEuler, m.roadTransformTrans)
+    if i % 5 == 0:
+      outputs.append(calibrator.get_msg(True))
+  return outputs
+
+
 def main() -> NoReturn:
   gc.disable()
   set_realtime_priority(1)
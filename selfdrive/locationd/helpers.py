@@ -62,3 +62,21 @@ class ParameterEstimator:
 
   def get_msg(self, valid: bool, with_points: bool) -> log.Event:
     raise NotImplementedError
+
+
+def sort_logs(msgs, services: list[str]) -> list[log.Event]:
+  return sorted((msg for msg in msgs if msg.which() in services), key=lambda msg: msg.logMonoTime)
+
+
+def run_estimator(estimator: ParameterEstimator, msgs, services: list[str], poll: str, publish_every: int = 1) -> list[log.Event]:
+  """Feeds logged messages to an estimator in-process like its daemon would, publishing every publish_every poll messages"""
+  outputs = []
+  frame = 0
+  for msg in sort_logs(msgs, services):
+    which = msg.which()
+    estimator.handle_log(msg.logMonoTime * 1e-9, which, getattr(msg, which))
+    if which == poll:
+      if frame % publish_every == 0:
+        outputs.append(estimator.get_msg(valid=True))
+      frame += 1
+  return outputs
@@ -2,6 +2,7 @@
 import os
 import math
 import json
+import capnp
 import numpy as np
 
 import cereal.messaging as messaging
@@ -11,6 +12,7 @@ from openpilot.common.params import Params
 from openpilot.common.realtime import config_realtime_process, DT_MDL
 from openpilot.common.numpy_fast import clip
 from openpilot.selfdrive.car.chrysler.values import ChryslerFlagsSP
+from openpilot.selfdrive.locationd.helpers import ParameterEstimator, run_estimator
 from openpilot.selfdrive.locationd.models.car_kf import CarKalman, ObservationKind, States
 from openpilot.selfdrive.locationd.models.constants import GENERATED_DIR
 from openpilot.common.swaglog import cloudlog
@@ -118,29 +120,95 @@ def check_valid_with_hysteresis(current_valid: bool, val: float, threshold: floa
   return current_valid
 
 
-def main():
-  config_realtime_process([0, 1, 2, 3], 5)
+class ParamsEstimator(ParameterEstimator):
+  """Runs a ParamsLearner over carState and liveLocationKalman and builds the liveParameters that paramsd publishes"""
+  def __init__(self, CP, params: dict, debug: bool = False):
+    self.CP = CP
+    self.debug = debug
+    self.min_sr, self.max_sr = 0.5 * CP.steerRatio, 2.0 * CP.steerRatio
 
-  DEBUG = bool(int(os.getenv("DEBUG", "0")))
-  REPLAY = bool(int(os.getenv("REPLAY", "0")))
+    pInitial = None
+    if debug:
+      pInitial = np.array(params['filterState']['std']) if 'filterState' in params else None
 
-  pm = messaging.PubMaster(['liveParameters'])
-  sm = messaging.SubMaster(['liveLocationKalman', 'carState'], poll='liveLocationKalman')
+    self.learner = ParamsLearner(CP, params['steerRatio'], params['stiffnessFactor'], math.radians(params['angleOffsetAverageDeg']), pInitial)
+    self.angle_offset_average = params['angleOffsetAverageDeg']
+    self.angle_offset = self.angle_offset_average
+    self.roll = 0.0
+    self.avg_offset_valid = True
+    self.total_offset_valid = True
+    self.roll_valid = True
 
-  params_reader = Params()
-  # wait for stats about the car to come in from controls
-  cloudlog.info("paramsd is waiting for CarParams")
-  with car.CarParams.from_bytes(params_reader.get("CarParams", block=True)) as msg:
-    CP = msg
-  cloudlog.info("paramsd got CarParams")
+  def reset(self):
+    self.learner = ParamsLearner(self.CP, self.CP.steerRatio, 1.0, 0.0)
 
+  def handle_log(self, t, which, msg):
+    self.learner.handle_log(t, which, msg)
+
+  def get_msg(self, valid=True, with_points=False):
+    x = self.learner.kf.x
+    P = np.sqrt(self.learner.kf.P.diagonal())
+    if not all(map(math.isfinite, x)):
+      cloudlog.error("NaN in liveParameters estimate. Resetting to default values")
+      self.reset()
+      x = self.learner.kf.x
+
+    self.angle_offset_average = clip(math.degrees(x[States.ANGLE_OFFSET].item()),
+                                     self.angle_offset_average - MAX_ANGLE_OFFSET_DELTA, self.angle_offset_average + MAX_ANGLE_OFFSET_DELTA)
+    self.angle_offset = clip(math.degrees(x[States.ANGLE_OFFSET].item() + x[States.ANGLE_OFFSET_FAST].item()),
+                             self.angle_offset - MAX_ANGLE_OFFSET_DELTA, self.angle_offset + MAX_ANGLE_OFFSET_DELTA)
+    self.roll = clip(float(x[States.ROAD_ROLL].item()), self.roll - ROLL_MAX_DELTA, self.roll + ROLL_MAX_DELTA)
+    roll_std = float(P[States.ROAD_ROLL].item())
+    if self.learner.active and self.learner.speed > LOW_ACTIVE_SPEED:
+      # Account for the opposite signs of the yaw rates
+      # At low speeds, bumping into a curb can cause the yaw rate to be very high
+      sensors_valid = bool(abs(self.learner.speed * (x[States.YAW_RATE].item() + self.learner.yaw_rate)) < LATERAL_ACC_SENSOR_THRESHOLD)
+    else:
+      sensors_valid = True
+    self.avg_offset_valid = check_valid_with_hysteresis(self.avg_offset_valid, self.angle_offset_average, OFFSET_MAX, OFFSET_LOWERED_MAX)
+    self.total_offset_valid = check_valid_with_hysteresis(self.total_offset_valid, self.angle_offset, OFFSET_MAX, OFFSET_LOWERED_MAX)
+    self.roll_valid = check_valid_with_hysteresis(self.roll_valid, self.roll, ROLL_MAX, ROLL_LOWERED_MAX)
+
+    msg = messaging.new_message('liveParameters')
+    msg.valid = valid
+
+    liveParameters = msg.liveParameters
+    liveParameters.posenetValid = True
+    liveParameters.sensorValid = sensors_valid
+    liveParameters.steerRatio = float(x[States.STEER_RATIO].item())
+    liveParameters.stiffnessFactor = float(x[States.STIFFNESS].item())
+    liveParameters.roll = self.roll
+    liveParameters.angleOffsetAverageDeg = self.angle_offset_average
+    liveParameters.angleOffsetDeg = self.angle_offset
+    liveParameters.valid = all((
+      self.avg_offset_valid,
+      self.total_offset_valid,
+      self.roll_valid,
+      roll_std < ROLL_STD_MAX,
+      0.2 <= liveParameters.stiffnessFactor <= 5.0,
+      self.min_sr <= liveParameters.steerRatio <= self.max_sr,
+    ))
+    if (self.CP.carName == "chrysler" and self.CP.spFlags & ChryslerFlagsSP.SP_RAM_HD_PARAMSD_IGNORE) or \
+       (self.CP.carName == "subaru" and self.CP.lateralTuning.which() == 'torque'):
+      liveParameters.valid = True
+    liveParameters.steerRatioStd = float(P[States.STEER_RATIO].item())
+    liveParameters.stiffnessFactorStd = float(P[States.STIFFNESS].item())
+    liveParameters.angleOffsetAverageStd = float(P[States.ANGLE_OFFSET].item())
+    liveParameters.angleOffsetFastStd = float(P[States.ANGLE_OFFSET_FAST].item())
+    if self.debug:
+      liveParameters.filterState = log.LiveLocationKalman.Measurement.new_message()
+      liveParameters.filterState.value = x.tolist()
+      liveParameters.filterState.std = P.tolist()
+      liveParameters.filterState.valid = True
+
+    return msg
+
+
+def get_initial_params(CP, params: dict | None, reset_stiffness: bool) -> dict:
   min_sr, max_sr = 0.5 * CP.steerRatio, 2.0 * CP.steerRatio
 
-  params = params_reader.get("LiveParameters")
-
   # Check if car model matches
   if params is not None:
-    params = json.loads(params)
     if params.get('carFingerprint', None) != CP.carFingerprint:
       cloudlog.info("Parameter learner found parameters for wrong car.")
       params = None
@@ -166,22 +234,39 @@ def main():
     }
     cloudlog.info("Parameter learner resetting to default values")
 
-  if not REPLAY:
+  if reset_stiffness:
     # When driving in wet conditions the stiffness can go down, and then be too low on the next drive
     # Without a way to detect this we have to reset the stiffness every drive
     params['stiffnessFactor'] = 1.0
 
-  pInitial = None
-  if DEBUG:
-    pInitial = np.array(params['filterState']['std']) if 'filterState' in params else None
+  return params
+
+
+def process_logs(CP, msgs, params: dict = None) -> list[capnp.lib.capnp._DynamicStructBuilder]:
+  """Runs paramsd in-process over logged carState and liveLocationKalman, returning the liveParameters it would publish"""
+  estimator = ParamsEstimator(CP, get_initial_params(CP, params, reset_stiffness=False))
+  return run_estimator(estimator, msgs, ['liveLocationKalman', 'carState'], poll='liveLocationKalman')
 
-  learner = ParamsLearner(CP, params['steerRatio'], params['stiffnessFactor'], math.radians(params['angleOffsetAverageDeg']), pInitial)
-  angle_offset_average = params['angleOffsetAverageDeg']
-  angle_offset = angle_offset_average
-  roll = 0.0
-  avg_offset_valid = True
-  total_offset_valid = True
-  roll_valid = True
+
+def main():
+  config_realtime_process([0, 1, 2, 3], 5)
+
+  DEBUG = bool(int(os.getenv("DEBUG", "0")))
+  REPLAY = bool(int(os.getenv("REPLAY", "0")))
+
+  pm = messaging.PubMaster(['liveParameters'])
+  sm = messaging.SubMaster(['liveLocationKalman', 'carState'], poll='liveLocationKalman')
+
+  params_reader = Params()
+  # wait for stats about the car to come in from controls
+  cloudlog.info("paramsd is waiting for CarParams")
+  with car.CarParams.from_bytes(params_reader.get("CarParams", block=True)) as msg:
+    CP = msg
+  cloudlog.info("paramsd got CarParams")
+
+  params = params_reader.get("LiveParameters")
+  params = get_initial_params(CP, json.loads(params) if params is not None else None, reset_stiffness=not REPLAY)
+  estimator = ParamsEstimator(CP, params, debug=DEBUG)
 
   while True:
     sm.update()
@@ -189,64 +274,11 @@ def main():
       for which in sorted(sm.updated.keys(), key=lambda x: sm.logMonoTime[x]):
         if sm.updated[which]:
           t = sm.logMonoTime[which] * 1e-9
-          learner.handle_log(t, which, sm[which])
+          estimator.handle_log(t, which, sm[which])
 
     if sm.updated['liveLocationKalman']:
-      x = learner.kf.x
-      P = np.sqrt(learner.kf.P.diagonal())
-      if not all(map(math.isfinite, x)):
-        cloudlog.error("NaN in liveParameters estimate. Resetting to default values")
-        learner = ParamsLearner(CP, CP.steerRatio, 1.0, 0.0)
-        x = learner.kf.x
-
-      angle_offset_average = clip(math.degrees(x[States.ANGLE_OFFSET].item()),
-                                  angle_offset_average - MAX_ANGLE_OFFSET_DELTA, angle_offset_average + MAX_ANGLE_OFFSET_DELTA)
-      angle_offset = clip(math.degrees(x[States.ANGLE_OFFSET].item() + x[States.ANGLE_OFFSET_FAST].item()),
-                          angle_offset - MAX_ANGLE_OFFSET_DELTA, angle_offset + MAX_ANGLE_OFFSET_DELTA)
-      roll = clip(float(x[States.ROAD_ROLL].item()), roll - ROLL_MAX_DELTA, roll + ROLL_MAX_DELTA)
-      roll_std = float(P[States.ROAD_ROLL].item())
-      if learner.active and learner.speed > LOW_ACTIVE_SPEED:
-        # Account for the opposite signs of the yaw rates
-        # At low speeds, bumping into a curb can cause the yaw rate to be very high
-        sensors_valid = bool(abs(learner.speed * (x[States.YAW_RATE].item() + learner.yaw_rate)) < LATERAL_ACC_SENSOR_THRESHOLD)
-      else:
-        sensors_valid = True
-      avg_offset_valid = check_valid_with_hysteresis(avg_offset_valid, angle_offset_average, OFFSET_MAX, OFFSET_LOWERED_MAX)
-      total_offset_valid = check_valid_with_hysteresis(total_offset_valid, angle_offset, OFFSET_MAX, OFFSET_LOWERED_MAX)
-      roll_valid = check_valid_with_hysteresis(roll_valid, roll, ROLL_MAX, ROLL_LOWERED_MAX)
-
-      msg = messaging.new_message('liveParameters')
-
+      msg = estimator.get_msg(valid=sm.all_checks())
       liveParameters = msg.liveParameters
-      liveParameters.posenetValid = True
-      liveParameters.sensorValid = sensors_valid
-      liveParameters.steerRatio = float(x[States.STEER_RATIO].item())
-      liveParameters.stiffnessFactor = float(x[States.STIFFNESS].item())
-      liveParameters.roll = roll
-      liveParameters.angleOffsetAverageDeg = angle_offset_average
-      liveParameters.angleOffsetDeg = angle_offset
-      liveParameters.valid = all((
-        avg_offset_valid,
-        total_offset_valid,
-        roll_valid,
-        roll_std < ROLL_STD_MAX,
-        0.2 <= liveParameters.stiffnessFactor <= 5.0,
-        min_sr <= liveParameters.steerRatio <= max_sr,
-      ))
-      if (CP.carName == "chrysler" and CP.spFlags & ChryslerFlagsSP.SP_RAM_HD_PARAMSD_IGNORE) or \
-         (CP.carName == "subaru" and CP.lateralTuning.which() == 'torque'):
-        liveParameters.valid = True
-      liveParameters.steerRatioStd = float(P[States.STEER_RATIO].item())
-      liveParameters.stiffnessFactorStd = float(P[States.STIFFNESS].item())
-      liveParameters.angleOffsetAverageStd = float(P[States.ANGLE_OFFSET].item())
-      liveParameters.angleOffsetFastStd = float(P[States.ANGLE_OFFSET_FAST].item())
-      if DEBUG:
-        liveParameters.filterState = log.LiveLocationKalman.Measurement.new_message()
-        liveParameters.filterState.value = x.tolist()
-        liveParameters.filterState.std = P.tolist()
-        liveParameters.filterState.valid = True
-
-      msg.valid = sm.all_checks()
 
       if sm.frame % 1200 == 0:  # once a minute
         params = {
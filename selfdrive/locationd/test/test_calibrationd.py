@@ -5,7 +5,7 @@ import numpy as np
 import cereal.messaging as messaging
 from cereal import log
 from openpilot.common.params import Params
-from openpilot.selfdrive.locationd.calibrationd import Calibrator, INPUTS_NEEDED, INPUTS_WANTED, BLOCK_SIZE, MIN_SPEED_FILTER, \
+from openpilot.selfdrive.locationd.calibrationd import Calibrator, process_logs, INPUTS_NEEDED, INPUTS_WANTED, BLOCK_SIZE, MIN_SPEED_FILTER, \
                                                          MAX_YAW_RATE_FILTER, SMOOTH_CYCLES, HEIGHT_INIT, MAX_ALLOWED_PITCH_SPREAD, MAX_ALLOWED_YAW_SPREAD
 
 
@@ -110,3 +110,51 @@ class TestCalibrationd:
     assert c.valid_blocks == 1
     assert c.cal_status == log.LiveCalibrationData.Status.recalibrating
     np.testing.assert_allclose(c.rpy, [0.0, 0.0, MAX_ALLOWED_YAW_SPREAD*1.1], atol=1e-2)
+
+  def test_calibration_auto_reset_spread(self):
+    # after the message with the spread that triggered a mount change reset, the spread of the restarted calibration is reported
+    c = Calibrator(param_put=False)
+    process_messages(c, [0.0, 0.0, 0.0], BLOCK_SIZE * INPUTS_NEEDED)
+    recalibrating = []
+    for _ in range(BLOCK_SIZE + 10):
+      process_messages(c, [0.0, MAX_ALLOWED_PITCH_SPREAD*1.1, 0.0], 1)
+      if c.valid_blocks == 1:
+        recalibrating.append(c.get_msg(True).liveCalibration)
+    assert len(recalibrating) > 1
+    assert recalibrating[0].rpyCalibSpread[1] > MAX_ALLOWED_PITCH_SPREAD
+    for cal in recalibrating:
+      assert cal.calStatus == log.LiveCalibrationData.Status.recalibrating
+    for cal in recalibrating[1:]:
+      assert list(cal.rpyCalibSpread) == [0.0, 0.0, 0.0]
+
+  def test_process_logs(self):
+    # filtering all cameraOdometry at once matches feeding them one by one, including across a mount change reset
+    msgs = []
+    for i in range(BLOCK_SIZE * (INPUTS_NEEDED + 2)):
+      speed = MIN_SPEED_FILTER + (1 if i % 7 else -1)
+      pitch = 0.003 if i < BLOCK_SIZE * INPUTS_NEEDED else MAX_ALLOWED_PITCH_SPREAD*1.1
+      cs = messaging.new_message('carState')
+      cs.logMonoTime = i * 50_000_000
+      cs.carState.vEgo = float(speed)
+      co = messaging.new_message('cameraOdometry')
+      co.logMonoTime = i * 50_000_000 + 1000
+      co.cameraOdometry.trans = [float(speed), 0.005 * speed, float(-np.sin(pitch) * speed)]
+      co.cameraOdometry.rot = [0.0, 0.0, 0.0]
+      co.cameraOdometry.transStd = [1e-3, 1e-3 if i % 11 else 1e3, 1e-3]
+      co.cameraOdometry.roadTransformTrans = [0.0, 0.0, HEIGHT_INIT.item()]
+      co.cameraOdometry.roadTransformTransStd = [1e-3, 1e-3, 1e-3]
+      msgs += [cs.as_reader(), co.as_reader()]
+
+    c = Calibrator(param_put=False)
+    expected = []
+    for i, co in enumerate(m.cameraOdometry for m in msgs if m.which() == 'cameraOdometry'):
+      c.handle_v_ego(co.trans[0])
+      c.handle_cam_odom(co.trans, co.rot, co.wideFromDeviceEuler, co.transStd, co.roadTransformTrans, co.roadTransformTransStd)
+      if i % 5 == 0:
+        expected.append(c.get_msg(True))
+
+    outputs = process_logs(msgs)
+    assert len(outputs) == len(expected)
+    assert outputs[-1].liveCalibration.calStatus == log.LiveCalibrationData.Status.recalibrating
+    for out, ref in zip(outputs, expected, strict=True):
+      assert out.liveCalibration.to_dict() == ref.liveCalibration.to_dict()
@@ -0,0 +1,77 @@
+import numpy as np
+
+import cereal.messaging as messaging
+from cereal import car
+from openpilot.common.realtime import DT_CTRL, DT_MDL
+from openpilot.selfdrive.locationd.helpers import run_estimator
+from openpilot.selfdrive.locationd import torqued
+from openpilot.selfdrive.locationd.torqued import TorqueEstimator, process_logs
+
+
+def get_CP():
+  CP = car.CarParams.new_message(carName='toyota', carFingerprint='TOYOTA_COROLLA_TSS2', steerActuatorDelay=0.12)
+  CP.lateralTuning.init('torque')
+  CP.lateralTuning.torque.friction = 0.1
+  CP.lateralTuning.torque.latAccelFactor = 2.5
+  return CP
+
+
+def generate_logs(duration=120.):
+  np.random.seed(0)
+  msgs = []
+  for t in np.arange(0, duration, DT_CTRL):
+    steer = 0.4 * float(np.sin(2 * np.pi * t / 7))
+    for which in ('carControl', 'carOutput', 'carState'):
+      msg = messaging.new_message(which)
+      msg.logMonoTime = int(t * 1e9) + 1000
+      if which == 'carControl':
+        msg.carControl.latActive = not bool(30 < t < 40)
+      elif which == 'carOutput':
+        msg.carOutput.actuatorsOutput.steer = -steer
+      else:
+        msg.carState.vEgo = 20. + 5 * float(np.sin(t / 10))
+        msg.carState.steeringPressed = bool(60 < t < 62)
+      msgs.append(msg.as_reader())
+
+    if round(t / DT_CTRL) % round(DT_MDL / DT_CTRL) == 0:
+      msg = messaging.new_message('liveLocationKalman')
+      msg.logMonoTime = int(t * 1e9) + 2000
+      msg.liveLocationKalman.angularVelocityCalibrated.value = [0., 0., (2.5 * steer + 0.1 * float(np.random.randn())) / 20.]
+      msg.liveLocationKalman.orientationNED.value = [0.01, 0., 0.]
+      msgs.append(msg.as_reader())
+  return msgs
+
+
+def run_both(CP, msgs):
+  np.random.seed(0)
+  expected = run_estimator(TorqueEstimator(CP), msgs, ['carControl', 'carOutput', 'carState', 'liveLocationKalman'],
+                           poll='liveLocationKalman', publish_every=5)
+  np.random.seed(0)
+  outputs = process_logs(CP, msgs)
+
+  assert len(outputs) == len(expected) > 0
+  for out, ref in zip(outputs, expected, strict=True):
+    np.testing.assert_equal(out.liveTorqueParameters.to_dict(), ref.liveTorqueParameters.to_dict())
+  return expected
+
+
+class TestTorqued:
+  def test_process_logs(self):
+    # selecting points for all messages at once matches feeding them one by one
+    expected = run_both(get_CP(), generate_logs())
+    assert expected[-1].liveTorqueParameters.totalBucketPoints > 0
+
+  def test_process_logs_reset(self, monkeypatch):
+    # the first valid estimate is NaN, resetting the estimator and its raw points mid-drive
+    monkeypatch.setattr(torqued, "MIN_POINTS_TOTAL", 1000)
+    monkeypatch.setattr(torqued, "MIN_BUCKET_POINTS", torqued.MIN_BUCKET_POINTS / 5)
+    estimate_params = TorqueEstimator.estimate_params
+    def estimate_params_nan(self):
+      if self.resets == 1 and self.filtered_points.is_valid():
+        return np.nan, np.nan, np.nan
+      return estimate_params(self)
+    monkeypatch.setattr(TorqueEstimator, "estimate_params", estimate_params_nan)
+
+    expected = run_both(get_CP(), generate_logs())
+    assert expected[-1].liveTorqueParameters.maxResets == 2
+    assert expected[-1].liveTorqueParameters.totalBucketPoints > 0
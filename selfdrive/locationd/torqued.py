@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import capnp
 import numpy as np
 from collections import deque, defaultdict
 
@@ -9,7 +10,7 @@ from openpilot.common.realtime import config_realtime_process, DT_MDL
 from openpilot.common.filter_simple import FirstOrderFilter
 from openpilot.common.swaglog import cloudlog
 from openpilot.selfdrive.controls.lib.vehicle_model import ACCELERATION_DUE_TO_GRAVITY
-from openpilot.selfdrive.locationd.helpers import PointBuckets, ParameterEstimator
+from openpilot.selfdrive.locationd.helpers import PointBuckets, ParameterEstimator, sort_logs
 
 HISTORY = 5  # secs
 POINTS_PER_BUCKET = 1500
@@ -225,6 +226,79 @@ class TorqueEstimator(ParameterEstimator):
     return msg
 
 
+def interp_history(t, xp, fp, n_seen, hist_len, n_reset=0):
+  """np.interp at each time in t over the last hist_len of the n_seen points before it, like the raw_points deques.
+  Only points after the first n_reset are used, as the deques are cleared on reset."""
+  hi = np.clip(n_seen, n_reset + 1, len(xp)) - 1
+  lo = np.minimum(np.maximum(n_seen - hist_len, n_reset), hi)
+  shape = (-1,) + (1,) * (t.ndim - 1)
+  return np.interp(np.clip(t, xp[lo].reshape(shape), xp[hi].reshape(shape)), xp, fp)
+
+
+def select_points(estimator, raw, n_reset):
+  """Returns which liveLocationKalman messages torqued adds a point for, and their steer and lateral acceleration.
+  n_reset is the number of messages of each service seen before the estimator's last reset."""
+  t = raw['t']
+  n_cc, n_co, n_cs = (raw[f'{service}_seen'].astype(int) for service in ('carControl', 'carOutput', 'carState'))
+  r_cc, r_co, r_cs = (n_reset[service] for service in ('carControl', 'carOutput', 'carState'))
+  valid = (n_co - r_co >= estimator.hist_len) & (n_cc > r_cc) & (n_cs > r_cs)
+  steer = lateral_acc = np.zeros_like(t)
+  if valid.any():
+    engage_t = t[:, None] + np.arange(-MIN_ENGAGE_BUFFER, 0, DT_MDL)[None, :]
+    active = interp_history(engage_t, raw['carControl_t'], raw['active'], n_cc, estimator.hist_len, r_cc).astype(bool).all(axis=1)
+    steer_override = interp_history(engage_t, raw['carState_t'], raw['steer_override'], n_cs, estimator.hist_len, r_cs).astype(bool).any(axis=1)
+    vego = interp_history(t, raw['carState_t'], raw['vego'], n_cs, estimator.hist_len, r_cs)
+    steer = interp_history(t, raw['carOutput_t'], raw['steer_torque'], n_co, estimator.hist_len, r_co)
+    lateral_acc = (vego * raw['yaw_rate']) - (np.sin(raw['roll']) * ACCELERATION_DUE_TO_GRAVITY)
+    valid &= active & ~steer_override & (vego > MIN_VEL) & (np.abs(steer) > STEER_MIN_THRESHOLD) & (np.abs(lateral_acc) <= LAT_ACC_THRESHOLD)
+  return valid, steer, lateral_acc
+
+
+def process_logs(CP, msgs, decimated=False) -> list[capnp.lib.capnp._DynamicStructBuilder]:
+  """Runs torqued in-process over logged carControl, carOutput, carState and liveLocationKalman, returning the
+  liveTorqueParameters it would publish. The points of all liveLocationKalman messages are selected at once,
+  and again for the messages after each estimator reset."""
+  estimator = TorqueEstimator(CP, decimated)
+  raw = defaultdict(list)
+  for msg in sort_logs(msgs, ['carControl', 'carOutput', 'carState', 'liveLocationKalman']):
+    t, which = msg.logMonoTime * 1e-9, msg.which()
+    if which == "carControl":
+      raw['carControl_t'].append(t + estimator.lag)
+      raw['active'].append(msg.carControl.latActive)
+    elif which == "carOutput":
+      raw['carOutput_t'].append(t + estimator.lag)
+      raw['steer_torque'].append(-msg.carOutput.actuatorsOutput.steer)
+    elif which == "carState":
+      raw['carState_t'].append(t + estimator.lag)
+      raw['vego'].append(msg.carState.vEgo)
+      raw['steer_override'].append(msg.carState.steeringPressed)
+    elif which == "liveLocationKalman":
+      raw['t'].append(t)
+      raw['yaw_rate'].append(msg.liveLocationKalman.angularVelocityCalibrated.value[2])
+      raw['roll'].append(msg.liveLocationKalman.orientationNED.value[0])
+      for service in ('carControl', 'carOutput', 'carState'):
+        raw[f'{service}_seen'].append(len(raw[f'{service}_t']))
+  raw = {k: np.array(v, dtype=float) for k, v in raw.items()}
+  if 't' not in raw:
+    return []
+
+  # publish at 4Hz, driven by liveLocationKalman
+  outputs = []
+  n_reset = dict.fromkeys(('carControl', 'carOutput', 'carState'), 0)
+  valid, steer, lateral_acc = select_points(estimator, raw, n_reset)
+  for i in range(len(raw['t'])):
+    if valid[i]:
+      estimator.filtered_points.add_point(float(steer[i]), float(lateral_acc[i]))
+    if i % 5 == 0:
+      resets = estimator.resets
+      outputs.append(estimator.get_msg(valid=True))
+      if estimator.resets != resets:
+        # the raw points were cleared, only messages after this one fill the history again
+        n_reset = {service: int(raw[f'{service}_seen'][i]) for service in n_reset}
+        valid, steer, lateral_acc = select_points(estimator, raw, n_reset)
+  return outputs
+
+
 def main(demo=False):
   config_realtime_process([0, 1, 2, 3], 5)
 
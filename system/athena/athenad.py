@@ -4,6 +4,7 @@ from __future__ import annotations
 import platform
 import base64
 import bz2
+import contextlib
 import hashlib
 import io
 import json
@@ -21,8 +22,8 @@ from dataclasses import asdict, dataclass, replace
 from datetime import datetime
 from functools import partial
 from queue import Queue
-from typing import cast
-from collections.abc import Callable
+from typing import BinaryIO, cast
+from collections.abc import Callable, Iterator
 
 import requests
 from jsonrpc import JSONRPCResponseManager, dispatcher
@@ -55,6 +56,7 @@ RETRY_DELAY = 10  # seconds
 MAX_RETRY_COUNT = 30  # Try for at most 5 minutes if upload fails immediately
 MAX_AGE = 31 * 24 * 3600  # seconds
 WS_FRAME_SIZE = 4096
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 NetworkType = log.DeviceState.NetworkType
 
@@ -224,6 +226,52 @@ def cb(sm, item, tid, end_event: threading.Event, sz: int, cur: int) -> None:
   cur_upload_items[tid] = replace(item, progress=cur / sz if sz else 1)
 
 
+def process_upload(sm, tid: int, item: UploadItem, end_event: threading.Event) -> None:
+  cur_upload_items[tid] = item = replace(item, current=True)
+
+  if item.id in cancelled_uploads:
+    cancelled_uploads.remove(item.id)
+    return
+
+  # Remove item if too old
+  age = datetime.now() - datetime.fromtimestamp(item.created_at / 1000)
+  if age.total_seconds() > MAX_AGE:
+    cloudlog.event("athena.upload_handler.expired", item=item, error=True)
+    return
+
+  # Check if uploading over metered connection is allowed
+  sm.update(0)
+  metered = sm['deviceState'].networkMetered
+  network_type = sm['deviceState'].networkType.raw
+  if metered and (not item.allow_cellular):
+    retry_upload(tid, end_event, False)
+    return
+
+  try:
+    fn = item.path
+    try:
+      sz = os.path.getsize(fn)
+    except OSError:
+      sz = -1
+
+    cloudlog.event("athena.upload_handler.upload_start", fn=fn, sz=sz, network_type=network_type, metered=metered, retry_count=item.retry_count)
+    response = _do_upload(item, partial(cb, sm, item, tid, end_event))
+
+    if response.status_code not in (200, 201, 401, 403, 412):
+      cloudlog.event("athena.upload_handler.retry", status_code=response.status_code, fn=fn, sz=sz, network_type=network_type, metered=metered)
+      retry_upload(tid, end_event)
+    else:
+      cloudlog.event("athena.upload_handler.success", fn=fn, sz=sz, network_type=network_type, metered=metered)
+
+    UploadQueueCache.cache(upload_queue)
+  except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, requests.exceptions.SSLError):
+    cloudlog.event("athena.upload_handler.timeout", fn=fn, sz=sz, network_type=network_type, metered=metered)
+    retry_upload(tid, end_event)
+  except AbortTransferException:
+    cloudlog.event("athena.upload_handler.abort", fn=fn, sz=sz, network_type=network_type, metered=metered)
+    retry_upload(tid, end_event, False)
+
+
 def upload_handler(end_event: threading.Event) -> None:
   sm = messaging.SubMaster(['deviceState'])
   tid = threading.get_ident()
@@ -232,56 +280,21 @@ def upload_handler(end_event: threading.Event) -> None:
     cur_upload_items[tid] = None
 
     try:
-      cur_upload_items[tid] = item = replace(upload_queue.get(timeout=1), current=True)
-
-      if item.id in cancelled_uploads:
-        cancelled_uploads.remove(item.id)
-        continue
-
-      # Remove item if too old
-      age = datetime.now() - datetime.fromtimestamp(item.created_at / 1000)
-      if age.total_seconds() > MAX_AGE:
-        cloudlog.event("athena.upload_handler.expired", item=item, error=True)
-        continue
-
-      # Check if uploading over metered connection is allowed
-      sm.update(0)
-      metered = sm['deviceState'].networkMetered
-      network_type = sm['deviceState'].networkType.raw
-      if metered and (not item.allow_cellular):
-        retry_upload(tid, end_event, False)
-        continue
-
-      try:
-        fn = item.path
-        try:
-          sz = os.path.getsize(fn)
-        except OSError:
-          sz = -1
-
-        cloudlog.event("athena.upload_handler.upload_start", fn=fn, sz=sz, network_type=network_type, metered=metered, retry_count=item.retry_count)
-        response = _do_upload(item, partial(cb, sm, item, tid, end_event))
-
-        if response.status_code not in (200, 201, 401, 403, 412):
-          cloudlog.event("athena.upload_handler.retry", status_code=response.status_code, fn=fn, sz=sz, network_type=network_type, metered=metered)
-          retry_upload(tid, end_event)
-        else:
-          cloudlog.event("athena.upload_handler.success", fn=fn, sz=sz, network_type=network_type, metered=metered)
-
-        UploadQueueCache.cache(upload_queue)
-      except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, requests.exceptions.SSLError):
-        cloudlog.event("athena.upload_handler.timeout", fn=fn, sz=sz, network_type=network_type, metered=metered)
-        retry_upload(tid, end_event)
-      except AbortTransferException:
-        cloudlog.event("athena.upload_handler.abort", fn=fn, sz=sz, network_type=network_type, metered=metered)
-        retry_upload(tid, end_event, False)
-
+      process_upload(sm, tid, upload_queue.get(timeout=1), end_event)
     except queue.Empty:
       pass
     except Exception:
       cloudlog.exception("athena.upload_handler.exception")
 
 
+def _bz2_compress_chunks(f: BinaryIO, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+  compressor = bz2.BZ2Compressor()
+  while chunk := f.read(chunk_size):
+    if data := compressor.compress(chunk):
+      yield data
+  yield compressor.flush()
+
+
 def _do_upload(upload_item: UploadItem, callback: Callable = None) -> requests.Response:
   path = upload_item.path
   compress = False
@@ -291,16 +304,25 @@ def _do_upload(upload_item: UploadItem, callback: Callable = None) -> requests.R
     path = strip_bz2_extension(path)
     compress = True
 
-  with open(path, "rb") as f:
-    content = f.read()
+  with open(path, "rb") as f, contextlib.ExitStack() as stack:
+    data: BinaryIO = f
     if compress:
       cloudlog.event("athena.upload_handler.compress", fn=path, fn_orig=upload_item.path)
-      content = bz2.compress(content)
-
-  with io.BytesIO(content) as data:
+      # Compress in bounded chunks into an unnamed file next to the source instead of holding
+      # the whole file in memory. Upload endpoints require a Content-Length, so the compressed
+      # size needs to be known before the first byte is sent.
+      data = stack.enter_context(tempfile.TemporaryFile(dir=os.path.dirname(path)))
+      for chunk in _bz2_compress_chunks(f):
+        data.write(chunk)
+        if callback:
+          # give the callback a chance to abort during long compressions
+          callback(1, 0)
+      data.seek(0)
+
+    size = os.fstat(data.fileno()).st_size
     return requests.put(upload_item.url,
-                        data=CallbackReader(data, callback, len(content)) if callback else data,
-                        headers={**upload_item.headers, 'Content-Length': str(len(content))},
+                        data=CallbackReader(data, callback, size) if callback else data,
+                        headers={**upload_item.headers, 'Content-Length': str(size)},
                         timeout=30)
 
 
@@ -630,8 +652,37 @@ def add_log_to_queue(log_path, log_id, is_sunnylink = False):
       low_priority_send_queue.put_nowait(jsonrpc_str)
 
 
+def forward_log(log_files: list[str], log_attr_name=LOG_ATTR_NAME) -> str | None:
+  # sends the newest log file, returns its name if it was sent
+  log_entry = log_files.pop()
+  cloudlog.debug(f"athena.log_handler.forward_request {log_entry}")
+  try:
+    curr_time = int(time.time())
+    log_path = os.path.join(Paths.swaglog_root(), log_entry)
+    setxattr(log_path, log_attr_name, int.to_bytes(curr_time, 4, sys.byteorder))
+
+    add_log_to_queue(log_path, log_entry, log_attr_name != LOG_ATTR_NAME)
+    return log_entry
+  except OSError:
+    return None  # file could be deleted by log rotation
+
+
+def handle_log_response(data: str, log_attr_name=LOG_ATTR_NAME) -> str | None:
+  # marks the log of a forwardLogs response as sent, returns its name
+  log_resp = json.loads(data)
+  log_entry = log_resp.get("id")
+  log_success = "result" in log_resp and log_resp["result"].get("success")
+  cloudlog.debug(f"athena.log_handler.forward_response {log_entry} {log_success}")
+  if log_entry and log_success:
+    log_path = os.path.join(Paths.swaglog_root(), log_entry)
+    try:
+      setxattr(log_path, log_attr_name, LOG_ATTR_VALUE_MAX_UNIX_TIME)
+    except OSError:
+      pass  # file could be deleted by log rotation
+  return log_entry
+
+
 def log_handler(end_event: threading.Event, log_attr_name=LOG_ATTR_NAME) -> None:
-  is_sunnylink = log_attr_name != LOG_ATTR_NAME
   if PC:
     cloudlog.debug("athena.log_handler: Not supported on PC")
     time.sleep(1)
@@ -649,17 +700,7 @@ def log_handler(end_event: threading.Event, log_attr_name=LOG_ATTR_NAME) -> None
       # send one log
       curr_log = None
       if len(log_files) > 0:
-        log_entry = log_files.pop() # newest log file
-        cloudlog.debug(f"athena.log_handler.forward_request {log_entry}")
-        try:
-          curr_time = int(time.time())
-          log_path = os.path.join(Paths.swaglog_root(), log_entry)
-          setxattr(log_path, log_attr_name, int.to_bytes(curr_time, 4, sys.byteorder))
-
-          add_log_to_queue(log_path, log_entry, is_sunnylink)
-          curr_log = log_entry
-        except OSError:
-          pass  # file could be deleted by log rotation
+        curr_log = forward_log(log_files, log_attr_name)
 
       # wait for response up to ~100 seconds
       # always read queue at least once to process any old responses that arrive
@@ -667,16 +708,7 @@ def log_handler(end_event: threading.Event, log_attr_name=LOG_ATTR_NAME) -> None
         if end_event.is_set():
           break
         try:
-          log_resp = json.loads(log_recv_queue.get(timeout=1))
-          log_entry = log_resp.get("id")
-          log_success = "result" in log_resp and log_resp["result"].get("success")
-          cloudlog.debug(f"athena.log_handler.forward_response {log_entry} {log_success}")
-          if log_entry and log_success:
-            log_path = os.path.join(Paths.swaglog_root(), log_entry)
-            try:
-              setxattr(log_path, log_attr_name, LOG_ATTR_VALUE_MAX_UNIX_TIME)
-            except OSError:
-              pass  # file could be deleted by log rotation
+          log_entry = handle_log_response(log_recv_queue.get(timeout=1), log_attr_name)
           if curr_log == log_entry:
             break
         except queue.Empty:
@@ -687,28 +719,29 @@ def log_handler(end_event: threading.Event, log_attr_name=LOG_ATTR_NAME) -> None
       cloudlog.exception("athena.log_handler.exception")
 
 
+def forward_stat(stats_dir: str) -> None:
+  # sends and removes one stats file
+  stat_filenames = list(filter(lambda name: not name.startswith(tempfile.gettempprefix()), os.listdir(stats_dir)))
+  if len(stat_filenames) > 0:
+    stat_path = os.path.join(stats_dir, stat_filenames[0])
+    with open(stat_path) as f:
+      jsonrpc = {
+        "method": "storeStats",
+        "params": {
+          "stats": f.read()
+        },
+        "jsonrpc": "2.0",
+        "id": stat_filenames[0]
+      }
+      low_priority_send_queue.put_nowait(json.dumps(jsonrpc))
+    os.remove(stat_path)
+
+
 def stat_handler(end_event: threading.Event) -> None:
   STATS_DIR = Paths.stats_root()
   while not end_event.is_set():
-    last_scan = 0.
-    curr_scan = time.monotonic()
     try:
-      if curr_scan - last_scan > 10:
-        stat_filenames = list(filter(lambda name: not name.startswith(tempfile.gettempprefix()), os.listdir(STATS_DIR)))
-        if len(stat_filenames) > 0:
-          stat_path = os.path.join(STATS_DIR, stat_filenames[0])
-          with open(stat_path) as f:
-            jsonrpc = {
-              "method": "storeStats",
-              "params": {
-                "stats": f.read()
-              },
-              "jsonrpc": "2.0",
-              "id": stat_filenames[0]
-            }
-            low_priority_send_queue.put_nowait(json.dumps(jsonrpc))
-          os.remove(stat_path)
-        last_scan = curr_scan
+      forward_stat(STATS_DIR)
     except Exception:
       cloudlog.exception("athena.stat_handler.exception")
     time.sleep(0.1)
@@ -804,6 +837,20 @@ def ws_send(ws: WebSocket, end_event: threading.Event) -> None:
       end_event.set()
 
 
+def set_keepalive(sock: socket.socket, onroad: bool) -> None:
+  if platform.system() == 'Darwin':  # macOS
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, 7 if onroad else 30)
+  else:
+    # While not sending data, onroad, we can expect to time out in 7 + (7 * 2) = 21s
+    #                         offroad, we can expect to time out in 30 + (10 * 3) = 60s
+    # FIXME: TCP_USER_TIMEOUT is effectively 2x for some reason (32s), so it's mostly unused
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, 16000 if onroad else 0)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 7 if onroad else 30)
+  sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 7 if onroad else 10)
+  sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 2 if onroad else 3)
+
+
 def ws_manage(ws: WebSocket, end_event: threading.Event) -> None:
   params = Params()
   onroad_prev = None
@@ -815,24 +862,25 @@ def ws_manage(ws: WebSocket, end_event: threading.Event) -> None:
       onroad_prev = onroad
 
       if sock is not None:
-        if platform.system() == 'Darwin':  # macOS
-          sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-          sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPALIVE, 7 if onroad else 30)
-        else:
-          # While not sending data, onroad, we can expect to time out in 7 + (7 * 2) = 21s
-          #                         offroad, we can expect to time out in 30 + (10 * 3) = 60s
-          # FIXME: TCP_USER_TIMEOUT is effectively 2x for some reason (32s), so it's mostly unused
-          sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, 16000 if onroad else 0)
-          sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 7 if onroad else 30)
-        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 7 if onroad else 10)
-        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 2 if onroad else 3)
+        set_keepalive(sock, onroad)
 
 
 def backoff(retries: int) -> int:
   return random.randrange(0, min(128, int(2 ** retries)))
 
 
-def main(exit_event: threading.Event = None):
+def connect_ws(ws_uri: str, token: str) -> WebSocket:
+  return create_connection(ws_uri,
+                           cookie="jwt=" + token,
+                           enable_multithread=True,
+                           timeout=30.0)
+
+
+def main(exit_event: threading.Event = None, connect: Callable = None, long_poll: Callable = None):
+  # connect and long_poll run each connection, athenad_asyncio replaces them to run it on an event loop
+  connect = connect or connect_ws
+  long_poll = long_poll or handle_long_poll
+
   try:
     set_core_affinity([0, 1, 2, 3])
   except Exception:
@@ -853,10 +901,7 @@ def main(exit_event: threading.Event = None):
         conn_start = time.monotonic()
 
       cloudlog.event("athenad.main.connecting_ws", ws_uri=ws_uri, retries=conn_retries)
-      ws = create_connection(ws_uri,
-                             cookie="jwt=" + api.get_token(),
-                             enable_multithread=True,
-                             timeout=30.0)
+      ws = connect(ws_uri, api.get_token())
       cloudlog.event("athenad.main.connected_ws", ws_uri=ws_uri, retries=conn_retries,
                      duration=time.monotonic() - conn_start)
       conn_start = None
@@ -864,7 +909,7 @@ def main(exit_event: threading.Event = None):
       conn_retries = 0
       cur_upload_items.clear()
 
-      handle_long_poll(ws, exit_event)
+      long_poll(ws, exit_event)
     except (KeyboardInterrupt, SystemExit):
       break
     except (ConnectionError, TimeoutError, WebSocketException):
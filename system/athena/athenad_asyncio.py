@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""athenad with the websocket session on an asyncio event loop.
+
+manage_athenad runs this instead of athenad.py when ATHENAD_ASYNCIO is set. Connecting, reconnect
+backoff and the upload queue are shared with athenad.main; only the per-connection long poll differs.
+
+Here the websocket, JSON-RPC dispatch and the send path all live on a single event loop, so a
+request is handled as soon as it is read instead of hopping through recv/send queues and worker
+threads. Handlers registered with `@dispatcher.add_method` in athenad are reused unchanged; they
+run in a small executor because most of them block (Params, messaging, HARDWARE). Uploads and
+their file IO get an executor of their own so a large upload never delays an RPC.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import queue
+import threading
+import time
+from collections.abc import Awaitable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import aiohttp
+from jsonrpc import JSONRPCResponseManager, dispatcher
+from jsonrpc.dispatcher import Dispatcher
+
+import cereal.messaging as messaging
+from openpilot.common.params import Params
+from openpilot.common.swaglog import cloudlog
+from openpilot.system.athena import athenad
+from openpilot.system.athena.athenad import HANDLER_THREADS, RECONNECT_TIMEOUT_S
+from openpilot.system.hardware import PC
+from openpilot.system.hardware.hw import Paths
+
+LOW_PRIORITY_POLL_S = 0.1
+
+
+class AsyncDispatcher:
+  """Handles JSON-RPC requests against a jsonrpc `Dispatcher` from the event loop."""
+  def __init__(self, executor: ThreadPoolExecutor, methods: Dispatcher = dispatcher):
+    self.executor = executor
+    self.methods = methods
+
+  async def handle(self, data: str) -> str:
+    loop = asyncio.get_running_loop()
+    response = await loop.run_in_executor(self.executor, JSONRPCResponseManager.handle, data, self.methods)
+    return response.json
+
+
+class AthenadSession:
+  def __init__(self, ws: aiohttp.ClientWebSocketResponse, rpc: AsyncDispatcher, upload_executor: ThreadPoolExecutor):
+    self.ws = ws
+    self.rpc = rpc
+    self.upload_executor = upload_executor
+
+    self.send_queue: asyncio.Queue[str] = asyncio.Queue()
+    self.log_recv_queue: asyncio.Queue[str] = asyncio.Queue()
+    # the event loop only keeps weak references to tasks, this keeps them alive until they're done
+    self.background_tasks: set[asyncio.Future] = set()
+    self.end_event = asyncio.Event()
+    # mirrors end_event for the blocking handlers running in executors
+    self.thread_end_event = threading.Event()
+    self.params = Params()
+
+  def end(self) -> None:
+    self.end_event.set()
+    self.thread_end_event.set()
+
+  async def wait_end(self, timeout: float) -> None:
+    try:
+      await asyncio.wait_for(self.end_event.wait(), timeout)
+    except TimeoutError:
+      pass
+
+  def spawn(self, aw: Awaitable) -> asyncio.Future:
+    task = asyncio.ensure_future(aw)
+    self.background_tasks.add(task)
+    task.add_done_callback(self._task_done)
+    return task
+
+  def _task_done(self, task: asyncio.Future) -> None:
+    self.background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+      cloudlog.error("athenad.task.exception", exc_info=task.exception())
+
+  async def ws_recv(self) -> None:
+    loop = asyncio.get_running_loop()
+    last_ping = int(time.monotonic() * 1e9)
+    while not self.end_event.is_set():
+      try:
+        msg = await self.ws.receive(timeout=1)
+      except TimeoutError:
+        ns_since_last_ping = int(time.monotonic() * 1e9) - last_ping
+        if ns_since_last_ping > RECONNECT_TIMEOUT_S * 1e9:
+          cloudlog.error("athenad.ws_recv.timeout")
+          self.end()
+        continue
+      except Exception:
+        cloudlog.exception("athenad.ws_recv.exception")
+        self.end()
+        continue
+
+      if msg.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+        data = msg.data.decode("utf-8") if msg.type == aiohttp.WSMsgType.BINARY else msg.data
+        self.spawn(self.handle_message(data))
+      elif msg.type == aiohttp.WSMsgType.PING:
+        await self.ws.pong(msg.data)
+        last_ping = int(time.monotonic() * 1e9)
+        self.spawn(loop.run_in_executor(self.rpc.executor, self.params.put, "LastAthenaPingTime", str(last_ping)))
+      elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+        cloudlog.event("athenad.ws_recv.closed", type=str(msg.type))
+        self.end()
+
+  async def handle_message(self, data: str) -> None:
+    try:
+      if "method" in data:
+        cloudlog.event("athena.jsonrpc_handler.call_method", data=data)
+        self.send_queue.put_nowait(await self.rpc.handle(data))
+      elif "id" in data and ("result" in data or "error" in data):
+        self.log_recv_queue.put_nowait(data)
+      else:
+        cloudlog.event("athena.jsonrpc_handler.invalid_request", error=True, data=data)
+        raise Exception("not a valid request or response")
+    except Exception as e:
+      cloudlog.exception("athena jsonrpc handler failed")
+      self.send_queue.put_nowait(json.dumps({"error": str(e)}))
+
+  async def ws_send(self) -> None:
+    while not self.end_event.is_set():
+      try:
+        try:
+          data = self.send_queue.get_nowait()
+        except asyncio.QueueEmpty:
+          try:
+            data = athenad.low_priority_send_queue.get_nowait()
+          except queue.Empty:
+            # responses wake us up immediately, low priority data is picked up periodically
+            try:
+              data = await asyncio.wait_for(self.send_queue.get(), LOW_PRIORITY_POLL_S)
+            except TimeoutError:
+              continue
+        await self.ws.send_str(data)
+      except Exception:
+        cloudlog.exception("athenad.ws_send.exception")
+        self.end()
+
+  async def ws_manage(self) -> None:
+    loop = asyncio.get_running_loop()
+    onroad_prev = None
+    sock = self.ws.get_extra_info('socket')
+
+    while not self.end_event.is_set():
+      onroad = await loop.run_in_executor(self.rpc.executor, self.params.get_bool, "IsOnroad")
+      if onroad != onroad_prev and sock is not None:
+        onroad_prev = onroad
+        athenad.set_keepalive(sock, onroad)
+
+      await self.wait_end(5)
+
+  async def upload_scheduler(self) -> None:
+    # same steps as athenad.upload_handler, every blocking call runs on the upload executor's thread
+    loop = asyncio.get_running_loop()
+    sm = await loop.run_in_executor(self.upload_executor, messaging.SubMaster, ['deviceState'])
+    tid = await loop.run_in_executor(self.upload_executor, threading.get_ident)
+
+    while not self.end_event.is_set():
+      athenad.cur_upload_items[tid] = None
+
+      try:
+        item = await loop.run_in_executor(self.upload_executor, partial(athenad.upload_queue.get, timeout=1))
+        await loop.run_in_executor(self.upload_executor, athenad.process_upload, sm, tid, item, self.thread_end_event)
+      except queue.Empty:
+        pass
+      except Exception:
+        cloudlog.exception("athena.upload_handler.exception")
+
+  async def log_forwarder(self) -> None:
+    if PC:
+      cloudlog.debug("athena.log_handler: Not supported on PC")
+      return
+
+    loop = asyncio.get_running_loop()
+    log_files: list[str] = []
+    last_scan = 0.
+    while not self.end_event.is_set():
+      try:
+        curr_scan = time.monotonic()
+        if curr_scan - last_scan > 10:
+          log_files = await loop.run_in_executor(self.rpc.executor, athenad.get_logs_to_send_sorted)
+          last_scan = curr_scan
+
+        # send one log
+        curr_log = None
+        if len(log_files) > 0:
+          curr_log = await loop.run_in_executor(self.rpc.executor, athenad.forward_log, log_files)
+
+        # wait for response up to ~100 seconds
+        # always read queue at least once to process any old responses that arrive
+        for _ in range(100):
+          if self.end_event.is_set():
+            break
+          try:
+            data = await asyncio.wait_for(self.log_recv_queue.get(), 1)
+          except TimeoutError:
+            if curr_log is None:
+              break
+            continue
+          log_entry = await loop.run_in_executor(self.rpc.executor, athenad.handle_log_response, data)
+          if curr_log == log_entry:
+            break
+
+      except Exception:
+        cloudlog.exception("athena.log_handler.exception")
+
+  async def stat_forwarder(self) -> None:
+    loop = asyncio.get_running_loop()
+    stats_dir = Paths.stats_root()
+    while not self.end_event.is_set():
+      try:
+        await loop.run_in_executor(self.rpc.executor, athenad.forward_stat, stats_dir)
+      except Exception:
+        cloudlog.exception("athena.stat_handler.exception")
+      await self.wait_end(0.1)
+
+  async def run(self, exit_event: threading.Event | None) -> None:
+    dispatcher["startLocalProxy"] = partial(athenad.startLocalProxy, self.thread_end_event)
+
+    for coro in (self.ws_recv(), self.ws_send(), self.ws_manage(), self.upload_scheduler(), self.log_forwarder(), self.stat_forwarder()):
+      self.spawn(coro)
+    try:
+      while not self.end_event.is_set():
+        if exit_event is not None and exit_event.is_set():
+          self.end()
+        await self.wait_end(0.1)
+    finally:
+      self.end()
+      while self.background_tasks:
+        await asyncio.wait(list(self.background_tasks))
+
+
+async def handle_long_poll(ws: aiohttp.ClientWebSocketResponse, exit_event: threading.Event | None) -> None:
+  rpc_executor = ThreadPoolExecutor(HANDLER_THREADS, thread_name_prefix='worker')
+  upload_executor = ThreadPoolExecutor(1, thread_name_prefix='upload_handler')
+  try:
+    await AthenadSession(ws, AsyncDispatcher(rpc_executor), upload_executor).run(exit_event)
+  finally:
+    await ws.close()
+    rpc_executor.shutdown(wait=True)
+    upload_executor.shutdown(wait=True)
+
+
+class EventLoopRunner:
+  """Runs athenad.main's connect and long poll on one event loop, reusing the aiohttp session across reconnects."""
+  def __init__(self):
+    self.loop = asyncio.new_event_loop()
+    self.session: aiohttp.ClientSession | None = None
+
+  async def _connect(self, ws_uri: str, token: str) -> aiohttp.ClientWebSocketResponse:
+    if self.session is None:
+      # bounds the handshake like athenad's create_connection timeout, ws_recv's RECONNECT_TIMEOUT_S covers the open connection
+      self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30.))
+    try:
+      # pings are answered by ws_recv, which also tracks them for LastAthenaPingTime
+      return await self.session.ws_connect(ws_uri, headers={'Cookie': f'jwt={token}'}, autoping=False)
+    except aiohttp.ClientError as e:
+      raise ConnectionError(str(e)) from e
+
+  def connect(self, ws_uri: str, token: str) -> aiohttp.ClientWebSocketResponse:
+    return self.loop.run_until_complete(self._connect(ws_uri, token))
+
+  def long_poll(self, ws: aiohttp.ClientWebSocketResponse, exit_event: threading.Event | None) -> None:
+    self.loop.run_until_complete(handle_long_poll(ws, exit_event))
+
+  def close(self) -> None:
+    if self.session is not None:
+      self.loop.run_until_complete(self.session.close())
+    self.loop.close()
+
+
+def main(exit_event: threading.Event = None):
+  runner = EventLoopRunner()
+  try:
+    athenad.main(exit_event, connect=runner.connect, long_poll=runner.long_poll)
+  finally:
+    runner.close()
+
+
+if __name__ == "__main__":
+  main()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import os
 import time
 from multiprocessing import Process
 
@@ -10,10 +11,13 @@ from openpilot.system.hardware import HARDWARE
 from openpilot.system.version import get_build_metadata
 
 ATHENA_MGR_PID_PARAM = "AthenadPid"
+# runs the websocket session on an event loop, see system/athena/athenad_asyncio.py
+ATHENAD_ASYNCIO = os.getenv("ATHENAD_ASYNCIO") is not None
 
 
 def main():
-  manage_athenad("DongleId", ATHENA_MGR_PID_PARAM, 'athenad', 'system.athena.athenad')
+  target = 'system.athena.athenad_asyncio' if ATHENAD_ASYNCIO else 'system.athena.athenad'
+  manage_athenad("DongleId", ATHENA_MGR_PID_PARAM, 'athenad', target)
 
 
 def manage_athenad(dongle_id_param, pid_param, process_name, target):
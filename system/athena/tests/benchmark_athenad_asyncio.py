@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""RPC round-trip latency of the asyncio athenad session while bz2 uploads are running"""
+import asyncio
+import os
+import queue
+import time
+
+import numpy as np
+
+from openpilot.common.params import Params
+from openpilot.system.athena import athenad
+from openpilot.system.athena.tests.helpers import HTTPRequestHandler
+from openpilot.system.athena.tests.test_athenad_asyncio import run_session
+from openpilot.selfdrive.test.helpers import http_server_context
+from openpilot.system.hardware.hw import Paths
+
+RPC_COUNT = 200
+UPLOADS = 3
+UPLOAD_SIZE = 20 * 1024 * 1024
+
+
+def main():
+  Params().put("AthenadUploadQueue", '[]')
+  athenad.upload_queue = queue.Queue()
+  athenad.cur_upload_items.clear()
+
+  fn = os.path.join(Paths.log_root(), 'qlog')
+  os.makedirs(Paths.log_root(), exist_ok=True)
+  with open(fn, 'wb') as f:
+    f.write(os.urandom(UPLOAD_SIZE))
+
+  # the session's upload scheduler picks these up alongside the RPCs
+  try:
+    with http_server_context(handler=HTTPRequestHandler) as (host, port):
+      # compressed on the fly, so the uploads compete for CPU as well as IO
+      for i in range(UPLOADS):
+        athenad.upload_queue.put_nowait(athenad.UploadItem(path=fn + '.bz2', url=f"http://{host}:{port}/qlog{i}.bz2", headers={},
+                                                           created_at=int(time.time() * 1000), id=str(i)))
+      latencies = asyncio.run(run_session(RPC_COUNT, wait_for_uploads=True))
+  finally:
+    os.remove(fn)
+
+  p50, p99 = np.percentile(latencies, [50, 99])
+  print(f"RPC round trip under upload load: p50 {p50 * 1000:.2f} ms, p99 {p99 * 1000:.2f} ms, max {max(latencies) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+  main()
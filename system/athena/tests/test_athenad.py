@@ -1,4 +1,5 @@
 import pytest
+import bz2
 from functools import wraps
 import json
 import multiprocessing
@@ -20,7 +21,7 @@ from openpilot.common.params import Params
 from openpilot.common.timeout import Timeout
 from openpilot.system.athena import athenad
 from openpilot.system.athena.athenad import MAX_RETRY_COUNT, dispatcher
-from openpilot.system.athena.tests.helpers import HTTPRequestHandler, MockWebsocket, MockApi, EchoSocket
+from openpilot.system.athena.tests.helpers import HTTPRequestHandler, MockResponse, MockWebsocket, MockApi, EchoSocket
 from openpilot.selfdrive.test.helpers import http_server_context
 from openpilot.system.hardware.hw import Paths
 
@@ -193,6 +194,25 @@ class TestAthenadMethods:
     resp = athenad._do_upload(item)
     assert resp.status_code == 201
 
+  def test_do_upload_compress_streaming(self, mocker):
+    content = os.urandom(3 * athenad.UPLOAD_CHUNK_SIZE + 1)
+    fn = self._create_file('qlog', data=content)
+
+    sent = {}
+    def mock_put(url, data, headers, timeout):
+      sent['body'] = data.read()
+      sent['length'] = int(headers['Content-Length'])
+      return MockResponse("", 201)
+    mocker.patch('requests.put', side_effect=mock_put)
+
+    callback = mocker.Mock()
+    item = athenad.UploadItem(path=fn + '.bz2', url="http://localhost:1238", headers={}, created_at=int(time.time()*1000), id='')
+    resp = athenad._do_upload(item, callback)
+    assert resp.status_code == 201
+    assert sent['length'] == len(sent['body'])
+    assert bz2.decompress(sent['body']) == content
+    callback.assert_called_with(sent['length'], sent['length'])
+
   def test_upload_file_to_url(self, host):
     fn = self._create_file('qlog.bz2')
 
@@ -0,0 +1,194 @@
+import asyncio
+import contextlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from aiohttp import ClientSession, WSMsgType, web
+
+from openpilot.common.params import Params
+from openpilot.system.athena import athenad, athenad_asyncio
+from openpilot.system.hardware.hw import Paths
+
+RPC_COUNT = 20
+
+
+@contextlib.asynccontextmanager
+async def athena_server(ws_handler):
+  """Local websocket server standing in for athena, yields its url."""
+  app = web.Application()
+  app.router.add_get('/{path:.*}', ws_handler)
+  runner = web.AppRunner(app)
+  await runner.setup()
+  site = web.TCPSite(runner, '127.0.0.1', 0)
+  await site.start()
+  port = site._server.sockets[0].getsockname()[1]
+  try:
+    yield f'http://127.0.0.1:{port}'
+  finally:
+    await runner.cleanup()
+
+
+@contextlib.asynccontextmanager
+async def athena_stand_in(ws_handler):
+  """Yields a websocket connected to a local athena stand-in."""
+  async with athena_server(ws_handler) as url, ClientSession() as session, session.ws_connect(f'{url}/ws', autoping=False) as ws:
+    yield ws
+
+
+async def run_until(condition, timeout: float = 10.) -> None:
+  """Runs an athenad session until condition() is true."""
+  async def ws_handler(request):
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    while not condition():
+      await asyncio.sleep(0.01)
+    await ws.close()
+    return ws
+
+  async with athena_stand_in(ws_handler) as ws:
+    await asyncio.wait_for(athenad_asyncio.handle_long_poll(ws, None), timeout)
+
+
+async def run_session(rpc_count: int = RPC_COUNT, wait_for_uploads: bool = False) -> list[float]:
+  """Runs an athenad session against a local websocket stand-in and returns the RPC round-trip times."""
+  latencies: list[float] = []
+
+  async def ws_handler(request):
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+
+    # wait for uploads to start so RPCs are measured under load
+    while wait_for_uploads and not any(athenad.cur_upload_items.values()):
+      await asyncio.sleep(0.01)
+
+    for i in range(rpc_count):
+      t = time.monotonic()
+      await ws.send_str(json.dumps({"method": "echo", "params": [f"hello{i}"], "jsonrpc": "2.0", "id": i}))
+      msg = await ws.receive()
+      latencies.append(time.monotonic() - t)
+
+      assert msg.type == WSMsgType.TEXT
+      assert json.loads(msg.data) == {"jsonrpc": "2.0", "id": i, "result": f"hello{i}"}
+
+    await ws.close()
+    return ws
+
+  async with athena_stand_in(ws_handler) as ws:
+    await asyncio.wait_for(athenad_asyncio.handle_long_poll(ws, None), 60)
+
+  return latencies
+
+
+class TestAthenadAsyncio:
+  def setup_method(self):
+    Params().put("AthenadUploadQueue", '[]')
+    athenad.upload_queue = queue.Queue()
+    athenad.cur_upload_items.clear()
+    athenad.cancelled_uploads.clear()
+
+  def test_rpc_round_trip(self):
+    latencies = asyncio.run(run_session())
+    assert len(latencies) == RPC_COUNT
+    # generous, this isn't a benchmark. see system/athena/tests/benchmark_athenad_asyncio.py
+    assert max(latencies) < 5.
+
+  def test_invalid_request(self):
+    async def run():
+      responses = []
+
+      async def ws_handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.send_str("{}")
+        responses.append(json.loads((await ws.receive()).data))
+        await ws.close()
+        return ws
+
+      async with athena_stand_in(ws_handler) as ws:
+        await asyncio.wait_for(athenad_asyncio.handle_long_poll(ws, None), 10)
+      return responses
+
+    assert asyncio.run(run()) == [{"error": "not a valid request or response"}]
+
+  @pytest.mark.parametrize("status,retry", [(200, False), (500, True)])
+  def test_upload_scheduler(self, mocker, status, retry):
+    mock_put = mocker.patch('requests.put')
+    mock_put.return_value.status_code = status
+    fn = os.path.join(Paths.log_root(), 'qlog')
+    os.makedirs(Paths.log_root(), exist_ok=True)
+    with open(fn, 'wb') as f:
+      f.write(b'qlog')
+    item = athenad.UploadItem(path=fn, url="http://localhost:44444/qlog", headers={}, created_at=int(time.time() * 1000), id='', allow_cellular=True)
+
+    athenad.upload_queue.put_nowait(item)
+    asyncio.run(run_until(lambda: mock_put.called and (not retry or athenad.upload_queue.qsize() == 1)))
+
+    assert mock_put.call_args.args[0] == item.url
+    assert athenad.upload_queue.qsize() == (1 if retry else 0)
+    if retry:
+      assert athenad.upload_queue.get().retry_count == 1
+    # the upload executor's thread is done with the item once the session ends
+    assert not any(athenad.cur_upload_items.values())
+
+  def test_background_task_exception(self, mocker):
+    mock_error = mocker.patch('openpilot.system.athena.athenad_asyncio.cloudlog.error')
+
+    async def run():
+      session = athenad_asyncio.AthenadSession(None, athenad_asyncio.AsyncDispatcher(ThreadPoolExecutor(1)), ThreadPoolExecutor(1))
+
+      async def fail():
+        raise ValueError("lost")
+
+      task = session.spawn(fail())
+      assert task in session.background_tasks
+      await asyncio.wait([task])
+      await asyncio.sleep(0)
+      return session
+
+    session = asyncio.run(run())
+    assert len(session.background_tasks) == 0
+    assert isinstance(mock_error.call_args.kwargs['exc_info'], ValueError)
+
+  def test_connect_error(self):
+    runner = athenad_asyncio.EventLoopRunner()
+    try:
+      with pytest.raises(ConnectionError):
+        runner.connect('http://127.0.0.1:1/ws', 'token')
+    finally:
+      runner.close()
+
+  def test_main(self, mocker):
+    mocker.patch('openpilot.system.athena.athenad.Api').return_value.get_token.return_value = 'token'
+    Params().put("DongleId", "0000000000000000")
+    exit_event = threading.Event()
+    cookies = []
+
+    async def ws_handler(request):
+      ws = web.WebSocketResponse()
+      await ws.prepare(request)
+      cookies.append(request.cookies.get('jwt'))
+      await ws.send_str(json.dumps({"method": "echo", "params": ["hello"], "jsonrpc": "2.0", "id": 0}))
+      assert json.loads((await ws.receive()).data)["result"] == "hello"
+      # reconnect once, then exit
+      if len(cookies) == 2:
+        exit_event.set()
+      await ws.close()
+      return ws
+
+    runner = athenad_asyncio.EventLoopRunner()
+    server = athena_server(ws_handler)
+    url = runner.loop.run_until_complete(server.__aenter__())
+    mocker.patch('openpilot.system.athena.athenad.ATHENA_HOST', url)
+    mocker.patch('openpilot.system.athena.athenad.backoff', return_value=0)
+    try:
+      athenad.main(exit_event, connect=runner.connect, long_poll=runner.long_poll)
+    finally:
+      runner.loop.run_until_complete(server.__aexit__(None, None, None))
+      runner.close()
+
+    assert cookies == ['token', 'token']
@@ -1,3 +1,4 @@
+import threading
 from abc import abstractmethod, ABC
 from collections import namedtuple
 
@@ -72,6 +73,10 @@ class HardwareBase(ABC):
   def get_network_metered(self, network_type) -> bool:
     return network_type not in (NetworkType.none, NetworkType.wifi, NetworkType.ethernet)
 
+  def get_network_change_event(self) -> threading.Event | None:
+    """Event set when the network state may have changed, None if it has to be polled"""
+    return None
+
   @staticmethod
   def set_bandwidth_limit(upload_speed_kbps: int, download_speed_kbps: int) -> None:
     pass
@@ -31,6 +31,9 @@ NetworkStrength = log.DeviceState.NetworkStrength
 CURRENT_TAU = 15.   # 15s time constant
 TEMP_TAU = 5.   # 5s time constant
 DISCONNECT_TIMEOUT = 5.  # wait 5 seconds before going offroad after disconnect so you get an alert
+HW_STATE_INTERVAL = 10.  # seconds between the slow hardware state updates
+NETWORK_SIGNALED_INTERVAL = 60.  # when network changes are signaled, its state is only polled as a fallback
+THERMAL_ZONE_PATH = "/sys/devices/virtual/thermal"
 PANDA_STATES_TIMEOUT = round(1000 / SERVICE_LIST['pandaStates'].frequency * 1.5)  # 1.5x the expected pandaState frequency
 
 ThermalBand = namedtuple("ThermalBand", ['min_temp', 'max_temp'])
@@ -52,13 +55,14 @@ OFFROAD_DANGER_TEMP = 75
 prev_offroad_states: dict[str, tuple[bool, str | None]] = {}
 
 tz_by_type: dict[str, int] | None = None
+tz_fds: dict[int, int] = {}
 def populate_tz_by_type():
   global tz_by_type
   tz_by_type = {}
-  for n in os.listdir("/sys/devices/virtual/thermal"):
+  for n in os.listdir(THERMAL_ZONE_PATH):
     if not n.startswith("thermal_zone"):
       continue
-    with open(os.path.join("/sys/devices/virtual/thermal", n, "type")) as f:
+    with open(os.path.join(THERMAL_ZONE_PATH, n, "type")) as f:
       tz_by_type[f.read().strip()] = int(n.removeprefix("thermal_zone"))
 
 def read_tz(x):
@@ -70,9 +74,11 @@ def read_tz(x):
       populate_tz_by_type()
     x = tz_by_type[x]
 
+  # temp files are kept open, sysfs regenerates them on each read from the start
   try:
-    with open(f"/sys/devices/virtual/thermal/thermal_zone{x}/temp") as f:
-      return int(f.read())
+    if x not in tz_fds:
+      tz_fds[x] = os.open(os.path.join(THERMAL_ZONE_PATH, f"thermal_zone{x}", "temp"), os.O_RDONLY)
+    return int(os.pread(tz_fds[x], 32, 0))
   except FileNotFoundError:
     return 0
 
@@ -95,7 +101,6 @@ def set_offroad_alert_if_changed(offroad_alert: str, show_alert: bool, extra_tex
 
 def hw_state_thread(end_event, hw_queue):
   """Handles non critical hardware state, and sends over queue"""
-  count = 0
   prev_hw_state = None
 
   modem_version = None
@@ -104,52 +109,78 @@ def hw_state_thread(end_event, hw_queue):
   modem_restarted = False
   modem_missing_count = 0
 
+  # network type, strength and metered state are updated on changes, if the hardware signals them
+  network_changed = HARDWARE.get_network_change_event()
+  network_interval = HW_STATE_INTERVAL if network_changed is None else NETWORK_SIGNALED_INTERVAL
+  network_type, network_strength, network_metered = NetworkType.none, NetworkStrength.unknown, False
+  last_update_t = last_network_update_t = -float('inf')
+
   while not end_event.is_set():
+    t = time.monotonic()
+    update = t - last_update_t >= HW_STATE_INTERVAL
+    network_update = t - last_network_update_t >= network_interval or (network_changed is not None and network_changed.is_set())
+
+    if update:
+      last_update_t = t
+    if network_update:
+      last_network_update_t = t
+      if network_changed is not None:
+        network_changed.clear()
+
     # these are expensive calls. update every 10s
-    if (count % int(10. / DT_HW)) == 0:
+    if update or (network_update and prev_hw_state is not None):
       try:
-        network_type = HARDWARE.get_network_type()
-        modem_temps = HARDWARE.get_modem_temperatures()
-        if len(modem_temps) == 0 and prev_hw_state is not None:
-          modem_temps = prev_hw_state.modem_temps
-
-        # Log modem version once
-        if AGNOS and ((modem_version is None) or (modem_nv is None)):
-          modem_version = HARDWARE.get_modem_version()
-          modem_nv = HARDWARE.get_modem_nv()
-
-          if (modem_version is not None) and (modem_nv is not None):
-            cloudlog.event("modem version", version=modem_version, nv=modem_nv)
-          else:
-            if not modem_restarted:
-              # TODO: we may be able to remove this with a MM update
-              # ModemManager's probing on startup can fail
-              # rarely, restart the service to probe again.
-              modem_missing_count += 1
-              if modem_missing_count > 3:
-                modem_restarted = True
-                cloudlog.event("restarting ModemManager")
-                os.system("sudo systemctl restart --no-block ModemManager")
-
-        tx, rx = HARDWARE.get_modem_data_usage()
-
-        hw_state = HardwareState(
-          network_type=network_type,
-          network_info=HARDWARE.get_network_info(),
-          network_strength=HARDWARE.get_network_strength(network_type),
-          network_stats={'wwanTx': tx, 'wwanRx': rx},
-          network_metered=HARDWARE.get_network_metered(network_type),
-          nvme_temps=HARDWARE.get_nvme_temperatures(),
-          modem_temps=modem_temps,
-        )
+        if network_update or prev_hw_state is None:
+          network_type = HARDWARE.get_network_type()
+          network_strength = HARDWARE.get_network_strength(network_type)
+          network_metered = HARDWARE.get_network_metered(network_type)
+
+        if update:
+          modem_temps = HARDWARE.get_modem_temperatures()
+          if len(modem_temps) == 0 and prev_hw_state is not None:
+            modem_temps = prev_hw_state.modem_temps
+
+          # Log modem version once
+          if AGNOS and ((modem_version is None) or (modem_nv is None)):
+            modem_version = HARDWARE.get_modem_version()
+            modem_nv = HARDWARE.get_modem_nv()
+
+            if (modem_version is not None) and (modem_nv is not None):
+              cloudlog.event("modem version", version=modem_version, nv=modem_nv)
+            else:
+              if not modem_restarted:
+                # TODO: we may be able to remove this with a MM update
+                # ModemManager's probing on startup can fail
+                # rarely, restart the service to probe again.
+                modem_missing_count += 1
+                if modem_missing_count > 3:
+                  modem_restarted = True
+                  cloudlog.event("restarting ModemManager")
+                  os.system("sudo systemctl restart --no-block ModemManager")
+
+          tx, rx = HARDWARE.get_modem_data_usage()
+
+          hw_state = HardwareState(
+            network_type=network_type,
+            network_info=HARDWARE.get_network_info(),
+            network_strength=network_strength,
+            network_stats={'wwanTx': tx, 'wwanRx': rx},
+            network_metered=network_metered,
+            nvme_temps=HARDWARE.get_nvme_temperatures(),
+            modem_temps=modem_temps,
+          )
+        else:
+          hw_state = prev_hw_state._replace(network_type=network_type, network_strength=network_strength, network_metered=network_metered)
 
+        # replace a state that wasn't read yet, network changes shouldn't wait for the next update
         try:
-          hw_queue.put_nowait(hw_state)
-        except queue.Full:
+          hw_queue.get_nowait()
+        except queue.Empty:
           pass
+        hw_queue.put_nowait(hw_state)
 
         # TODO: remove this once the config is in AGNOS
-        if not modem_configured and len(HARDWARE.get_sim_info().get('sim_id', '')) > 0:
+        if update and not modem_configured and len(HARDWARE.get_sim_info().get('sim_id', '')) > 0:
           cloudlog.warning("configuring modem")
           HARDWARE.configure_modem()
           modem_configured = True
@@ -160,8 +191,12 @@ def hw_state_thread(end_event, hw_queue):
       except Exception:
         cloudlog.exception("Error getting hardware state")
 
-    count += 1
-    time.sleep(DT_HW)
+    if network_changed is None:
+      time.sleep(DT_HW)
+    else:
+      # wake up early on network changes, but update at most every DT_HW since signals come in bursts
+      network_changed.wait(DT_HW)
+      time.sleep(max(0., last_network_update_t + DT_HW - time.monotonic()))
 
 
 def hardware_thread(end_event, hw_queue) -> None:
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import Counter
+
+from cereal import log
+from openpilot.system.hardware.pc.hardware import Pc
+
+NetworkType = log.DeviceState.NetworkType
+NetworkStrength = log.DeviceState.NetworkStrength
+
+
+class MockHardware(Pc):
+  """Pc with slow hardware calls and a network that can change, to test and benchmark hardwared's polling"""
+  def __init__(self, call_latency: float = 0., signals: bool = True):
+    self.call_latency = call_latency  # seconds each slow call blocks for, like a DBus or AT command round trip
+    self.calls: Counter = Counter()
+    self.network_type = NetworkType.wifi
+    self.network_strength = NetworkStrength.good
+    self.network_change_event = threading.Event() if signals else None
+
+  def _call(self, name):
+    self.calls[name] += 1
+    if self.call_latency > 0:
+      time.sleep(self.call_latency)
+
+  def set_network(self, network_type, network_strength=NetworkStrength.good):
+    self.network_type = network_type
+    self.network_strength = network_strength
+    if self.network_change_event is not None:
+      self.network_change_event.set()
+
+  def get_network_change_event(self):
+    return self.network_change_event
+
+  def get_network_type(self):
+    self._call('get_network_type')
+    return self.network_type
+
+  def get_network_strength(self, network_type):
+    self._call('get_network_strength')
+    return self.network_strength
+
+  def get_network_metered(self, network_type) -> bool:
+    self._call('get_network_metered')
+    return super().get_network_metered(network_type)
+
+  def get_network_info(self):
+    self._call('get_network_info')
+    return None
+
+  def get_modem_temperatures(self):
+    self._call('get_modem_temperatures')
+    return []
+
+  def get_nvme_temperatures(self):
+    self._call('get_nvme_temperatures')
+    return []
+
+  def get_modem_data_usage(self):
+    self._call('get_modem_data_usage')
+    return -1, -1
+
+  def get_sim_info(self):
+    self._call('get_sim_info')
+    return super().get_sim_info()
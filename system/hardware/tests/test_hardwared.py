@@ -0,0 +1,135 @@
+import queue
+import sys
+import threading
+import time
+
+import pytest
+
+from cereal import log
+import openpilot.system.hardware.hardwared as hardwared
+from openpilot.system.hardware.pc.mock import MockHardware
+from openpilot.system.hardware.tici import hardware as tici_hardware
+from openpilot.system.hardware.tici.hardware import Tici, NM, MM, NM_AP, NM_DEV, MM_MODEM
+
+NetworkType = log.DeviceState.NetworkType
+
+
+@pytest.fixture
+def thermal_zones(tmp_path, monkeypatch):
+  monkeypatch.setattr(hardwared, "THERMAL_ZONE_PATH", str(tmp_path))
+  monkeypatch.setattr(hardwared, "tz_by_type", None)
+  monkeypatch.setattr(hardwared, "tz_fds", {})
+  for i, name in enumerate(("cpu0-usr", "gpu0-usr")):
+    (tmp_path / f"thermal_zone{i}").mkdir()
+    (tmp_path / f"thermal_zone{i}" / "type").write_text(name + "\n")
+    (tmp_path / f"thermal_zone{i}" / "temp").write_text(f"{40000 + i}\n")
+  return tmp_path
+
+
+class TestHardwared:
+  def test_read_tz(self, thermal_zones):
+    assert hardwared.read_tz("cpu0-usr") == 40000
+    assert hardwared.read_tz(1) == 40001
+    assert hardwared.read_tz(None) == 0
+    assert hardwared.read_tz(5) == 0
+
+    # files stay open and are read again from the start
+    (thermal_zones / "thermal_zone0" / "temp").write_text("55000\n")
+    assert hardwared.read_tz("cpu0-usr") == 55000
+    assert len(hardwared.tz_fds) == 2
+
+  def run_hw_state_thread(self, monkeypatch, hw, duration, on_state=None):
+    monkeypatch.setattr(hardwared, "HARDWARE", hw)
+    monkeypatch.setattr(hardwared, "DT_HW", 0.01)
+    monkeypatch.setattr(hardwared, "HW_STATE_INTERVAL", 0.2)
+
+    end_event, hw_queue = threading.Event(), queue.Queue(maxsize=1)
+    thread = threading.Thread(target=hardwared.hw_state_thread, args=(end_event, hw_queue))
+    thread.start()
+    states = []
+    try:
+      end_t = time.monotonic() + duration
+      while time.monotonic() < end_t:
+        try:
+          states.append((time.monotonic(), hw_queue.get(timeout=0.01)))
+        except queue.Empty:
+          pass
+        if on_state is not None:
+          on_state(states)
+    finally:
+      end_event.set()
+      thread.join()
+    return states
+
+  @pytest.mark.parametrize("signals", [True, False])
+  def test_polling(self, monkeypatch, signals):
+    hw = MockHardware(signals=signals)
+    states = self.run_hw_state_thread(monkeypatch, hw, 1.)
+    assert len(states) >= 4
+    assert hw.calls['get_modem_temperatures'] >= 4
+    if signals:
+      # only read on startup, changes are signaled
+      assert hw.calls['get_network_type'] == 1
+    else:
+      assert hw.calls['get_network_type'] == hw.calls['get_modem_temperatures']
+
+  def test_network_change(self, monkeypatch):
+    hw = MockHardware(signals=True)
+    changed_t = []
+    def on_state(states):
+      if len(states) and not len(changed_t):
+        changed_t.append(time.monotonic())
+        hw.set_network(NetworkType.cell4G)
+
+    states = self.run_hw_state_thread(monkeypatch, hw, 0.15, on_state)
+    assert states[-1][1].network_type == NetworkType.cell4G
+    changed_state_t = next(t for t, state in states if state.network_type == NetworkType.cell4G)
+    # much sooner than the next full update
+    assert changed_state_t - changed_t[0] < 0.1
+    assert hw.calls['get_modem_temperatures'] == 1
+
+
+class TestNetworkChangeEvent:
+  @pytest.fixture
+  def receiver(self, mocker):
+    # mocked dbus and GLib, so no bus or main loop is needed
+    modules = {name: mocker.MagicMock() for name in ('dbus', 'dbus.mainloop', 'dbus.mainloop.glib', 'gi', 'gi.repository')}
+    mocker.patch.dict(sys.modules, modules)
+    event = Tici().get_network_change_event()
+    assert event is not None
+
+    add_signal_receiver = modules['dbus'].SystemBus.return_value.add_signal_receiver
+    assert {c.kwargs['bus_name'] for c in add_signal_receiver.call_args_list} == {NM, MM}
+    return event, add_signal_receiver.call_args.args[0]
+
+  def test_network_changes(self, receiver):
+    event, on_properties_changed = receiver
+    for interface, prop in ((NM, 'PrimaryConnection'), (NM_DEV, 'State'), (MM_MODEM, 'AccessTechnologies')):
+      event.clear()
+      on_properties_changed(interface, {prop: 1}, [])
+      assert event.is_set()
+
+  def test_ignored_changes(self, receiver):
+    event, on_properties_changed = receiver
+    on_properties_changed(NM_AP, {'LastSeen': 1}, [])
+    on_properties_changed(NM_DEV, {'LastScan': 1}, [])
+    on_properties_changed(NM + '.Settings', {'Hostname': 'tici'}, [])
+    assert not event.is_set()
+
+  def test_strength_rate_limit(self, receiver, mocker):
+    event, on_properties_changed = receiver
+    t = mocker.patch.object(tici_hardware.time, 'monotonic', return_value=100.)
+    on_properties_changed(NM_AP, {'Strength': 50, 'LastSeen': 1}, [])
+    assert event.is_set()
+
+    # the next scans within the interval don't wake up hardwared
+    event.clear()
+    for dt in (1., 5., tici_hardware.NETWORK_STRENGTH_INTERVAL - 0.1):
+      t.return_value = 100. + dt
+      on_properties_changed(NM_AP, {'Strength': 60}, [])
+      on_properties_changed(MM_MODEM, {'SignalQuality': (60, True)}, [])
+    assert not event.is_set()
+
+    t.return_value = 100. + tici_hardware.NETWORK_STRENGTH_INTERVAL
+    on_properties_changed(NM_AP, {'Strength': 70}, [])
+    assert event.is_set()
@@ -2,6 +2,7 @@ import json
 import math
 import os
 import subprocess
+import threading
 import time
 import tempfile
 from enum import IntEnum
@@ -28,6 +29,20 @@ MM_MODEM = MM + ".Modem"
 MM_MODEM_SIMPLE = MM + ".Modem.Simple"
 MM_SIM = MM + ".Sim"
 
+# properties that can change the network type or metered state, by interface
+NETWORK_CHANGE_PROPERTIES = {
+  NM: {'PrimaryConnection', 'PrimaryConnectionType', 'State', 'Connectivity', 'Metered'},
+  NM_CON_ACT: {'State', 'Type', 'Default', 'Default6'},
+  NM_DEV: {'State', 'ActiveConnection', 'Metered'},
+  MM_MODEM: {'State', 'AccessTechnologies'},
+}
+# signal strength changes with every wifi scan and modem report, these are only signaled every NETWORK_STRENGTH_INTERVAL
+NETWORK_STRENGTH_PROPERTIES = {
+  NM_AP: {'Strength'},
+  MM_MODEM: {'SignalQuality'},
+}
+NETWORK_STRENGTH_INTERVAL = 10.  # s, how often hardwared polled the network before changes were signaled
+
 class MM_MODEM_STATE(IntEnum):
   FAILED        = -1
   UNKNOWN       = 0
@@ -96,6 +111,23 @@ def get_device_type():
     model = f.read().strip('\x00')
   return model.split('comma ')[-1]
 
+class NetworkChangeHandler:
+  """DBus PropertiesChanged receiver, sets event when the network state hardwared publishes may have changed"""
+  def __init__(self, event: threading.Event):
+    self.event = event
+    self.last_strength_change = -float('inf')
+
+  def __call__(self, interface, changed, invalidated) -> None:
+    properties = set(changed) | set(invalidated)
+    if properties & NETWORK_CHANGE_PROPERTIES.get(interface, set()):
+      self.event.set()
+    elif properties & NETWORK_STRENGTH_PROPERTIES.get(interface, set()):
+      t = time.monotonic()
+      if t - self.last_strength_change >= NETWORK_STRENGTH_INTERVAL:
+        self.last_strength_change = t
+        self.event.set()
+
+
 class Tici(HardwareBase):
   @cached_property
   def bus(self):
@@ -110,6 +142,27 @@ class Tici(HardwareBase):
   def mm(self):
     return self.bus.get_object(MM, '/org/freedesktop/ModemManager1')
 
+  @cached_property
+  def network_change_event(self) -> threading.Event | None:
+    try:
+      import dbus
+      from dbus.mainloop.glib import DBusGMainLoop
+      from gi.repository import GLib
+    except ImportError:
+      return None
+
+    event = threading.Event()
+    on_properties_changed = NetworkChangeHandler(event)
+    try:
+      # signals are received on a separate connection, dispatched by a GLib main loop thread
+      bus = dbus.SystemBus(mainloop=DBusGMainLoop(), private=True)
+      for bus_name in (NM, MM):
+        bus.add_signal_receiver(on_properties_changed, signal_name='PropertiesChanged', dbus_interface=DBUS_PROPS, bus_name=bus_name)
+    except Exception:
+      return None
+    threading.Thread(target=GLib.MainLoop().run, daemon=True).start()
+    return event
+
   @cached_property
   def amplifier(self):
     if self.get_device_type() == "mici":
@@ -272,6 +325,9 @@ class Tici(HardwareBase):
 
     return network_strength
 
+  def get_network_change_event(self):
+    return self.network_change_event
+
   def get_network_metered(self, network_type) -> bool:
     try:
       primary_connection = self.nm.Get(NM, 'PrimaryConnection', dbus_interface=DBUS_PROPS, timeout=TIMEOUT)
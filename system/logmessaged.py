@@ -1,5 +1,9 @@
 #!/usr/bin/env python3
+import json
+import re
+import time
 import zmq
+from collections import defaultdict
 from typing import NoReturn
 
 import cereal.messaging as messaging
@@ -7,6 +11,69 @@ from openpilot.common.logging_extra import SwagLogFileFormatter
 from openpilot.system.hardware.hw import Paths
 from openpilot.common.swaglog import get_file_handler
 
+MAX_BATCH = 1000
+MAX_PUBLISH_SIZE = 2*1024*1024
+
+# per source, where a source is the record's daemon or else the file that logged it
+RATE_LIMIT = 200  # records/s
+RATE_LIMIT_BURST = 1000
+DROPPED_REPORT_INTERVAL = 10.  # seconds
+
+DAEMON_RE = re.compile(rb'"daemon": ?"([^"]*)"')
+FILENAME_RE = re.compile(rb'"filename": ?"([^"]*)"')
+
+
+def get_source(dat: bytes) -> bytes:
+  # found in the raw JSON, records aren't decoded unless they're written to disk
+  m = DAEMON_RE.search(dat) or FILENAME_RE.search(dat)
+  return m.group(1) if m is not None else b""
+
+
+class RateLimiter:
+  """Token bucket per source, counting the records it drops"""
+  def __init__(self, rate: float, burst: int):
+    self.rate = rate
+    self.burst = burst
+    self.buckets: dict[bytes, tuple[float, float]] = {}
+    self.dropped: dict[bytes, int] = defaultdict(int)
+
+  def allow(self, source: bytes, t: float) -> bool:
+    tokens, last_t = self.buckets.get(source, (self.burst, t))
+    tokens = min(self.burst, tokens + (t - last_t) * self.rate)
+    if tokens < 1:
+      self.buckets[source] = (tokens, t)
+      self.dropped[source] += 1
+      return False
+    self.buckets[source] = (tokens - 1, t)
+    return True
+
+  def pop_dropped(self) -> dict[bytes, int]:
+    dropped, self.dropped = self.dropped, defaultdict(int)
+    return dropped
+
+
+def dropped_record(source: bytes, count: int) -> bytes:
+  record = {
+    "msg": f"logmessaged: rate limited {source.decode('utf-8', 'replace')}, dropped {count} records",
+    "ctx": {"daemon": "logmessaged"},
+    "levelnum": 30,  # logging.WARNING
+    "filename": "logmessaged.py",
+    "created": time.time(),
+  }
+  return bytes([record["levelnum"]]) + json.dumps(record).encode("utf-8")
+
+
+def recv_batch(sock: zmq.Socket, timeout: int) -> list[bytes]:
+  # wait for the first record, then drain what's already queued
+  batch: list[bytes] = []
+  if sock.poll(timeout):
+    while len(batch) < MAX_BATCH:
+      try:
+        batch.append(b''.join(sock.recv_multipart(zmq.NOBLOCK)))
+      except zmq.error.Again:
+        break
+  return batch
+
 
 def main() -> NoReturn:
   log_handler = get_file_handler()
@@ -21,26 +88,34 @@ def main() -> NoReturn:
   log_message_sock = messaging.pub_sock('logMessage')
   error_log_message_sock = messaging.pub_sock('errorLogMessage')
 
+  rate_limiter = RateLimiter(RATE_LIMIT, RATE_LIMIT_BURST)
+  last_report_t = time.monotonic()
+
   try:
     while True:
-      dat = b''.join(sock.recv_multipart())
-      level = dat[0]
-      record = dat[1:].decode("utf-8")
-      if level >= log_level:
-        log_handler.emit(record)
-
-      if len(record) > 2*1024*1024:
-        print("WARNING: log too big to publish", len(record))
-        print(record[:100])
-        continue
-
-      # then we publish them
-      msg = messaging.new_message(None, valid=True, logMessage=record)
-      log_message_sock.send(msg.to_bytes())
-
-      if level >= 40:  # logging.ERROR
-        msg = messaging.new_message(None, valid=True, errorLogMessage=record)
-        error_log_message_sock.send(msg.to_bytes())
+      batch = recv_batch(sock, int(DROPPED_REPORT_INTERVAL * 1000))
+      t = time.monotonic()
+      batch = [dat for dat in batch if rate_limiter.allow(get_source(dat), t)]
+      if t - last_report_t >= DROPPED_REPORT_INTERVAL:
+        batch += [dropped_record(source, count) for source, count in rate_limiter.pop_dropped().items()]
+        last_report_t = t
+
+      log_handler.emit_batch([dat[1:].decode("utf-8") for dat in batch if dat[0] >= log_level])
+
+      for dat in batch:
+        level, record = dat[0], dat[1:]
+        if len(record) > MAX_PUBLISH_SIZE:
+          print("WARNING: log too big to publish", len(record))
+          print(record[:100])
+          continue
+
+        # then we publish them, capnp takes the UTF-8 bytes as they are
+        msg = messaging.new_message(None, valid=True, logMessage=record)
+        log_message_sock.send(msg.to_bytes())
+
+        if level >= 40:  # logging.ERROR
+          msg = messaging.new_message(None, valid=True, errorLogMessage=record)
+          error_log_message_sock.send(msg.to_bytes())
   finally:
     sock.close()
     ctx.term()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import datetime
+import gc
 import os
 import signal
 import sys
@@ -197,6 +198,14 @@ def manager_init() -> None:
   for p in managed_processes.values():
     p.prepare()
 
+  import_times = {p.name: round(p.import_time, 3) for p in sorted(managed_processes.values(), key=lambda p: p.import_time, reverse=True)}
+  cloudlog.event("manager.preimport", import_times=import_times, total=round(sum(import_times.values()), 3))
+
+  # move everything imported so far out of the gc's reach, so collections in the
+  # forked processes don't write to (and un-share) the preimported objects
+  gc.collect()
+  gc.freeze()
+
 
 def manager_cleanup() -> None:
   # send signals to kill all procs
@@ -1,4 +1,5 @@
 import importlib
+import multiprocessing
 import os
 import signal
 import struct
@@ -20,6 +21,10 @@ from openpilot.common.swaglog import cloudlog
 WATCHDOG_FN = "/dev/shm/wd_"
 ENABLE_WATCHDOG = os.getenv("NO_WATCHDOG") is None
 
+# python processes are forked from the manager after preimporting, so the manager acts as
+# the zygote: modules are imported once and shared copy-on-write with every child
+fork_context = multiprocessing.get_context('fork')
+
 
 def launcher(proc: str, name: str) -> None:
   try:
@@ -72,6 +77,7 @@ class ManagerProcess(ABC):
   name = ""
 
   last_watchdog_time = 0
+  import_time = 0.
   watchdog_max_dt: int | None = None
   always_watchdog = False
   watchdog_seen = False
@@ -215,7 +221,10 @@ class PythonProcess(ManagerProcess):
   def prepare(self) -> None:
     if self.enabled:
       cloudlog.info(f"preimporting {self.module}")
+      t = time.monotonic()
       importlib.import_module(self.module)
+      # modules already imported by an earlier process are free, so this is the incremental cost
+      self.import_time = time.monotonic() - t
 
   def start(self) -> None:
     # In case we only tried a non blocking stop we need to stop it before restarting
@@ -226,7 +235,7 @@ class PythonProcess(ManagerProcess):
       return
 
     cloudlog.info(f"starting python {self.module}")
-    self.proc = Process(name=self.name, target=self.launcher, args=(self.module, self.name))
+    self.proc = fork_context.Process(name=self.name, target=self.launcher, args=(self.module, self.name))
     self.proc.start()
     self.watchdog_seen = False
     self.shutting_down = False
@@ -8,7 +8,7 @@ from parameterized import parameterized
 from cereal import car
 from openpilot.common.params import Params
 import openpilot.system.manager.manager as manager
-from openpilot.system.manager.process import ensure_running
+from openpilot.system.manager.process import PythonProcess, ensure_running
 from openpilot.system.manager.process_config import managed_processes
 from openpilot.system.hardware import HARDWARE
 
@@ -34,6 +34,17 @@ class TestManager:
     os.environ['PREPAREONLY'] = '1'
     manager.main()
 
+  def test_preimport_times(self, mocker):
+    mock_event = mocker.patch('openpilot.system.manager.manager.cloudlog.event')
+    os.environ['PREPAREONLY'] = '1'
+    manager.main()
+
+    procs = [p for p in managed_processes.values() if isinstance(p, PythonProcess) and p.enabled]
+    assert sum(p.import_time for p in procs) > 0
+    import_times = next(c.kwargs['import_times'] for c in mock_event.call_args_list if c.args == ("manager.preimport",))
+    for p in procs:
+      assert import_times[p.name] == pytest.approx(p.import_time, abs=1e-3)
+
   def test_blacklisted_procs(self):
     # TODO: ensure there are blacklisted procs until we have a dedicated test
     assert len(BLACKLIST_PROCS), "No blacklisted procs to test not_run"
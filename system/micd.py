@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+from functools import cache
+
 import numpy as np
 
 from cereal import messaging
@@ -15,7 +17,7 @@ SAMPLE_BUFFER = 4096 # (approx 100ms)
 
 def calculate_spl(measurements):
   # https://www.engineeringtoolbox.com/sound-pressure-d_711.html
-  sound_pressure = np.sqrt(np.mean(measurements ** 2))  # RMS of amplitudes
+  sound_pressure = np.sqrt(np.dot(measurements, measurements) / measurements.size)  # RMS of amplitudes
   if sound_pressure > 0:
     sound_pressure_level = 20 * np.log10(sound_pressure / REFERENCE_SPL)  # dB
   else:
@@ -23,20 +25,26 @@ def calculate_spl(measurements):
   return sound_pressure, sound_pressure_level
 
 
-def apply_a_weighting(measurements: np.ndarray) -> np.ndarray:
-  # Generate a Hanning window of the same length as the audio measurements
-  measurements_windowed = measurements * np.hanning(len(measurements))
-
-  # Calculate the frequency axis for the signal
-  freqs = np.fft.fftfreq(measurements_windowed.size, d=1 / SAMPLE_RATE)
+@cache
+def get_a_weighting_filter(n: int) -> tuple[np.ndarray, np.ndarray]:
+  """Hanning window of n samples, and the A-weighting filter over the frequencies of their real FFT"""
+  freqs = np.fft.rfftfreq(n, d=1 / SAMPLE_RATE)
 
-  # Calculate the A-weighting filter
   # https://en.wikipedia.org/wiki/A-weighting
   A = 12194 ** 2 * freqs ** 4 / ((freqs ** 2 + 20.6 ** 2) * (freqs ** 2 + 12194 ** 2) * np.sqrt((freqs ** 2 + 107.7 ** 2) * (freqs ** 2 + 737.9 ** 2)))
   A /= np.max(A)  # Normalize the filter
+  return np.hanning(n), A
+
+
+def apply_a_weighting(measurements: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+  window, A = get_a_weighting_filter(len(measurements))
+  out = np.multiply(measurements, window, out=out)
 
-  # Apply the A-weighting filter to the signal
-  return np.abs(np.fft.ifft(np.fft.fft(measurements_windowed) * A))
+  # the filter is symmetric in frequency, so the weighted signal is real
+  spectrum = np.fft.rfft(out)
+  spectrum *= A
+  out[:] = np.fft.irfft(spectrum, n=len(measurements))
+  return np.abs(out, out=out)
 
 
 class Mic:
@@ -44,7 +52,10 @@ class Mic:
     self.rk = Ratekeeper(RATE)
     self.pm = messaging.PubMaster(['microphone'])
 
-    self.measurements = np.empty(0)
+    # samples of the current FFT window, and a scratch buffer for their weighted copy
+    self.measurements = np.zeros(FFT_SAMPLES)
+    self.measurements_weighted = np.zeros(FFT_SAMPLES)
+    self.num_measurements = 0
 
     self.sound_pressure = 0
     self.sound_pressure_weighted = 0
@@ -68,16 +79,18 @@ class Mic:
     Logged A-weighted equivalents are rough approximations of the human-perceived loudness.
     """
 
-    self.measurements = np.concatenate((self.measurements, indata[:, 0]))
-
-    while self.measurements.size >= FFT_SAMPLES:
-      measurements = self.measurements[:FFT_SAMPLES]
-
-      self.sound_pressure, _ = calculate_spl(measurements)
-      measurements_weighted = apply_a_weighting(measurements)
-      self.sound_pressure_weighted, self.sound_pressure_level_weighted = calculate_spl(measurements_weighted)
-
-      self.measurements = self.measurements[FFT_SAMPLES:]
+    samples = indata[:, 0]
+    while len(samples):
+      n = min(FFT_SAMPLES - self.num_measurements, len(samples))
+      self.measurements[self.num_measurements:self.num_measurements + n] = samples[:n]
+      self.num_measurements += n
+      samples = samples[n:]
+
+      if self.num_measurements == FFT_SAMPLES:
+        self.sound_pressure, _ = calculate_spl(self.measurements)
+        apply_a_weighting(self.measurements, out=self.measurements_weighted)
+        self.sound_pressure_weighted, self.sound_pressure_level_weighted = calculate_spl(self.measurements_weighted)
+        self.num_measurements = 0
 
   @retry(attempts=7, delay=3)
   def get_stream(self, sd):
@@ -2,7 +2,6 @@
 import os
 import sys
 import signal
-import itertools
 import math
 import time
 import requests
@@ -12,6 +11,7 @@ import datetime
 from multiprocessing import Process, Event
 from typing import NoReturn
 from struct import unpack_from, calcsize, pack
+import numpy as np
 
 from cereal import log
 import cereal.messaging as messaging
@@ -21,7 +21,7 @@ from openpilot.common.time import system_time_valid
 from openpilot.system.hardware.tici.pins import GPIO
 from openpilot.common.swaglog import cloudlog
 from openpilot.system.qcomgpsd.modemdiag import ModemDiag, DIAG_LOG_F, setup_logs, send_recv
-from openpilot.system.qcomgpsd.structs import (dict_unpacker, position_report, relist,
+from openpilot.system.qcomgpsd.structs import (dict_unpacker, struct_dtype, position_report, relist,
                                               gps_measurement_report, gps_measurement_report_sv,
                                               glonass_measurement_report, glonass_measurement_report_sv,
                                               oemdre_measurement_report, oemdre_measurement_report_sv, oemdre_svpoly_report,
@@ -86,6 +86,46 @@ measurementStatusGlonassFields = {
   "glonassTimeMarkValid": 17
 }
 
+# satellites of a report are unpacked at once, then copied to capnp as a list of dicts
+GPS_MEAS_SV_DTYPE = struct_dtype(gps_measurement_report_sv, True)
+GLONASS_MEAS_SV_DTYPE = struct_dtype(glonass_measurement_report_sv, True)
+OEMDRE_MEAS_SV_DTYPE = struct_dtype(oemdre_measurement_report_sv, True)
+
+MEAS_SV_RENAMES = {
+  "parityErrorCount": "gpsParityErrorCount",
+  "frequencyIndex": "glonassFrequencyIndex",
+  "hemmingErrorCount": "glonassHemmingErrorCount",
+}
+
+def unpack_status_bits(values, fields):
+  bits = np.array(list(fields.values()))
+  return dict(zip(fields, ((values[:, None] >> bits) & 1).astype(bool).T.tolist(), strict=True))
+
+def sv_dicts(columns, status):
+  # rows of value columns, each with its measurementStatus
+  return [{**dict(zip(columns, row, strict=True)), "measurementStatus": dict(zip(status, status_row, strict=True))}
+          for row, status_row in zip(zip(*columns.values(), strict=True), zip(*status.values(), strict=True), strict=True)]
+
+def unpack_meas_svs(sats, log_type):
+  if log_type == LOG_GNSS_GPS_MEASUREMENT_REPORT:
+    status_fields = {**measurementStatusFields, **measurementStatusGPSFields}
+  else:
+    status_fields = {**measurementStatusFields, **measurementStatusGlonassFields}
+
+  columns = {MEAS_SV_RENAMES.get(k, k): sats[k].tolist() for k in sats.dtype.names if k not in ("measurementStatus", "miscStatus", "pad")}
+  status = {**unpack_status_bits(sats["measurementStatus"], status_fields),
+            **unpack_status_bits(sats["miscStatus"], miscStatusFields)}
+  return sv_dicts(columns, status)
+
+def unpack_oemdre_meas_svs(sats):
+  skip = ("unkn", "measurementStatus2", "multipathEstimateValid", "directionValid", "goodParity", "measurementStatus")
+  columns = {k: sats[k].tolist() for k in sats.dtype.names if k not in skip}
+  columns["goodParity"] = sats["goodParity"].astype(bool).tolist()
+  status = unpack_status_bits(sats["measurementStatus"], measurementStatusFields)
+  status["multipathEstimateIsValid"] = sats["multipathEstimateValid"].astype(bool).tolist()
+  status["directionIsValid"] = sats["directionValid"].astype(bool).tolist()
+  return sv_dicts(columns, status)
+
 @retry(attempts=10, delay=1.0)
 def try_setup_logs(diag, logs):
   return setup_logs(diag, logs)
@@ -218,13 +258,8 @@ def wait_for_modem(cmd="AT+QGPS?"):
 
 def main() -> NoReturn:
   unpack_gps_meas, size_gps_meas = dict_unpacker(gps_measurement_report, True)
-  unpack_gps_meas_sv, size_gps_meas_sv = dict_unpacker(gps_measurement_report_sv, True)
-
   unpack_glonass_meas, size_glonass_meas = dict_unpacker(glonass_measurement_report, True)
-  unpack_glonass_meas_sv, size_glonass_meas_sv = dict_unpacker(glonass_measurement_report_sv, True)
-
   unpack_oemdre_meas, size_oemdre_meas = dict_unpacker(oemdre_measurement_report, True)
-  unpack_oemdre_meas_sv, size_oemdre_meas_sv = dict_unpacker(oemdre_measurement_report_sv, True)
 
   unpack_svpoly, _ = dict_unpacker(oemdre_svpoly_report, True)
   unpack_position, _ = dict_unpacker(position_report)
@@ -307,26 +342,8 @@ def main() -> NoReturn:
         else:
           setattr(report, k, v)
 
-      report.init('sv', dat['svCount'])
-      sats = log_payload[size_oemdre_meas:]
-      for i in range(dat['svCount']):
-        sat = unpack_oemdre_meas_sv(sats[size_oemdre_meas_sv*i:size_oemdre_meas_sv*(i+1)])
-        sv = report.sv[i]
-        sv.init('measurementStatus')
-        for k,v in sat.items():
-          if k in ["unkn", "measurementStatus2"]:
-            pass
-          elif k == "multipathEstimateValid":
-            sv.measurementStatus.multipathEstimateIsValid = bool(v)
-          elif k == "directionValid":
-            sv.measurementStatus.directionIsValid = bool(v)
-          elif k == "goodParity":
-            setattr(sv, k, bool(v))
-          elif k == "measurementStatus":
-            for kk,vv in measurementStatusFields.items():
-              setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
-          else:
-            setattr(sv, k, v)
+      sats = np.frombuffer(log_payload, dtype=OEMDRE_MEAS_SV_DTYPE, count=dat['svCount'], offset=size_oemdre_meas)
+      report.sv = unpack_oemdre_meas_svs(sats)
       pm.send('qcomGnss', msg)
     elif log_type == LOG_GNSS_POSITION_REPORT:
       report = unpack_position(log_payload)
@@ -408,15 +425,13 @@ def main() -> NoReturn:
       if log_type == LOG_GNSS_GPS_MEASUREMENT_REPORT:
         dat = unpack_gps_meas(log_payload)
         sats = log_payload[size_gps_meas:]
-        unpack_meas_sv, size_meas_sv = unpack_gps_meas_sv, size_gps_meas_sv
+        sv_dtype = GPS_MEAS_SV_DTYPE
         report.source = 0  # gps
-        measurement_status_fields = (measurementStatusFields.items(), measurementStatusGPSFields.items())
       elif log_type == LOG_GNSS_GLONASS_MEASUREMENT_REPORT:
         dat = unpack_glonass_meas(log_payload)
         sats = log_payload[size_glonass_meas:]
-        unpack_meas_sv, size_meas_sv = unpack_glonass_meas_sv, size_glonass_meas_sv
+        sv_dtype = GLONASS_MEAS_SV_DTYPE
         report.source = 1  # glonass
-        measurement_status_fields = (measurementStatusFields.items(), measurementStatusGlonassFields.items())
       else:
         raise RuntimeError(f"invalid log_type: {log_type}")
 
@@ -429,30 +444,9 @@ def main() -> NoReturn:
           pass
         else:
           setattr(report, k, v)
-      report.init('sv', dat['svCount'])
       if dat['svCount'] > 0:
-        assert len(sats)//dat['svCount'] == size_meas_sv
-        for i in range(dat['svCount']):
-          sv = report.sv[i]
-          sv.init('measurementStatus')
-          sat = unpack_meas_sv(sats[size_meas_sv*i:size_meas_sv*(i+1)])
-          for k,v in sat.items():
-            if k == "parityErrorCount":
-              sv.gpsParityErrorCount = v
-            elif k == "frequencyIndex":
-              sv.glonassFrequencyIndex = v
-            elif k == "hemmingErrorCount":
-              sv.glonassHemmingErrorCount = v
-            elif k == "measurementStatus":
-              for kk,vv in itertools.chain(*measurement_status_fields):
-                setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
-            elif k == "miscStatus":
-              for kk,vv in miscStatusFields.items():
-                setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
-            elif k == "pad":
-              pass
-            else:
-              setattr(sv, k, v)
+        assert len(sats)//dat['svCount'] == sv_dtype.itemsize
+        report.sv = unpack_meas_svs(np.frombuffer(sats, dtype=sv_dtype, count=dat['svCount']), log_type)
 
       pm.send('qcomGnss', msg)
 
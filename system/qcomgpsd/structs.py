@@ -1,3 +1,4 @@
+import numpy as np
 from struct import unpack_from, calcsize
 
 LOG_GNSS_POSITION_REPORT = 0x1476
@@ -334,6 +335,13 @@ def dict_unpacker(ss, camelcase = False):
   sz = calcsize(st)
   return lambda x: dict(zip(nams, unpack_from(st, x), strict=True)), sz
 
+def struct_dtype(ss, camelcase = False):
+  # packed NumPy equivalent of dict_unpacker, to unpack arrays of structs at once
+  st, nams = parse_struct(ss)
+  if camelcase:
+    nams = [name_to_camelcase(x) for x in nams]
+  return np.dtype([(nam, st[0] + typ) for nam, typ in zip(nams, st[1:], strict=True)])
+
 def relist(dat):
   list_keys = set()
   for key in dat.keys():
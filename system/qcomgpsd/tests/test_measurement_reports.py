@@ -0,0 +1,94 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from cereal import log
+from openpilot.system.qcomgpsd.qcomgpsd import (GPS_MEAS_SV_DTYPE, GLONASS_MEAS_SV_DTYPE, OEMDRE_MEAS_SV_DTYPE,
+                                                measurementStatusFields, measurementStatusGPSFields, measurementStatusGlonassFields,
+                                                miscStatusFields, unpack_meas_svs, unpack_oemdre_meas_svs)
+from openpilot.system.qcomgpsd.structs import (dict_unpacker, gps_measurement_report_sv, glonass_measurement_report_sv,
+                                              oemdre_measurement_report_sv, LOG_GNSS_GPS_MEASUREMENT_REPORT,
+                                              LOG_GNSS_GLONASS_MEASUREMENT_REPORT)
+
+
+def random_payload(dtype, count, rng):
+  sats = np.frombuffer(rng.integers(0, 256, dtype.itemsize * count, dtype=np.uint8).tobytes(), dtype=dtype).copy()
+  for name in dtype.names:
+    # keep floats finite and enums valid
+    if dtype[name].kind == 'f':
+      sats[name] = rng.uniform(-1e3, 1e3, count)
+    elif name == 'observationState':
+      sats[name] = rng.integers(0, 10, count)
+  return sats.tobytes()
+
+
+# per satellite setattr loops, as the reports were parsed before
+def reference_meas_svs(report, payload, count, sv_struct, status_fields):
+  unpack_sv, size_sv = dict_unpacker(sv_struct, True)
+  report.init('sv', count)
+  for i in range(count):
+    sv = report.sv[i]
+    sv.init('measurementStatus')
+    for k, v in unpack_sv(payload[size_sv*i:size_sv*(i+1)]).items():
+      if k == "parityErrorCount":
+        sv.gpsParityErrorCount = v
+      elif k == "frequencyIndex":
+        sv.glonassFrequencyIndex = v
+      elif k == "hemmingErrorCount":
+        sv.glonassHemmingErrorCount = v
+      elif k == "measurementStatus":
+        for kk, vv in itertools.chain(measurementStatusFields.items(), status_fields.items()):
+          setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
+      elif k == "miscStatus":
+        for kk, vv in miscStatusFields.items():
+          setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
+      elif k != "pad":
+        setattr(sv, k, v)
+
+
+def reference_oemdre_meas_svs(report, payload, count):
+  unpack_sv, size_sv = dict_unpacker(oemdre_measurement_report_sv, True)
+  report.init('sv', count)
+  for i in range(count):
+    sv = report.sv[i]
+    sv.init('measurementStatus')
+    for k, v in unpack_sv(payload[size_sv*i:size_sv*(i+1)]).items():
+      if k in ["unkn", "measurementStatus2"]:
+        pass
+      elif k == "multipathEstimateValid":
+        sv.measurementStatus.multipathEstimateIsValid = bool(v)
+      elif k == "directionValid":
+        sv.measurementStatus.directionIsValid = bool(v)
+      elif k == "goodParity":
+        setattr(sv, k, bool(v))
+      elif k == "measurementStatus":
+        for kk, vv in measurementStatusFields.items():
+          setattr(sv.measurementStatus, kk, bool(v & (1<<vv)))
+      else:
+        setattr(sv, k, v)
+
+
+@pytest.mark.parametrize("count", [0, 1, 24])
+class TestMeasurementReports:
+  @pytest.mark.parametrize("log_type, dtype, sv_struct, status_fields", [
+    (LOG_GNSS_GPS_MEASUREMENT_REPORT, GPS_MEAS_SV_DTYPE, gps_measurement_report_sv, measurementStatusGPSFields),
+    (LOG_GNSS_GLONASS_MEASUREMENT_REPORT, GLONASS_MEAS_SV_DTYPE, glonass_measurement_report_sv, measurementStatusGlonassFields),
+  ])
+  def test_measurement_report(self, count, log_type, dtype, sv_struct, status_fields):
+    payload = random_payload(dtype, count, np.random.default_rng(count))
+    expected = log.QcomGnss.MeasurementReport.new_message()
+    reference_meas_svs(expected, payload, count, sv_struct, status_fields)
+
+    report = log.QcomGnss.MeasurementReport.new_message()
+    report.sv = unpack_meas_svs(np.frombuffer(payload, dtype=dtype, count=count), log_type)
+    assert report.to_dict()['sv'] == expected.to_dict()['sv']
+
+  def test_dr_measurement_report(self, count):
+    payload = random_payload(OEMDRE_MEAS_SV_DTYPE, count, np.random.default_rng(count))
+    expected = log.QcomGnss.DrMeasurementReport.new_message()
+    reference_oemdre_meas_svs(expected, payload, count)
+
+    report = log.QcomGnss.DrMeasurementReport.new_message()
+    report.sv = unpack_oemdre_meas_svs(np.frombuffer(payload, dtype=OEMDRE_MEAS_SV_DTYPE, count=count))
+    assert report.to_dict()['sv'] == expected.to_dict()['sv']
@@ -1,25 +1,57 @@
 #!/usr/bin/env python3
 import os
+import struct
 import zmq
 import time
+import numpy as np
 from pathlib import Path
 from collections import defaultdict
 from datetime import datetime, UTC
 from typing import NoReturn
+from collections.abc import Iterator
 
 from openpilot.common.params import Params
+from openpilot.common.stat_live import QuantileSketch
 from cereal.messaging import SubMaster
 from openpilot.system.hardware.hw import Paths
 from openpilot.common.swaglog import cloudlog
 from openpilot.system.hardware import HARDWARE
 from openpilot.common.file_helpers import atomic_write_in_dir
 from openpilot.system.version import get_build_metadata
-from openpilot.system.loggerd.config import STATS_DIR_FILE_LIMIT, STATS_SOCKET, STATS_FLUSH_TIME_S
+from openpilot.system.loggerd.config import STATS_DIR_FILE_LIMIT, STATS_SOCKET, STATS_FLUSH_TIME_S, STATS_CLIENT_FLUSH_TIME_S
 
 
 class METRIC_TYPE:
-  GAUGE = 'g'
-  SAMPLE = 'sa'
+  GAUGE = 0
+  SAMPLE = 1
+
+# frames are a concatenation of records: header, name, float64 values
+METRIC_HEADER = struct.Struct('<BHI')  # metric type, name length, value count
+MAX_PENDING_SAMPLES = 1000
+
+
+def encode_metrics(gauges: dict[str, float], samples: dict[str, list[float]]) -> bytes:
+  frame = bytearray()
+  for metric_type, metrics in ((METRIC_TYPE.GAUGE, {k: [v] for k, v in gauges.items()}), (METRIC_TYPE.SAMPLE, samples)):
+    for name, values in metrics.items():
+      name_bytes = name.encode()
+      frame += METRIC_HEADER.pack(metric_type, len(name_bytes), len(values))
+      frame += name_bytes
+      frame += struct.pack(f'<{len(values)}d', *values)
+  return bytes(frame)
+
+
+def decode_metrics(frame: bytes) -> Iterator[tuple[int, str, np.ndarray]]:
+  offset = 0
+  while offset < len(frame):
+    metric_type, name_len, count = METRIC_HEADER.unpack_from(frame, offset)
+    offset += METRIC_HEADER.size
+    name = frame[offset:offset + name_len].decode()
+    offset += name_len
+    values = np.frombuffer(frame, dtype='<f8', count=count, offset=offset)
+    offset += count * 8
+    yield metric_type, name, values
+
 
 class StatLog:
   def __init__(self):
@@ -27,6 +59,12 @@ class StatLog:
     self.zctx = None
     self.sock = None
 
+    # aggregated locally and sent as a single frame every STATS_CLIENT_FLUSH_TIME_S
+    self.gauges: dict[str, float] = {}
+    self.samples: dict[str, list[float]] = defaultdict(list)
+    self.pending_samples = 0
+    self.last_flush_time = 0.
+
   def connect(self) -> None:
     self.zctx = zmq.Context()
     self.sock = self.zctx.socket(zmq.PUSH)
@@ -36,27 +74,51 @@ class StatLog:
 
   def __del__(self):
     if self.sock is not None:
+      self.flush()
       self.sock.close()
     if self.zctx is not None:
       self.zctx.term()
 
-  def _send(self, metric: str) -> None:
+  def _reset(self) -> None:
+    self.gauges = {}
+    self.samples = defaultdict(list)
+    self.pending_samples = 0
+
+  def _check_process(self) -> None:
     if os.getpid() != self.pid:
+      # don't send metrics buffered by the parent before a fork
+      self._reset()
       self.connect()
 
+  def flush(self) -> None:
+    self.last_flush_time = time.monotonic()
+    if not (self.gauges or self.samples):
+      return
+
+    frame = encode_metrics(self.gauges, self.samples)
+    self._reset()
     try:
-      self.sock.send_string(metric, zmq.NOBLOCK)
+      self.sock.send(frame, zmq.NOBLOCK)
     except zmq.error.Again:
       # drop :/
       pass
 
+  def _maybe_flush(self) -> None:
+    if self.pending_samples >= MAX_PENDING_SAMPLES or time.monotonic() - self.last_flush_time > STATS_CLIENT_FLUSH_TIME_S:
+      self.flush()
+
   def gauge(self, name: str, value: float) -> None:
-    self._send(f"{name}:{value}|{METRIC_TYPE.GAUGE}")
+    self._check_process()
+    self.gauges[name] = value
+    self._maybe_flush()
 
   # Samples will be recorded in a buffer and at aggregation time,
   # statistical properties will be logged (mean, count, percentiles, ...)
   def sample(self, name: str, value: float):
-    self._send(f"{name}:{value}|{METRIC_TYPE.SAMPLE}")
+    self._check_process()
+    self.samples[name].append(value)
+    self.pending_samples += 1
+    self._maybe_flush()
 
 
 def main() -> NoReturn:
@@ -104,7 +166,7 @@ def main() -> NoReturn:
   idx = 0
   last_flush_time = time.monotonic()
   gauges = {}
-  samples: dict[str, list[float]] = defaultdict(list)
+  samples: dict[str, QuantileSketch] = defaultdict(QuantileSketch)
   try:
     while True:
       started_prev = sm['deviceState'].started
@@ -113,20 +175,17 @@ def main() -> NoReturn:
       # Update metrics
       while True:
         try:
-          metric = sock.recv_string(zmq.NOBLOCK)
+          frame = sock.recv(zmq.NOBLOCK)
           try:
-            metric_type = metric.split('|')[1]
-            metric_name = metric.split(':')[0]
-            metric_value = float(metric.split('|')[0].split(':')[1])
-
-            if metric_type == METRIC_TYPE.GAUGE:
-              gauges[metric_name] = metric_value
-            elif metric_type == METRIC_TYPE.SAMPLE:
-              samples[metric_name].append(metric_value)
-            else:
-              cloudlog.event("unknown metric type", metric_type=metric_type)
+            for metric_type, metric_name, metric_values in decode_metrics(frame):
+              if metric_type == METRIC_TYPE.GAUGE:
+                gauges[metric_name] = float(metric_values[-1])
+              elif metric_type == METRIC_TYPE.SAMPLE:
+                samples[metric_name].add(metric_values)
+              else:
+                cloudlog.event("unknown metric type", metric_type=metric_type)
           except Exception:
-            cloudlog.event("malformed metric", metric=metric)
+            cloudlog.event("malformed metric", frame=frame.hex())
         except zmq.error.Again:
           break
 
@@ -139,20 +198,15 @@ def main() -> NoReturn:
         for key, value in gauges.items():
           result += get_influxdb_line(f"gauge.{key}", value, current_time, tags)
 
-        for key, values in samples.items():
-          values.sort()
-          sample_count = len(values)
-          sample_sum = sum(values)
-
+        for key, sketch in samples.items():
           stats = {
-            'count': sample_count,
-            'min': values[0],
-            'max': values[-1],
-            'mean': sample_sum / sample_count,
+            'count': sketch.count,
+            'min': sketch.min,
+            'max': sketch.max,
+            'mean': sketch.mean(),
           }
           for percentile in [0.05, 0.5, 0.95]:
-            value = values[int(round(percentile * (sample_count - 1)))]
-            stats[f"p{int(percentile * 100)}"] = value
+            stats[f"p{int(percentile * 100)}"] = sketch.quantile(percentile)
 
           result += get_influxdb_line(f"sample.{key}", stats, current_time, tags)
 
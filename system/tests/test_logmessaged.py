@@ -1,11 +1,15 @@
 import glob
+import json
+import logging
 import os
 import time
 
 import cereal.messaging as messaging
+from openpilot.common.logging_extra import SwagLogFileFormatter
+from openpilot.system.logmessaged import RateLimiter, dropped_record, get_source
 from openpilot.system.manager.process_config import managed_processes
 from openpilot.system.hardware.hw import Paths
-from openpilot.common.swaglog import cloudlog, ipchandler
+from openpilot.common.swaglog import SwaglogRotatingFileHandler, cloudlog, ipchandler
 
 
 class TestLogmessaged:
@@ -53,3 +57,46 @@ class TestLogmessaged:
     logsize = sum([os.path.getsize(f) for f in self._get_log_files()])
     assert (n*len(msg)) < logsize < (n*(len(msg)+1024))
 
+
+
+class TestLogmessagedBatching:
+  def test_get_source(self):
+    record = cloudlog.makeRecord('swaglog', logging.ERROR, 'controlsd.py', 1, 'hello', (), None)
+    assert get_source(ipchandler.format(record).encode()) == b'controlsd.py'
+    # C++ records have no spaces, and the daemon set by manager takes precedence
+    assert get_source(b'{"ctx":{"daemon":"camerad"},"filename":"camera_qcom2.cc","msg":"hi"}') == b'camerad'
+
+  def test_rate_limiter(self):
+    limiter = RateLimiter(rate=10, burst=20)
+    assert sum(limiter.allow(b'a', 0.) for _ in range(100)) == 20
+    assert sum(limiter.allow(b'b', 0.) for _ in range(5)) == 5
+
+    # tokens refill at the rate, up to the burst
+    assert sum(limiter.allow(b'a', 1.) for _ in range(100)) == 10
+    assert sum(limiter.allow(b'a', 100.) for _ in range(100)) == 20
+    assert limiter.pop_dropped() == {b'a': 80 + 90 + 80}
+    assert limiter.pop_dropped() == {}
+
+    dat = dropped_record(b'a', 250)
+    assert dat[0] == logging.WARNING
+    assert "dropped 250 records" in json.loads(dat[1:])["msg"]
+
+  def test_emit_batch(self, tmp_path):
+    records = [ipchandler.format(cloudlog.makeRecord('swaglog', logging.INFO, 'f.py', i, f'msg {i}', (), None)) for i in range(10)]
+
+    def read_logs(emit):
+      handler = SwaglogRotatingFileHandler(str(tmp_path / emit / "swaglog"))
+      handler.setFormatter(SwagLogFileFormatter(None))
+      if emit == 'batch':
+        handler.emit_batch(records)
+      else:
+        for record in records:
+          handler.emit(record)
+      handler.close()
+      with open(handler.log_files[0]) as f:
+        # drop the random id added to each line
+        return [{k: v for k, v in json.loads(line).items() if k != 'id'} for line in f]
+
+    (tmp_path / 'batch').mkdir()
+    (tmp_path / 'single').mkdir()
+    assert read_logs('batch') == read_logs('single')
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from openpilot.system.micd import FFT_SAMPLES, SAMPLE_RATE, Mic, apply_a_weighting, calculate_spl
+
+
+def apply_a_weighting_fft(measurements):
+  # full complex FFT implementation, with the filter built for every window
+  freqs = np.fft.fftfreq(measurements.size, d=1 / SAMPLE_RATE)
+  A = 12194 ** 2 * freqs ** 4 / ((freqs ** 2 + 20.6 ** 2) * (freqs ** 2 + 12194 ** 2) * np.sqrt((freqs ** 2 + 107.7 ** 2) * (freqs ** 2 + 737.9 ** 2)))
+  A /= np.max(A)
+  return np.abs(np.fft.ifft(np.fft.fft(measurements * np.hanning(measurements.size)) * A))
+
+
+class TestMicd:
+  def test_a_weighting(self):
+    np.random.seed(0)
+    t = np.arange(FFT_SAMPLES) / SAMPLE_RATE
+    measurements = 0.1 * np.sin(2 * np.pi * 1000 * t) + 0.01 * np.random.randn(FFT_SAMPLES)
+    np.testing.assert_allclose(apply_a_weighting(measurements), apply_a_weighting_fft(measurements), atol=1e-12)
+
+  @pytest.mark.parametrize("block_size", [FFT_SAMPLES, 1000, 5000])
+  def test_callback_blocks(self, mocker, block_size):
+    mocker.patch('openpilot.system.micd.messaging.PubMaster')
+    mic = Mic()
+
+    np.random.seed(0)
+    audio = np.random.uniform(-0.5, 0.5, (3 * FFT_SAMPLES, 1))
+    for i in range(0, len(audio), block_size):
+      mic.callback(audio[i:i + block_size], None, None, None)
+
+    # the last full window is measured regardless of how samples are split into blocks
+    last = audio[2 * FFT_SAMPLES:, 0]
+    assert mic.num_measurements == 0
+    assert mic.sound_pressure == pytest.approx(calculate_spl(last)[0])
+    assert mic.sound_pressure_weighted == pytest.approx(calculate_spl(apply_a_weighting_fft(last))[0])
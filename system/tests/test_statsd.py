@@ -0,0 +1,34 @@
+import numpy as np
+
+from openpilot.system.statsd import METRIC_TYPE, StatLog, decode_metrics, encode_metrics
+
+
+class TestStatsd:
+  def test_frame_round_trip(self):
+    gauges = {"free_space_percent": 42.5, "cpu0_temperature": 55.}
+    samples = {"power_draw": [1.5, 2.25, 3.], "som_power_draw": [0.5]}
+
+    decoded = list(decode_metrics(encode_metrics(gauges, samples)))
+    assert [(t, n) for t, n, _ in decoded] == [(METRIC_TYPE.GAUGE, "free_space_percent"), (METRIC_TYPE.GAUGE, "cpu0_temperature"),
+                                               (METRIC_TYPE.SAMPLE, "power_draw"), (METRIC_TYPE.SAMPLE, "som_power_draw")]
+    np.testing.assert_equal(decoded[0][2], [42.5])
+    np.testing.assert_equal(decoded[2][2], samples["power_draw"])
+
+  def test_client_aggregation(self, mocker):
+    statlog = StatLog()
+    statlog.connect()
+    sock = mocker.patch.object(statlog, "sock")
+
+    # first call flushes immediately, the rest is batched into one frame
+    statlog.gauge("car_voltage", 12.)
+    assert sock.send.call_count == 1
+    for i in range(100):
+      statlog.gauge("car_voltage", 12. + i)
+      statlog.sample("power_draw", float(i))
+    assert sock.send.call_count == 1
+
+    statlog.flush()
+    assert sock.send.call_count == 2
+    metrics = {n: v for _, n, v in decode_metrics(sock.send.call_args.args[0])}
+    np.testing.assert_equal(metrics["car_voltage"], [111.])
+    np.testing.assert_equal(metrics["power_draw"], np.arange(100))
@@ -12,6 +12,7 @@ import cereal.messaging as messaging
 from msgq.visionipc import VisionIpcServer, VisionStreamType
 
 V4L2_BUF_FLAG_KEYFRAME = 8
+STATS_INTERVAL = 5.  # seconds
 
 # start encoderd
 # also start cereal messaging bridge
@@ -23,7 +24,43 @@ ENCODE_SOCKETS = {
   VisionStreamType.VISION_STREAM_WIDE_ROAD: "wideRoadEncodeData",
 }
 
-def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
+class DecodeStats:
+  """Decode latency and dropped frames of a stream, printed every STATS_INTERVAL"""
+  def __init__(self, name):
+    self.name = name
+    self.reset(time.monotonic())
+
+  def reset(self, t):
+    self.start_t = t
+    self.sent = 0
+    self.dropped_packets = 0
+    self.dropped_frames = 0
+    self.decode_times = []
+
+  def update(self, t, debug=False):
+    if t - self.start_t < STATS_INTERVAL:
+      return
+    if debug and len(self.decode_times):
+      decode_ms = np.array(self.decode_times) * 1000
+      print(f"{self.name}: {self.sent / (t - self.start_t):5.1f} fps, decode {decode_ms.mean():6.2f} ms avg {decode_ms.max():6.2f} ms max, " +
+            f"dropped {self.dropped_packets} packets {self.dropped_frames} frames")
+    self.reset(t)
+
+
+def yuv420p_to_nv12(frame, out, W, H):
+  # one copy from the decoder's planes into the NV12 buffer, interleaving U and V
+  if frame.format.name != 'yuv420p':
+    frame = frame.reformat(format='yuv420p')
+  y, u, v = (np.frombuffer(p, dtype=np.uint8).reshape(-1, p.line_size) for p in frame.planes)
+  out_y = out[:H*W].reshape(H, W)
+  out_uv = out[H*W:].reshape(H//2, W//2, 2)
+  out_y[:] = y[:H, :W]
+  out_uv[:, :, 0] = u[:H//2, :W//2]
+  out_uv[:, :, 1] = v[:H//2, :W//2]
+  return out
+
+
+def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False, threads=0, frame_threads=False):
   sock_name = ENCODE_SOCKETS[vst]
   if debug:
     print(f"start decoder for {sock_name}, {W}x{H}")
@@ -40,6 +77,11 @@ def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
     img_yuv = np.ndarray((H*W//2*3), dtype=np.uint8)
   else:
     codec = av.CodecContext.create("hevc", "r")
+    # slice threading doesn't delay frames. frame threading decodes faster, but holds back about one frame per thread,
+    # the time queue below keeps their timestamps
+    codec.thread_type = "FRAME" if frame_threads else "SLICE"
+    codec.thread_count = threads
+    img_yuv = np.empty(H*W*3//2, dtype=np.uint8)
 
   os.environ["ZMQ"] = "1"
   messaging.context = messaging.Context()
@@ -48,13 +90,17 @@ def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
   last_idx = -1
   seen_iframe = False
 
+  stats = DecodeStats(sock_name)
+
   time_q = []
   while 1:
     msgs = messaging.drain_sock(sock, wait_for_one=True)
-    for evt in msgs:
+    for i, evt in enumerate(msgs):
       evta = getattr(evt, evt.which())
-      if debug and evta.idx.encodeId != 0 and evta.idx.encodeId != (last_idx+1):
-        print("DROP PACKET!")
+      if evta.idx.encodeId != 0 and evta.idx.encodeId != (last_idx+1):
+        stats.dropped_packets += 1
+        if debug:
+          print("DROP PACKET!")
       last_idx = evta.idx.encodeId
       if not seen_iframe and not (evta.idx.flags & V4L2_BUF_FLAG_KEYFRAME):
         if debug:
@@ -73,6 +119,7 @@ def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
           codec.decode(av.packet.Packet(evta.header))
         seen_iframe = True
 
+      t = time.monotonic()
       if nvidia:
         rawSurface = nvDec.DecodeSurfaceFromPacket(np.frombuffer(evta.data, dtype=np.uint8))
         if rawSurface.Empty():
@@ -81,32 +128,34 @@ def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
           continue
         convSurface = conv_yuv.Execute(rawSurface, cc1)
         nvDwn_yuv.DownloadSingleSurface(convSurface, img_yuv)
+        frames = [None]
       else:
         frames = codec.decode(av.packet.Packet(evta.data))
-        if len(frames) == 0:
-          if debug:
-            print("DROP SURFACE")
+
+      for frame in frames:
+        # every packet is decoded, but when behind only the newest frame is converted and sent
+        frame_t = time_q.pop(0)
+        if i < len(msgs) - 1:
+          stats.dropped_frames += 1
           continue
-        assert len(frames) == 1
-        img_yuv = frames[0].to_ndarray(format=av.video.format.VideoFormat('yuv420p')).flatten()
-        uv_offset = H*W
-        y = img_yuv[:uv_offset]
-        uv = img_yuv[uv_offset:].reshape(2, -1).ravel('F')
-        img_yuv = np.hstack((y, uv))
 
-      vipc_server.send(vst, img_yuv.data, cnt, int(time_q[0]*1e9), int(time.monotonic()*1e9))
-      cnt += 1
+        if frame is not None:
+          yuv420p_to_nv12(frame, img_yuv, W, H)
+        vipc_server.send(vst, img_yuv.data, cnt, int(frame_t*1e9), int(time.monotonic()*1e9))
+        cnt += 1
+        stats.sent += 1
 
-      pc_latency = (time.monotonic()-time_q[0])*1000
-      time_q = time_q[1:]
-      if debug:
-        print("%2d %4d %.3f %.3f roll %6.2f ms latency %6.2f ms + %6.2f ms + %6.2f ms = %6.2f ms"
-              % (len(msgs), evta.idx.encodeId, evt.logMonoTime/1e9, evta.idx.timestampEof/1e6, frame_latency,
-                 process_latency, network_latency, pc_latency, process_latency+network_latency+pc_latency ), len(evta.data), sock_name)
+        pc_latency = (time.monotonic()-frame_t)*1000
+        if debug:
+          print("%2d %4d %.3f %.3f roll %6.2f ms latency %6.2f ms + %6.2f ms + %6.2f ms = %6.2f ms"
+                % (len(msgs), evta.idx.encodeId, evt.logMonoTime/1e9, evta.idx.timestampEof/1e6, frame_latency,
+                   process_latency, network_latency, pc_latency, process_latency+network_latency+pc_latency ), len(evta.data), sock_name)
+      stats.decode_times.append(time.monotonic() - t)
 
+    stats.update(time.monotonic(), debug)
 
 class CompressedVipc:
-  def __init__(self, addr, vision_streams, nvidia=False, debug=False):
+  def __init__(self, addr, vision_streams, nvidia=False, debug=False, threads=0, frame_threads=False):
     print("getting frame sizes")
     os.environ["ZMQ"] = "1"
     messaging.context = messaging.Context()
@@ -125,7 +174,7 @@ class CompressedVipc:
     self.procs = []
     for vst in vision_streams:
       ed = sm[ENCODE_SOCKETS[vst]]
-      p = multiprocessing.Process(target=decoder, args=(addr, self.vipc_server, vst, nvidia, ed.width, ed.height, debug))
+      p = multiprocessing.Process(target=decoder, args=(addr, self.vipc_server, vst, nvidia, ed.width, ed.height, debug, threads, frame_threads))
       p.start()
       self.procs.append(p)
 
@@ -144,6 +193,9 @@ if __name__ == "__main__":
   parser.add_argument("--nvidia", action="store_true", help="Use nvidia instead of ffmpeg")
   parser.add_argument("--cams", default="0,1,2", help="Cameras to decode")
   parser.add_argument("--silent", action="store_true", help="Suppress debug output")
+  parser.add_argument("--threads", type=int, default=0, help="Decoder threads per camera, 0 for automatic")
+  parser.add_argument("--frame-threads", action="store_true",
+                      help="Decode frames in parallel instead of slices, faster but adds about one frame of latency per thread")
   args = parser.parse_args()
 
   vision_streams = [
@@ -153,7 +205,7 @@ if __name__ == "__main__":
   ]
 
   vsts = [vision_streams[int(x)] for x in args.cams.split(",")]
-  cvipc = CompressedVipc(args.addr, vsts, args.nvidia, debug=(not args.silent))
+  cvipc = CompressedVipc(args.addr, vsts, args.nvidia, debug=(not args.silent), threads=args.threads, frame_threads=args.frame_threads)
 
   # register exit handler
   signal.signal(signal.SIGINT, lambda sig, frame: cvipc.kill())
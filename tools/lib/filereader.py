@@ -1,11 +1,18 @@
 import os
 import socket
+import time
 from urllib.parse import urlparse
 
-from openpilot.tools.lib.url_file import URLFile
+from openpilot.common.file_helpers import atomic_write_in_dir
+from openpilot.system.hardware.hw import Paths
+from openpilot.tools.lib.url_file import URLFile, hash_256
 
 DATA_ENDPOINT = os.getenv("DATA_ENDPOINT", "http://data-raw.comma.internal/")
 
+# how long the existence of remote files is remembered, missing files may still be uploading
+FILE_EXISTS_TTL = float(os.getenv("FILE_EXISTS_TTL", str(7 * 24 * 60 * 60)))
+FILE_MISSING_TTL = float(os.getenv("FILE_MISSING_TTL", str(10 * 60)))
+
 
 def internal_source_available():
   try:
@@ -25,10 +32,37 @@ def resolve_name(fn):
   return fn
 
 
-def file_exists(fn):
+def file_exists_cache_path(url: str) -> str:
+  return os.path.join(Paths.download_cache_root(), "exists", hash_256(url))
+
+
+def get_cached_file_exists(url: str) -> bool | None:
+  path = file_exists_cache_path(url)
+  try:
+    with open(path) as f:
+      exists = f.read() == "1"
+    age = time.time() - os.path.getmtime(path)
+  except FileNotFoundError:
+    return None
+  return exists if age < (FILE_EXISTS_TTL if exists else FILE_MISSING_TTL) else None
+
+
+def cache_file_exists(url: str, exists: bool) -> None:
+  path = file_exists_cache_path(url)
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with atomic_write_in_dir(path, mode="w", overwrite=True) as f:
+    f.write("1" if exists else "0")
+
+
+def file_exists(fn, cache=True):
   fn = resolve_name(fn)
   if fn.startswith(("http://", "https://")):
-    return URLFile(fn).get_length_online() != -1
+    exists = get_cached_file_exists(fn) if cache else None
+    if exists is None:
+      exists = URLFile(fn).get_length_online() != -1
+      if cache:
+        cache_file_exists(fn, exists)
+    return exists
   return os.path.exists(fn)
 
 
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import bz2
-from functools import cache, partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
 import multiprocessing
 import capnp
 import enum
@@ -87,15 +88,33 @@ Source = Callable[[SegmentRange, ReadMode], LogPaths]
 
 InternalUnavailableException = Exception("Internal source not available")
 
+FILE_EXISTS_WORKERS = 16  # concurrent existence checks, mostly HEAD requests
+
 
-@cache
 def default_valid_file(fn: LogPath) -> bool:
   return fn is not None and file_exists(fn)
 
 
+def get_valid_files(files: LogPaths, valid_file: ValidFileCallable = default_valid_file) -> list[bool]:
+  """Checks all files concurrently"""
+  with ThreadPoolExecutor(max_workers=max(1, min(FILE_EXISTS_WORKERS, len(files)))) as executor:
+    return list(executor.map(lambda fn: fn is not None and valid_file(fn), files))
+
+
+def all_files_valid(files: LogPaths, valid_file: ValidFileCallable = default_valid_file) -> bool:
+  """Checks files concurrently, returning as soon as one is invalid"""
+  executor = ThreadPoolExecutor(max_workers=max(1, min(FILE_EXISTS_WORKERS, len(files))))
+  try:
+    futures = [executor.submit(lambda fn: fn is not None and valid_file(fn), fn) for fn in files]
+    return all(future.result() for future in as_completed(futures))
+  finally:
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
 def auto_strategy(rlog_paths: LogPaths, qlog_paths: LogPaths, interactive: bool, valid_file: ValidFileCallable) -> LogPaths:
   # auto select logs based on availability
-  missing_rlogs = [rlog is None or not valid_file(rlog) for rlog in rlog_paths].count(True)
+  valid_rlogs = get_valid_files(rlog_paths, valid_file)
+  missing_rlogs = valid_rlogs.count(False)
   if missing_rlogs != 0:
     if interactive:
       if input(f"{missing_rlogs}/{len(rlog_paths)} rlogs were not found, would you like to fallback to qlogs for those segments? (y/n) ").lower() != "y":
@@ -103,8 +122,9 @@ def auto_strategy(rlog_paths: LogPaths, qlog_paths: LogPaths, interactive: bool,
     else:
       cloudlog.warning(f"{missing_rlogs}/{len(rlog_paths)} rlogs were not found, falling back to qlogs for those segments...")
 
-    return [rlog if valid_file(rlog) else (qlog if valid_file(qlog) else None)
-            for (rlog, qlog) in zip(rlog_paths, qlog_paths, strict=True)]
+    valid_qlogs = get_valid_files([qlog if not valid else None for qlog, valid in zip(qlog_paths, valid_rlogs, strict=True)], valid_file)
+    return [rlog if valid_rlog else (qlog if valid_qlog else None)
+            for (rlog, qlog, valid_rlog, valid_qlog) in zip(rlog_paths, qlog_paths, valid_rlogs, valid_qlogs, strict=True)]
   return rlog_paths
 
 
@@ -165,40 +185,50 @@ def direct_source(file_or_url: str) -> LogPaths:
   return [file_or_url]
 
 
-def get_invalid_files(files):
-  for f in files:
-    if f is None or not file_exists(f):
-      yield f
+def get_invalid_files(files: LogPaths) -> LogPaths:
+  return [fn for fn, valid in zip(files, get_valid_files(files), strict=True) if not valid]
 
 
 def check_source(source: Source, *args) -> LogPaths:
   files = source(*args)
   assert len(files) > 0, "No files on source"
-  assert next(get_invalid_files(files), False) is False, "Some files are invalid"
+  assert all_files_valid(files), "Some files are invalid"
   return files
 
 
+def find_source(sources: list[Source], sr: SegmentRange, mode: ReadMode, exceptions: dict[str, Exception], concurrent: bool = True) -> LogPaths | None:
+  """Checks sources concurrently, returning the files of the first valid one in order of priority"""
+  executor = ThreadPoolExecutor(max_workers=len(sources) if concurrent else 1)
+  try:
+    futures = [executor.submit(check_source, source, sr, mode) for source in sources]
+    for source, future in zip(sources, futures, strict=True):
+      try:
+        return future.result()
+      except Exception as e:
+        exceptions[source.__name__] = e
+  finally:
+    # lower priority sources still being checked finish in the background
+    executor.shutdown(wait=False, cancel_futures=True)
+  return None
+
+
 def auto_source(sr: SegmentRange, mode=ReadMode.RLOG) -> LogPaths:
   if mode == ReadMode.SANITIZED:
     return comma_car_segments_source(sr, mode)
 
   SOURCES: list[Source] = [internal_source, internal_source_zst, openpilotci_source, comma_api_source, comma_car_segments_source,]
-  exceptions = {}
+  exceptions: dict[str, Exception] = {}
 
   # for automatic fallback modes, auto_source needs to first check if rlogs exist for any source
   if mode in [ReadMode.AUTO, ReadMode.AUTO_INTERACTIVE]:
-    for source in SOURCES:
-      try:
-        return check_source(source, sr, ReadMode.RLOG)
-      except Exception:
-        pass
+    files = find_source(SOURCES, sr, ReadMode.RLOG, {})
+    if files is not None:
+      return files
 
-  # Automatically determine viable source
-  for source in SOURCES:
-    try:
-      return check_source(source, sr, mode)
-    except Exception as e:
-      exceptions[source.__name__] = e
+  # Automatically determine viable source, one at a time if the user may be prompted
+  files = find_source(SOURCES, sr, mode, exceptions, concurrent=mode != ReadMode.AUTO_INTERACTIVE)
+  if files is not None:
+    return files
 
   raise Exception("auto_source could not find any valid source, exceptions for sources:\n  - " +
                   "\n  - ".join([f"{k}: {repr(v)}" for k, v in exceptions.items()]))
@@ -251,7 +281,7 @@ class LogReader:
 
     identifiers = source(sr, mode)
 
-    invalid_count = len(list(get_invalid_files(identifiers)))
+    invalid_count = len(get_invalid_files(identifiers))
     assert invalid_count == 0, f"{invalid_count}/{len(identifiers)} invalid log(s) found, please ensure all logs \
 are uploaded or auto fallback to qlogs with '/a' selector at the end of the route name."
     return identifiers
@@ -0,0 +1,204 @@
+"""Compact aggregates of logs, cached per log file.
+
+Debug tools that only need service counts, event and alert changes, carParams or CAN fingerprints
+otherwise download and parse every message of a route each run. The first time a log file is
+summarized, its aggregates are stored as a small JSON file in the download cache, and later
+summaries of the same file only read that.
+
+  summary = get_summary("a2a0ccea32023010|2023-07-27--13-01-19", ReadMode.QLOG)
+  print(summary.frequencies(), summary.CP.carFingerprint)
+"""
+import base64
+import json
+import multiprocessing
+import os
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+
+from cereal import car
+from openpilot.common.file_helpers import atomic_write_in_dir
+from openpilot.system.hardware.hw import Paths
+from openpilot.tools.lib.logreader import LogReader, ReadMode
+from openpilot.tools.lib.url_file import hash_256
+
+CACHE_VERSION = 2
+
+
+@dataclass
+class LogSummary:
+  start_time: int = 0  # logMonoTime of the first and last messages
+  end_time: int = 0
+  service_counts: dict[str, int] = field(default_factory=dict)
+
+  # onroadEvents names by count, and each change of the set of names
+  event_counts: dict[str, int] = field(default_factory=dict)
+  events: list[tuple[int, list[str]]] = field(default_factory=list)
+  # each change of controlsState.alertType and of ignition of any panda
+  alerts: list[tuple[int, str]] = field(default_factory=list)
+  ignition: list[tuple[int, bool]] = field(default_factory=list)
+  # service_counts and event_counts before each ignition change, e.g. to only count a drive
+  ignition_service_counts: list[dict[str, int]] = field(default_factory=list)
+  ignition_event_counts: list[dict[str, int]] = field(default_factory=list)
+
+  panda_types: list[str] = field(default_factory=list)  # of the first pandaStates
+  first_car_params: bytes | None = None
+  car_params: bytes | None = None  # last carParams
+  # CAN bus -> address -> length of the last frame, like car fingerprints
+  fingerprint: dict[int, dict[int, int]] = field(default_factory=dict)
+
+  @property
+  def duration(self) -> float:
+    return (self.end_time - self.start_time) / 1e9
+
+  @property
+  def CP(self):
+    return self._car_params_reader(self.car_params)
+
+  @property
+  def first_CP(self):
+    return self._car_params_reader(self.first_car_params)
+
+  @staticmethod
+  def _car_params_reader(dat: bytes | None):
+    if dat is None:
+      return None
+    with car.CarParams.from_bytes(dat) as CP:
+      return CP.as_builder().as_reader()
+
+  def frequencies(self) -> dict[str, float]:
+    return {s: cnt / self.duration for s, cnt in self.service_counts.items()} if self.duration > 0 else {}
+
+  @classmethod
+  def from_logreader(cls, lr) -> 'LogSummary':
+    summary = cls()
+    service_counts: Counter = Counter()
+    event_counts: Counter = Counter()
+    start_time = end_time = None
+    for msg in lr:
+      which = msg.which()
+      service_counts[which] += 1
+      start_time = msg.logMonoTime if start_time is None else min(start_time, msg.logMonoTime)
+      end_time = msg.logMonoTime if end_time is None else max(end_time, msg.logMonoTime)
+
+      if which == 'onroadEvents':
+        names = sorted({str(e.name) for e in msg.onroadEvents})
+        event_counts.update(str(e.name) for e in msg.onroadEvents)
+        if not len(summary.events) or summary.events[-1][1] != names:
+          summary.events.append((msg.logMonoTime, names))
+
+      elif which == 'controlsState':
+        alert_type = msg.controlsState.alertType
+        if not len(summary.alerts) or summary.alerts[-1][1] != alert_type:
+          summary.alerts.append((msg.logMonoTime, alert_type))
+
+      elif which == 'pandaStates':
+        if not len(summary.panda_types):
+          summary.panda_types = [str(ps.pandaType) for ps in msg.pandaStates]
+        ign = any(ps.ignitionLine or ps.ignitionCan for ps in msg.pandaStates)
+        if not len(summary.ignition) or summary.ignition[-1][1] != ign:
+          summary.ignition.append((msg.logMonoTime, ign))
+          summary.ignition_service_counts.append(dict(service_counts - Counter({which: 1})))
+          summary.ignition_event_counts.append(dict(event_counts))
+
+      elif which == 'carParams':
+        summary.car_params = msg.carParams.as_builder().to_bytes()
+        if summary.first_car_params is None:
+          summary.first_car_params = summary.car_params
+
+      elif which == 'can':
+        for c in msg.can:
+          summary.fingerprint.setdefault(c.src, {})[c.address] = len(c.dat)
+
+    summary.start_time, summary.end_time = start_time or 0, end_time or 0
+    summary.service_counts = dict(service_counts)
+    summary.event_counts = dict(event_counts)
+    return summary
+
+  @classmethod
+  def merge(cls, summaries: list['LogSummary']) -> 'LogSummary':
+    """Aggregates of consecutive logs, e.g. the segments of a route"""
+    summaries = [s for s in summaries if len(s.service_counts)]
+    merged = cls()
+    if not len(summaries):
+      return merged
+
+    merged.start_time = min(s.start_time for s in summaries)
+    merged.end_time = max(s.end_time for s in summaries)
+    service_counts: Counter = Counter()
+    event_counts: Counter = Counter()
+    for s in summaries:
+      # changes are only kept where the value differs from the end of the previous log
+      merged.events += [e for i, e in enumerate(s.events) if i > 0 or not len(merged.events) or merged.events[-1][1] != e[1]]
+      merged.alerts += [a for i, a in enumerate(s.alerts) if i > 0 or not len(merged.alerts) or merged.alerts[-1][1] != a[1]]
+      for i, g in enumerate(s.ignition):
+        if i > 0 or not len(merged.ignition) or merged.ignition[-1][1] != g[1]:
+          merged.ignition.append(g)
+          merged.ignition_service_counts.append(dict(service_counts + Counter(s.ignition_service_counts[i])))
+          merged.ignition_event_counts.append(dict(event_counts + Counter(s.ignition_event_counts[i])))
+      for src, addrs in s.fingerprint.items():
+        merged.fingerprint.setdefault(src, {}).update(addrs)
+      service_counts.update(s.service_counts)
+      event_counts.update(s.event_counts)
+
+    merged.service_counts = dict(service_counts)
+    merged.event_counts = dict(event_counts)
+    merged.panda_types = next((s.panda_types for s in summaries if len(s.panda_types)), [])
+    merged.first_car_params = next((s.first_car_params for s in summaries if s.first_car_params is not None), None)
+    merged.car_params = next((s.car_params for s in reversed(summaries) if s.car_params is not None), None)
+    return merged
+
+  def to_json(self) -> str:
+    dat = asdict(self)
+    dat['version'] = CACHE_VERSION
+    for k in ('first_car_params', 'car_params'):
+      dat[k] = None if dat[k] is None else base64.b64encode(dat[k]).decode()
+    return json.dumps(dat)
+
+  @classmethod
+  def from_json(cls, s: str) -> 'LogSummary':
+    dat = json.loads(s)
+    assert dat.pop('version') == CACHE_VERSION, "unsupported summary cache version"
+    for k in ('first_car_params', 'car_params'):
+      dat[k] = None if dat[k] is None else base64.b64decode(dat[k])
+    # JSON turns tuples into lists and keys into strings
+    dat['events'] = [(t, names) for t, names in dat['events']]
+    dat['alerts'] = [(t, alert) for t, alert in dat['alerts']]
+    dat['ignition'] = [(t, ign) for t, ign in dat['ignition']]
+    dat['fingerprint'] = {int(src): {int(addr): length for addr, length in addrs.items()} for src, addrs in dat['fingerprint'].items()}
+    return cls(**dat)
+
+
+def summary_cache_path(fn: str) -> str:
+  key = fn
+  if os.path.isfile(fn):
+    # local logs may be rewritten
+    key = f"{os.path.abspath(fn)}|{os.path.getmtime(fn)}|{os.path.getsize(fn)}"
+  return os.path.join(Paths.download_cache_root(), "summary", hash_256(key))
+
+
+def get_log_summary(fn: str, cache: bool = True) -> LogSummary:
+  path = summary_cache_path(fn)
+  if cache:
+    try:
+      with open(path) as f:
+        return LogSummary.from_json(f.read())
+    except (FileNotFoundError, AssertionError, ValueError, KeyError, TypeError):
+      pass
+
+  summary = LogSummary.from_logreader(LogReader(fn))
+  if cache:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with atomic_write_in_dir(path, mode="w", overwrite=True) as f:
+      f.write(summary.to_json())
+  return summary
+
+
+def get_summary(identifier: str | list[str], default_mode: ReadMode = ReadMode.RLOG, num_processes: int = 1, cache: bool = True) -> LogSummary:
+  """Summary of a route, segment range or log files, reading each log only if it's not summarized yet"""
+  files = [fn for fn in LogReader(identifier, default_mode=default_mode).logreader_identifiers if fn is not None]
+  if num_processes > 1 and len(files) > 1:
+    with multiprocessing.Pool(num_processes) as pool:
+      summaries = pool.starmap(get_log_summary, [(fn, cache) for fn in files])
+  else:
+    summaries = [get_log_summary(fn, cache) for fn in files]
+  return LogSummary.merge(summaries)
@@ -1,5 +1,6 @@
 import capnp
 import contextlib
+import http.server
 import io
 import shutil
 import tempfile
@@ -10,7 +11,10 @@ import requests
 from parameterized import parameterized
 
 from cereal import log as capnp_log
-from openpilot.tools.lib.logreader import LogIterable, LogReader, comma_api_source, parse_indirect, ReadMode, InternalUnavailableException
+from openpilot.selfdrive.test.helpers import http_server_context
+from openpilot.tools.lib import filereader
+from openpilot.tools.lib.logreader import LogIterable, LogReader, comma_api_source, parse_indirect, ReadMode, InternalUnavailableException, \
+                                          auto_source, get_invalid_files
 from openpilot.tools.lib.route import SegmentRange
 from openpilot.tools.lib.url_file import URLFileException
 
@@ -46,6 +50,32 @@ def setup_source_scenario(mocker, is_internal=False):
   yield
 
 
+class LogServerRequestHandler(http.server.BaseHTTPRequestHandler):
+  files: set[str] = set()
+  head_requests: list[str] = []
+
+  def do_HEAD(self):
+    self.head_requests.append(self.path)
+    if self.path in self.files:
+      self.send_response(200)
+      self.send_header("Content-Length", "4")
+    else:
+      self.send_response(404)
+    self.end_headers()
+
+  def log_message(self, *args):
+    pass
+
+
+@pytest.fixture
+def log_server(tmp_path, monkeypatch):
+  monkeypatch.setenv("COMMA_CACHE", str(tmp_path))
+  LogServerRequestHandler.files = set()
+  LogServerRequestHandler.head_requests = []
+  with http_server_context(handler=LogServerRequestHandler, server_cls=http.server.ThreadingHTTPServer) as (host, port):
+    yield f"http://{host}:{port}", LogServerRequestHandler
+
+
 class TestLogReader:
   @parameterized.expand([
     (f"{TEST_ROUTE}", ALL_SEGS),
@@ -255,3 +285,42 @@ class TestLogReader:
       msgs = list(LogReader(qlog.name, only_union_types=True))
       assert len(msgs) == num_msgs
       [m.which() for m in msgs]
+
+  def test_invalid_files_cache(self, log_server, monkeypatch):
+    host, handler = log_server
+    handler.files = {f"/{seg}/rlog.bz2" for seg in range(0, 20, 2)}
+    files = [f"{host}/{seg}/rlog.bz2" for seg in range(20)]
+
+    assert get_invalid_files(files) == files[1::2]
+    assert sorted(handler.head_requests) == sorted(f"/{seg}/rlog.bz2" for seg in range(20))
+
+    # existence is remembered on disk
+    handler.head_requests.clear()
+    assert get_invalid_files(files) == files[1::2]
+    assert handler.head_requests == []
+
+    # missing files are checked again once expired, they may have been uploaded since
+    monkeypatch.setattr(filereader, "FILE_MISSING_TTL", 0)
+    handler.files.add("/1/rlog.bz2")
+    assert get_invalid_files(files) == files[3::2]
+    assert sorted(handler.head_requests) == sorted(f"/{seg}/rlog.bz2" for seg in range(1, 20, 2))
+
+  def test_auto_source_priority(self, log_server, mocker):
+    host, handler = log_server
+    sr = SegmentRange(f"{TEST_ROUTE}/0:10")
+    handler.files = {f"/{source}/{seg}/rlog.bz2" for source in ("openpilotci", "comma_api", "comma_car_segments") for seg in range(10)}
+    handler.files.remove("/openpilotci/5/rlog.bz2")
+
+    mocker.patch("openpilot.tools.lib.logreader.internal_source", side_effect=InternalUnavailableException).__name__ = "internal_source"
+    mocker.patch("openpilot.tools.lib.logreader.internal_source_zst", side_effect=InternalUnavailableException).__name__ = "internal_source_zst"
+    for source in ("openpilotci", "comma_api", "comma_car_segments"):
+      mock = mocker.patch(f"openpilot.tools.lib.logreader.{source}_source")
+      mock.side_effect = lambda sr, mode, source=source: [f"{host}/{source}/{seg}/rlog.bz2" for seg in sr.seg_idxs]
+      mock.__name__ = f"{source}_source"
+
+    # openpilotci is missing a segment, so the next complete source is used
+    assert auto_source(sr) == [f"{host}/comma_api/{seg}/rlog.bz2" for seg in range(10)]
+
+    with pytest.raises(Exception, match="auto_source could not find any valid source"):
+      handler.files.clear()
+      auto_source(SegmentRange(f"{TEST_ROUTE}/10:12"))
@@ -0,0 +1,82 @@
+from cereal import car
+import cereal.messaging as messaging
+from openpilot.tools.lib.helpers import save_log
+from openpilot.tools.lib.route_summary import LogSummary, get_log_summary
+
+
+def make_log(t0=0, ignition=True, events=('pcmEnable',), alert='', fingerprint='MOCK'):
+  msgs = []
+  ps = messaging.new_message('pandaStates', 1)
+  ps.pandaStates[0].pandaType = 'tres'
+  ps.pandaStates[0].ignitionLine = ignition
+  msgs.append(ps)
+
+  ev = messaging.new_message('onroadEvents', len(events))
+  for i, name in enumerate(events):
+    ev.onroadEvents[i].name = name
+  msgs.append(ev)
+
+  cs = messaging.new_message('controlsState')
+  cs.controlsState.alertType = alert
+  msgs.append(cs)
+
+  cp = messaging.new_message('carParams')
+  cp.carParams = car.CarParams.new_message(carFingerprint=fingerprint)
+  msgs.append(cp)
+
+  can = messaging.new_message('can', 2)
+  can.can[0] = {'address': 0x10, 'src': 0, 'dat': b'\x00' * 8}
+  can.can[1] = {'address': 0x20, 'src': 1, 'dat': b'\x00' * 4}
+  msgs.append(can)
+
+  for i, m in enumerate(msgs):
+    m.logMonoTime = t0 + i * int(1e8)
+  return [m.as_reader() for m in msgs]
+
+
+class TestRouteSummary:
+  def test_from_logreader(self):
+    summary = LogSummary.from_logreader(make_log())
+    assert summary.service_counts == {'pandaStates': 1, 'onroadEvents': 1, 'controlsState': 1, 'carParams': 1, 'can': 1}
+    assert summary.duration == 0.4
+    assert summary.event_counts == {'pcmEnable': 1}
+    assert summary.panda_types == ['tres']
+    assert summary.ignition == [(0, True)]
+    assert summary.ignition_service_counts == [{}] and summary.ignition_event_counts == [{}]
+    assert summary.fingerprint == {0: {0x10: 8}, 1: {0x20: 4}}
+    assert summary.CP.carFingerprint == 'MOCK'
+
+  def test_json(self):
+    summary = LogSummary.from_logreader(make_log())
+    assert LogSummary.from_json(summary.to_json()) == summary
+
+  def test_merge(self):
+    first = LogSummary.from_logreader(make_log(0, alert='a', fingerprint='FIRST'))
+    second = LogSummary.from_logreader(make_log(int(1e9), ignition=False, alert='a', fingerprint='LAST'))
+    merged = LogSummary.merge([first, second, LogSummary()])
+    assert merged.start_time == 0 and merged.end_time == int(1.4e9)
+    assert merged.service_counts['can'] == 2
+    assert merged.event_counts == {'pcmEnable': 2}
+    # unchanged values across logs aren't repeated
+    assert merged.alerts == [(int(2e8), 'a')]
+    assert merged.events == [(int(1e8), ['pcmEnable'])]
+    assert merged.ignition == [(0, True), (int(1e9), False)]
+    # counts up to each ignition change
+    assert merged.ignition_service_counts[1] == first.service_counts
+    assert merged.ignition_event_counts[1] == {'pcmEnable': 1}
+    assert (merged.first_CP.carFingerprint, merged.CP.carFingerprint) == ('FIRST', 'LAST')
+
+  def test_cache(self, tmp_path, monkeypatch, mocker):
+    monkeypatch.setenv('COMMA_CACHE', str(tmp_path / 'cache'))
+    fn = str(tmp_path / 'rlog.bz2')
+    save_log(fn, make_log())
+
+    summary = get_log_summary(fn)
+    from_logreader = mocker.patch.object(LogSummary, 'from_logreader')
+    assert get_log_summary(fn) == summary
+    from_logreader.assert_not_called()
+
+    # rewritten logs are summarized again
+    save_log(fn, make_log(events=()))
+    mocker.stopall()
+    assert get_log_summary(fn).event_counts == {}
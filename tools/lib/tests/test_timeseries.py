@@ -0,0 +1,50 @@
+from collections import defaultdict
+
+import hypothesis.strategies as st
+import numpy as np
+from hypothesis import HealthCheck, Phase, given, settings
+
+from cereal import log
+from openpilot.selfdrive.test.fuzzy_generation import FuzzyGenerator
+from openpilot.tools.lib.timeseries import get_columns
+
+SERVICES = ['carState', 'carParams', 'controlsState', 'modelV2', 'pandaStates', 'liveCalibration', 'radarState']
+
+
+def flatten(value, path, t, leaves):
+  # every number in the message dict, lists of lists aren't plotted
+  if isinstance(value, (bool, int, float)):
+    leaves[path].append((t, float(value)))
+  elif isinstance(value, dict):
+    for k, v in value.items():
+      flatten(v, f"{path}/{k}", t, leaves)
+  elif isinstance(value, list) and not any(isinstance(v, list) for v in value):
+    for i, v in enumerate(value):
+      flatten(v, f"{path}/{i}", t, leaves)
+
+
+class TestTimeSeries:
+  @given(st.data())
+  @settings(phases=[Phase.generate], max_examples=10, deadline=None,
+            suppress_health_check=[HealthCheck.too_slow, HealthCheck.data_too_large, HealthCheck.large_base_example])
+  def test_matches_to_dict(self, data):
+    msgs = []
+    for _ in range(2):
+      for m in FuzzyGenerator.get_random_event_msg(data.draw, events=SERVICES, real_floats=True):
+        m['logMonoTime'] = len(msgs) * 1000
+        msgs.append(log.Event.new_message(**m).as_reader())
+
+    leaves = defaultdict(list)
+    for msg in msgs:
+      flatten(msg.to_dict()[msg.which()], msg.which(), msg.logMonoTime, leaves)
+
+    columns = get_columns(msgs)
+    assert columns.keys() == leaves.keys()
+    for path, (t, values) in columns.items():
+      np.testing.assert_array_equal(t, [t for t, _ in leaves[path]], err_msg=path)
+      np.testing.assert_array_equal(values, [v for _, v in leaves[path]], err_msg=path)
+
+  def test_services(self):
+    msg = log.Event.new_message(logMonoTime=1, carState={'vEgo': 1.5}).as_reader()
+    assert set(get_columns([msg], services=['modelV2'])) == set()
+    assert get_columns([msg], services=['carState'])['carState/vEgo'][1].tolist() == [1.5]
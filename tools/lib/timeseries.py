@@ -0,0 +1,179 @@
+"""Numeric time series of logs, as NumPy columns.
+
+Converting each message with to_dict and walking the result is slow for a whole route. Instead, the
+capnp schema of each service is walked once into a plan of its numeric fields, which picks them out
+of every message: scalars of a struct with one attrgetter call and numeric lists with one copy. A
+column of logMonoTimes and float64 values is built for each leaf, named by its path as in the
+tools before, e.g. carState/vEgo, pandaStates/0/voltage or modelV2/position/x/0.
+"""
+from collections import defaultdict
+from operator import attrgetter
+
+import numpy as np
+
+from cereal import log
+from cereal.arrays import as_arrays
+
+NUMERIC_TYPES = {'bool', 'int8', 'int16', 'int32', 'int64', 'uint8', 'uint16', 'uint32', 'uint64', 'float32', 'float64'}
+MAX_DEPTH = 16
+
+# how a field is read
+SCALAR, STRUCT, LIST, STRUCT_LIST = range(4)
+
+
+def get_field_plan(field, depth: int = 0) -> tuple[int, 'StructPlan | None'] | None:
+  """How to read a field, None if it has no numeric values"""
+  plan = None
+  if field.proto.which() == 'group':
+    plan = STRUCT, StructPlan(field.schema, depth + 1)
+  elif field.proto.slot.type.which() in NUMERIC_TYPES:
+    return SCALAR, None
+  elif field.proto.slot.type.which() == 'struct':
+    plan = STRUCT, StructPlan(field.schema, depth + 1)
+  elif field.proto.slot.type.which() == 'list':
+    element_type = field.proto.slot.type.list.elementType.which()
+    if element_type in NUMERIC_TYPES:
+      return LIST, None
+    elif element_type == 'struct':
+      plan = STRUCT_LIST, StructPlan(field.schema.elementType, depth + 1)
+
+  # structs without numeric fields are skipped
+  return plan if plan is not None and plan[1] else None
+
+
+class StructPlan:
+  """Numeric fields of a struct schema, and how to read them from messages"""
+  def __init__(self, schema, depth: int = 0):
+    self.scalars: list[str] = []
+    self.lists: list[str] = []
+    self.structs: list[tuple[str, StructPlan]] = []
+    self.struct_lists: list[tuple[str, StructPlan]] = []
+    self.union: dict[str, tuple[int, StructPlan | None]] = {}
+
+    # recursive structs are cut off
+    if depth < MAX_DEPTH:
+      for name in schema.non_union_fields:
+        plan = get_field_plan(schema.fields[name], depth)
+        if plan is not None:
+          kind, sub_plan = plan
+          if kind == SCALAR:
+            self.scalars.append(name)
+          elif kind == LIST:
+            self.lists.append(name)
+          elif kind == STRUCT:
+            self.structs.append((name, sub_plan))
+          else:
+            self.struct_lists.append((name, sub_plan))
+
+      for name in schema.union_fields:
+        plan = get_field_plan(schema.fields[name], depth)
+        if plan is not None:
+          self.union[name] = plan
+
+    self.get_scalars = attrgetter(*self.scalars) if len(self.scalars) > 1 else None
+
+  def add(self, series: 'TimeSeries', path: str, t: int, struct) -> None:
+    if len(self.scalars) == 1:
+      series.add_scalars(path, self.scalars, t, (getattr(struct, self.scalars[0]),))
+    elif len(self.scalars):
+      series.add_scalars(path, self.scalars, t, self.get_scalars(struct))
+
+    if len(self.lists):
+      for name, values in zip(self.lists, as_arrays(struct, *self.lists), strict=True):
+        series.add_list(f"{path}/{name}", t, values)
+
+    for name, plan in self.structs:
+      plan.add(series, f"{path}/{name}", t, getattr(struct, name))
+
+    for name, plan in self.struct_lists:
+      for i, item in enumerate(getattr(struct, name)):
+        plan.add(series, f"{path}/{name}/{i}", t, item)
+
+    if len(self.union):
+      which = struct.which()
+      if which in self.union:
+        series.add_field(f"{path}/{which}", which, t, struct, *self.union[which])
+
+  def __bool__(self) -> bool:
+    return bool(self.scalars or self.lists or self.structs or self.struct_lists or self.union)
+
+
+class TimeSeries:
+  """Accumulates the numeric fields of messages, by service"""
+  def __init__(self, services: list[str] | None = None):
+    self.services = None if services is None else set(services)
+    self.plans: dict[str, tuple[int, StructPlan | None] | None] = {}
+
+    # struct path -> field names, times and rows of values
+    self.scalar_rows: dict[str, tuple[list[str], list[int], list[tuple]]] = {}
+    # list path -> times and arrays of values
+    self.list_rows: dict[str, tuple[list[int], list[np.ndarray]]] = defaultdict(lambda: ([], []))
+
+  def get_plan(self, service: str) -> tuple[int, StructPlan | None] | None:
+    if service not in self.plans:
+      self.plans[service] = get_field_plan(log.Event.schema.fields[service])
+    return self.plans[service]
+
+  def add_scalars(self, path: str, names: list[str], t: int, values: tuple) -> None:
+    if path not in self.scalar_rows:
+      self.scalar_rows[path] = (names, [], [])
+    _, times, rows = self.scalar_rows[path]
+    times.append(t)
+    rows.append(values)
+
+  def add_list(self, path: str, t: int, values: np.ndarray) -> None:
+    times, arrays = self.list_rows[path]
+    times.append(t)
+    arrays.append(values)
+
+  def add_field(self, path: str, name: str, t: int, struct, kind: int, plan: StructPlan | None) -> None:
+    if kind == SCALAR:
+      self.add_scalars(path, [], t, (getattr(struct, name),))
+    elif kind == LIST:
+      self.add_list(path, t, as_arrays(struct, name)[0])
+    elif kind == STRUCT:
+      plan.add(self, path, t, getattr(struct, name))
+    else:
+      for i, item in enumerate(getattr(struct, name)):
+        plan.add(self, f"{path}/{i}", t, item)
+
+  def add(self, msg) -> None:
+    service = msg.which()
+    if self.services is not None and service not in self.services:
+      return
+    plan = self.get_plan(service)
+    if plan is not None:
+      self.add_field(service, service, msg.logMonoTime, msg, *plan)
+
+  def extend(self, msgs) -> None:
+    for msg in msgs:
+      self.add(msg)
+
+  def get_columns(self) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """Times and values of every numeric leaf by path, in message order"""
+    columns = {}
+    for path, (names, times, rows) in self.scalar_rows.items():
+      t = np.array(times, dtype=np.int64)
+      values = np.array(rows, dtype=np.float64)
+      if not len(names):
+        # a single scalar field, e.g. of a union
+        columns[path] = (t, values[:, 0])
+      for i, name in enumerate(names):
+        columns[f"{path}/{name}"] = (t, values[:, i])
+
+    for path, (times, arrays) in self.list_rows.items():
+      # lists may change length, each index is a column of the messages that have it
+      t = np.array(times, dtype=np.int64)
+      lengths = np.array([len(a) for a in arrays], dtype=np.int64)
+      values = np.concatenate(arrays).astype(np.float64) if len(arrays) else np.empty(0)
+      offsets = np.cumsum(lengths) - lengths
+      for i in range(lengths.max(initial=0)):
+        mask = lengths > i
+        columns[f"{path}/{i}"] = (t[mask], values[offsets[mask] + i])
+    return columns
+
+
+def get_columns(msgs, services: list[str] | None = None) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+  series = TimeSeries(services)
+  series.extend(msgs)
+  return series.get_columns()
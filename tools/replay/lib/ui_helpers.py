@@ -1,12 +1,13 @@
-import itertools
 from typing import Any
 
+import cv2
 import matplotlib.pyplot as plt
 import numpy as np
 import pygame
 
 from matplotlib.backends.backend_agg import FigureCanvasAgg
 
+from cereal.arrays import as_arrays
 from openpilot.common.transformations.camera import get_view_frame_from_calib_frame
 from openpilot.selfdrive.controls.radard import RADAR_TO_CAMERA
 
@@ -69,25 +70,28 @@ def to_topdown_pt(y, x):
   return -1, -1
 
 
+def to_topdown_pts(y, x):
+  # vectorized to_topdown_pt, with a mask of the points on the top down view
+  px, py = x * UP.lidar_zoom + UP.lidar_car_x, -y * UP.lidar_zoom + UP.lidar_car_y
+  valid = (px > 0) & (py > 0) & (px < UP.lidar_x) & (py < UP.lidar_y)
+  return px.astype(int), py.astype(int), valid
+
+
 def draw_path(path, color, img, calibration, top_down, lid_color=None, z_off=0):
-  x, y, z = np.asarray(path.x), np.asarray(path.y), np.asarray(path.z) + z_off
+  x, y, z = as_arrays(path, 'x', 'y', 'z', dtype=np.float64)
+  z = z + z_off
   pts = calibration.car_space_to_bb(x, y, z)
-  pts = np.round(pts).astype(int)
 
   # draw lidar path point on lidar
   # find color in 8 bit
   if lid_color is not None and top_down is not None:
-    tcolor = find_color(top_down[0], lid_color)
-    for i in range(len(x)):
-      px, py = to_topdown_pt(x[i], y[i])
-      if px != -1:
-        top_down[1][px, py] = tcolor
+    px, py, valid = to_topdown_pts(x, y)
+    top_down[1][px[valid], py[valid]] = find_color(top_down[0], lid_color)
 
   height, width = img.shape[:2]
-  for x, y in pts:
-    if 1 < x < width - 1 and 1 < y < height - 1:
-      for a, b in itertools.permutations([-1, 0, -1], 2):
-        img[y + a, x + b] = color
+  on_img = (pts[:, 0] > 1) & (pts[:, 0] < width - 1) & (pts[:, 1] > 1) & (pts[:, 1] < height - 1)
+  if on_img.any():
+    cv2.polylines(img, [np.round(pts[on_img]).astype(np.int32)], False, color, thickness=2)
 
 
 def init_plots(arr, name_to_arr_idx, plot_xlims, plot_ylims, plot_names, plot_colors, plot_styles):
@@ -132,11 +136,15 @@ def init_plots(arr, name_to_arr_idx, plot_xlims, plot_ylims, plot_names, plot_co
     if i < len(plot_ylims) - 1:
       axs[i].set_xticks([])
 
+  for plot in plots:
+    plot.set_animated(True)
   canvas.draw()
+  # only the lines are redrawn each frame, over the saved axes
+  backgrounds = [canvas.copy_from_bbox(ax.bbox) for ax in axs]
 
   def draw_plots(arr):
-    for ax in axs:
-      ax.draw_artist(ax.patch)
+    for background in backgrounds:
+      canvas.restore_region(background)
     for i in range(len(plots)):
       plots[i].set_ydata(arr[:, idxs[i]])
       axs[plot_select[i]].draw_artist(plots[i])
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import argparse
 import os
+import signal
 import sys
 
 import cv2
@@ -24,7 +25,7 @@ os.environ['BASEDIR'] = BASEDIR
 
 ANGLE_SCALE = 5.0
 
-def ui_thread(addr):
+def ui_thread(addr, output=None, fps=20):
   cv2.setNumThreads(1)
   pygame.init()
   pygame.font.init()
@@ -100,10 +101,20 @@ def ui_thread(addr):
 
   draw_plots = init_plots(plot_arr, name_to_arr_idx, plot_xlims, plot_ylims, plot_names, plot_colors, plot_styles)
 
+  # headless, the screen is written to a video at a fixed rate of replay time
+  writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*'mp4v'), fps, size) if output is not None else None
+  next_frame_t = None
+  skipped_frames = 0
+  if writer is not None:
+    # quit through the event loop so the video is finalized
+    signal.signal(signal.SIGINT, lambda sig, frame: pygame.event.post(pygame.event.Event(pygame.QUIT)))
+
   vipc_client = VisionIpcClient("camerad", VisionStreamType.VISION_STREAM_ROAD, True)
   while True:
     for event in pygame.event.get():
       if event.type == pygame.QUIT:
+        if writer is not None:
+          writer.release()
         pygame.quit()
         sys.exit()
 
@@ -119,6 +130,12 @@ def ui_thread(addr):
     if yuv_img_raw is None or not yuv_img_raw.data.any():
       continue
 
+    # when rendering falls behind, skip to the newest frame
+    while (next_img_raw := vipc_client.recv(0)) is not None:
+      yuv_img_raw = next_img_raw
+      skipped_frames += 1
+    frame_t = vipc_client.timestamp_eof
+
     sm.update(0)
 
     camera = DEVICE_CAMERAS[("tici", str(sm['roadCameraState'].sensor))]
@@ -206,7 +223,8 @@ def ui_thread(addr):
       info_font.render("ANGLE OFFSET (AVG): " + str(round(sm['liveParameters'].angleOffsetAverageDeg, 2)) + " deg", True, YELLOW),
       info_font.render("ANGLE OFFSET (INSTANT): " + str(round(sm['liveParameters'].angleOffsetDeg, 2)) + " deg", True, YELLOW),
       info_font.render("STIFFNESS: " + str(round(sm['liveParameters'].stiffnessFactor * 100., 2)) + " %", True, YELLOW),
-      info_font.render("STEER RATIO: " + str(round(sm['liveParameters'].steerRatio, 2)), True, YELLOW)
+      info_font.render("STEER RATIO: " + str(round(sm['liveParameters'].steerRatio, 2)), True, YELLOW),
+      info_font.render("SKIPPED FRAMES: " + str(skipped_frames), True, YELLOW),
     ]
 
     for i, line in enumerate(lines):
@@ -216,6 +234,15 @@ def ui_thread(addr):
     # this takes time...vsync or something
     pygame.display.flip()
 
+    if writer is not None:
+      frame = cv2.cvtColor(pygame.surfarray.array3d(screen).swapaxes(0, 1), cv2.COLOR_RGB2BGR)
+      if next_frame_t is None:
+        next_frame_t = frame_t
+      # skipped frames are filled with the last rendered one
+      while next_frame_t <= frame_t:
+        writer.write(frame)
+        next_frame_t += 1e9 / fps
+
 def get_arg_parser():
   parser = argparse.ArgumentParser(
     description="Show replay data in a UI.",
@@ -226,6 +253,10 @@ def get_arg_parser():
 
   parser.add_argument("--frame-address", default=None,
                       help="The frame address (fully qualified ZMQ endpoint for frames) on which to receive zmq messages.")
+  parser.add_argument("--output", default=None,
+                      help="Render without a window and write the UI to this MP4 file.")
+  parser.add_argument("--fps", type=int, default=20,
+                      help="Frame rate of the --output video.")
   return parser
 
 if __name__ == "__main__":
@@ -235,4 +266,7 @@ if __name__ == "__main__":
     os.environ["ZMQ"] = "1"
     messaging.context = messaging.Context()
 
-  ui_thread(args.ip_address)
+  if args.output is not None:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+  ui_thread(args.ip_address, args.output, args.fps)
@@ -7,36 +7,22 @@ import rerun.blueprint as rrb
 from functools import partial
 
 from openpilot.tools.lib.logreader import LogReader
+from openpilot.tools.lib.timeseries import TimeSeries
 from cereal.services import SERVICE_LIST
 
 
 NUM_CPUS = multiprocessing.cpu_count()
 DEMO_ROUTE = "a2a0ccea32023010|2023-07-27--13-01-19"
 
-def log_msg(msg, parent_key=''):
-  stack = [(msg, parent_key)]
-  while stack:
-    current_msg, current_parent_key = stack.pop()
-    if isinstance(current_msg, list):
-      for index, item in enumerate(current_msg):
-        new_key = f"{current_parent_key}/{index}"
-        if isinstance(item, (int, float)):
-          rr.log(str(new_key), rr.Scalar(item))
-        elif isinstance(item, dict):
-          stack.append((item, new_key))
-    elif isinstance(current_msg, dict):
-      for key, value in current_msg.items():
-        new_key = f"{current_parent_key}/{key}"
-        if isinstance(value, (int, float)):
-          rr.log(str(new_key), rr.Scalar(value))
-        elif isinstance(value, dict):
-          stack.append((value, new_key))
-        elif isinstance(value, list):
-          for index, item in enumerate(value):
-            if isinstance(item, (int, float)):
-              rr.log(f"{new_key}/{index}", rr.Scalar(item))
+def log_columns(columns):
+  for path, (times, values) in columns.items():
+    if hasattr(rr, "send_columns"):
+      rr.send_columns(path, times=[rr.TimeNanosColumn("TIMELINE", times)], components=[rr.components.ScalarBatch(values)])
     else:
-      pass  # Not a plottable value
+      # rerun before 0.18 logs one time at a time
+      for t, value in zip(times.tolist(), values.tolist(), strict=True):
+        rr.set_time_nanos("TIMELINE", t)
+        rr.log(path, rr.Scalar(value))
 
 def createBlueprint():
   blueprint = None
@@ -57,15 +43,15 @@ def process(blueprint, lr):
   rr.init("rerun_test")
   rr.connect(default_blueprint=blueprint)
 
-  ret = []
+  series = TimeSeries()
   for msg in lr:
-    ret.append(msg)
-    rr.set_time_nanos("TIMELINE", msg.logMonoTime)
     if msg.which() != "thumbnail":
-      log_msg(msg.to_dict()[msg.which()], msg.which())
+      series.add(msg)
     else:
+      rr.set_time_nanos("TIMELINE", msg.logMonoTime)
       log_thumbnail(msg.to_dict()[msg.which()])
-  return ret
+  log_columns(series.get_columns())
+  return []
 
 if __name__ == '__main__':
   parser = argparse.ArgumentParser(description="A helper to run rerun on openpilot routes",